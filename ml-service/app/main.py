@@ -1,4 +1,43 @@
 # Flask API entry point
+#
+#   cd ml-service && python app/main.py [--host 0.0.0.0] [--port 5000] [--wait]
+#
+# Binds the port immediately and loads the model / feature store in a background
+# warm-up thread (scripts/app.py). Point liveness probes at /healthz and readiness
+# probes at /readyz; every other endpoint answers 503 until warm-up is done.
+# New model/scaler/combined_data files are hot-reloaded (polling, SIGHUP or
+# POST /admin/reload) without dropping in-flight requests.
+
+import argparse
+import os
+import sys
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts"))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import app as service  # noqa: E402  (needs SCRIPTS_DIR on sys.path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the InvestiMate inference service.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5000")))
+    parser.add_argument(
+        "--wait", action="store_true",
+        help="Finish warm-up before binding the port (for environments without readiness probes)."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service.install_reload_signal()
+    service.start_warmup()
+    if args.wait:
+        service.wait_until_ready()
+    # threaded so concurrent /predict calls can coalesce in the micro-batcher
+    service.app.run(host=args.host, port=args.port, debug=False, threaded=True)
+
 
 if __name__ == "__main__":
-    print("Fill in later!")
\ No newline at end of file
+    main()
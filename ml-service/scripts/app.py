@@ -1,11 +1,21 @@
 # scripts/app.py
 
-from flask import Flask, request, jsonify
-import pandas as pd
+from flask import Flask, g, request, jsonify
+import hashlib
 import numpy as np
-import tensorflow as tf
-import joblib
 import os
+import threading
+import time
+
+# Heavy imports (TensorFlow, joblib, pandas via storage) happen inside the warm-up
+# thread, so importing this module and binding the port take milliseconds.
+from artifacts import ArtifactBundle, ArtifactManager, source_stats
+from feature_history import FeatureHistory
+from feature_store import FeatureStore, shared_arrays
+from micro_batcher import MicroBatcher
+from numpy_model import NumpyModel
+from screener import LabelBitmaps, QueryError, render
+from vector_index import BRUTE_FORCE_MAX, DEFAULT_PROBES, VectorIndex
 
 app = Flask(__name__)
 
@@ -14,29 +24,461 @@ app = Flask(__name__)
 MODEL_PATH = os.path.join("model.h5")
 SCALER_PATH = os.path.join("data", "processed", "scaler.save")
 COMBINED_CSV = os.path.join("data", "processed", "combined_data.csv")
+NUMPY_MODEL_PATH = os.path.join("model.npz")  # written by export_numpy_model.py
+# Point-in-time feature histories for /predict?as_of= (written with --history by
+# compute_price_features.py / merge_fundamentals.py; optional)
+HISTORY_DIRS = {
+    "price": os.path.join("data", "processed", "history", "price_features"),
+    "fundamentals": os.path.join("data", "processed", "history", "fundamentals"),
+}
+SECTOR_TABLE_DIR = os.path.join("data", "processed", "history", "sectors")  # merge_all_features.py
+
+# Inference backend: "keras" (model.h5 via TensorFlow) or "numpy" (model.npz, no TF import)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras").lower()
+if INFERENCE_BACKEND not in ("keras", "numpy"):
+    raise ValueError(f"INFERENCE_BACKEND must be 'keras' or 'numpy', got '{INFERENCE_BACKEND}'")
+
+# Micro-batching window for concurrent /predict calls (set PREDICT_MICRO_BATCHING=0 to disable)
+MICRO_BATCHING = os.environ.get("PREDICT_MICRO_BATCHING", "1") != "0"
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.environ.get("PREDICT_MAX_WAIT_MS", "2"))
+
+# Start loading artifacts in the background as soon as the module is imported
+# (set APP_WARMUP_ON_IMPORT=0 to call start_warmup() yourself, e.g. after chdir)
+WARMUP_ON_IMPORT = os.environ.get("APP_WARMUP_ON_IMPORT", "1") != "0"
 
-# Load model + scaler + combined_data DataFrame
-print("Loading model ...")
-model = tf.keras.models.load_model(MODEL_PATH)
+# Hot reload: poll the artifact files every APP_RELOAD_POLL_S seconds (0 = only on
+# SIGHUP or POST /admin/reload). If APP_ADMIN_TOKEN is set, /admin/* requires it
+# in the X-Admin-Token header.
+RELOAD_POLL_S = float(os.environ.get("APP_RELOAD_POLL_S", "30"))
+ADMIN_TOKEN = os.environ.get("APP_ADMIN_TOKEN")
 
-print("Loading scaler ...")
-scaler = joblib.load(SCALER_PATH)
+# Multi-worker serving (serve.py): directory for the memory-mapped feature matrix,
+# universe predictions and similarity indexes shared by all worker processes;
+# unset = each process builds its own in memory
+SHARED_FEATURES_DIR = os.environ.get("APP_SHARED_FEATURES_DIR")
 
-print("Loading combined_data for inference ...")
-data_df = pd.read_csv(COMBINED_CSV, dtype={"symbol": str})
-# We will treat data_df itself as our “feature store.” For a real app, update these rows continuously.
+# /similar: which embeddings to index ("features" = scaled feature vectors, "model" =
+# penultimate Dense activations), the universe size above which an approximate
+# IVF index replaces brute force, and how many IVF lists a query scans (recall vs
+# latency; see vector_index.py for measured recall)
+EMBEDDING_METRICS = {"features": "euclidean", "model": "cosine"}
+SIMILARITY_EMBEDDINGS = [e.strip() for e in os.environ.get("SIMILARITY_EMBEDDINGS", "features,model").split(",") if e.strip()]
+SIMILARITY_BRUTE_FORCE_MAX = int(os.environ.get("SIMILARITY_BRUTE_FORCE_MAX", str(BRUTE_FORCE_MAX)))
+SIMILARITY_PROBES = int(os.environ.get("SIMILARITY_PROBES", str(DEFAULT_PROBES)))
+MAX_SIMILAR_K = 500
+DEFAULT_SCREEN_LIMIT = 100
+MAX_SCREEN_LIMIT = 5000
+UNIVERSE_CHUNK = 65536  # rows per forward pass when predicting/embedding the whole universe
 
-# Precompute the feature columns (must match train_model.py’s feature selection)
+# Feature columns (must match train_model.py’s feature selection); sector columns are
+# read from combined_data each time artifacts are loaded
 NUMERIC_COLS = ["MarketCap", "RevenueGrowth", "PE", "DividendYield", "volatility", "momentum"]
-SECTOR_COLS = sorted([c for c in data_df.columns if c.startswith("Sector_")])
-FEATURE_COLS = NUMERIC_COLS + SECTOR_COLS
 
-# Label names must match exactly train_model.py
-LABEL_COLS = [
-    "LargeCap", "MidCap", "SmallCap", "MicroCap",
-    "GrowthStock", "ValueStock", "IncomeStock", "BlueChipStock",
-    "Cyclical", "Defensive"
-] + sorted(SECTOR_COLS) + ["DividendStock", "NonDividendStock"]
+# Warm-up progress, reported by /readyz
+WARMUP_STAGES = ["load_model", "read_columns", "build_feature_store", "warm_forward_pass", "index_universe",
+                 "open_history"]
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_ready = threading.Event()
+_status = {"state": "idle", "stage": None, "stages": {}, "error": None, "started_at": None, "ready_at": None}
+
+# Absolute artifact paths, fixed by start_warmup() (the cwd may change afterwards)
+_paths = {}
+
+
+def _stage(name):
+    """Mark `name` as the running load stage; returns a callback that records its duration."""
+    warming = not _ready.is_set()  # /readyz only tracks the first load; reloads report via /admin/artifacts
+    if warming:
+        _status["stage"] = name
+    t0 = time.perf_counter()
+    print(f"[load] {name} ...")
+
+    def done():
+        if warming:
+            _status["stages"][name] = round(time.perf_counter() - t0, 4)
+    return done
+
+
+def artifact_sources():
+    """Files a bundle is built from (watched for hot reload)."""
+    import storage
+
+    try:
+        combined, _ = storage.resolve_table(_paths["combined"])
+    except FileNotFoundError:
+        combined = _paths["combined"]
+    history = [_paths[f"history_{name}"] for name in HISTORY_DIRS] + [_paths["sector_table"]]
+    if INFERENCE_BACKEND == "numpy":
+        return [_paths["numpy_model"], combined] + history
+    return [_paths["model"], _paths["scaler"], combined] + history
+
+
+def load_artifacts(sources=None):
+    """
+    Build a complete ArtifactBundle: model + scaler + feature store, then pay
+    first-call costs with dummy forward passes. Runs off the request path (warm-up
+    thread or reload thread); nothing global changes until the manager swaps it in.
+    """
+    import storage  # pulls in pandas
+
+    # 1) Model + scaler
+    done = _stage("load_model")
+    if INFERENCE_BACKEND == "numpy":
+        print(f"Loading NumPy model from {_paths['numpy_model']} ...")
+        model = NumpyModel.load(_paths["numpy_model"])
+        scaler = model.scaler  # mean/scale are stored in the same artifact
+    else:
+        import joblib
+        import tensorflow as tf
+
+        print("Loading model ...")
+        model = tf.keras.models.load_model(_paths["model"])
+
+        print("Loading scaler ...")
+        scaler = joblib.load(_paths["scaler"])
+    done()
+
+    # 2) Feature / label columns; only the served columns are read (memory-mapped with the npy layout)
+    done = _stage("read_columns")
+    combined_csv = _paths["combined"]
+    sector_cols = sorted([c for c in storage.list_columns(combined_csv) if c.startswith("Sector_")])
+    feature_cols = NUMERIC_COLS + sector_cols
+
+    # Label names must match exactly train_model.py
+    label_cols = [
+        "LargeCap", "MidCap", "SmallCap", "MicroCap",
+        "GrowthStock", "ValueStock", "IncomeStock", "BlueChipStock",
+        "Cyclical", "Defensive"
+    ] + sorted(sector_cols) + ["DividendStock", "NonDividendStock"]
+
+    if INFERENCE_BACKEND == "numpy" and (model.feature_names != feature_cols or model.label_names != label_cols):
+        raise ValueError(
+            f"{_paths['numpy_model']} was exported for features {model.feature_names} / labels "
+            f"{model.label_names}, but {combined_csv} yields {feature_cols} / {label_cols}. "
+            f"Re-run export_numpy_model.py."
+        )
+
+    def build_store():
+        print("Loading combined_data for inference ...")
+        data_cols = storage.read_columns(combined_csv, ["symbol"] + feature_cols, dtype={"symbol": str})
+        return FeatureStore.from_columns(data_cols, scaler, NUMERIC_COLS, sector_cols)
+    done()
+
+    # 3) Build the feature store once: symbol -> row index + pre-scaled float32 matrix.
+    #    With APP_SHARED_FEATURES_DIR (set by serve.py) the first worker writes the scaled
+    #    matrix to an .npy keyed by the source files, and every worker memory-maps it.
+    done = _stage("build_feature_store")
+    if SHARED_FEATURES_DIR:
+        stats = sources or source_stats(artifact_sources())
+        key = hashlib.sha1(repr((INFERENCE_BACKEND, sorted(stats.items()))).encode()).hexdigest()[:16]
+        store = FeatureStore.shared(SHARED_FEATURES_DIR, f"features-{key}", build_store)
+    else:
+        key = None
+        store = build_store()
+    print(f"  → {len(store)} rows indexed.")
+    done()
+
+    # 4) Dummy forward passes (single row and a full micro-batch) so graph tracing /
+    #    first-call allocation happen here instead of on the first real request
+    done = _stage("warm_forward_pass")
+    bundle = ArtifactBundle(None, model, scaler, store, sector_cols, feature_cols, label_cols, sources or {})
+    dummy = np.zeros((MAX_BATCH_SIZE, len(feature_cols)), dtype=np.float32)
+    bundle.predict(dummy[:1])
+    bundle.predict(dummy)
+    done()
+
+    # 5) Universe-wide predictions + similarity indexes (rebuilt with every bundle;
+    #    shared like the feature store, so only the first worker runs the model over
+    #    every row and k-means)
+    done = _stage("index_universe")
+    index_universe(bundle, key)
+    done()
+
+    # 6) Feature histories (memory-mapped; only the pages an as-of lookup touches are read)
+    done = _stage("open_history")
+    for name in HISTORY_DIRS:
+        directory = _paths[f"history_{name}"]
+        if FeatureHistory.exists(directory):
+            bundle.history[name] = FeatureHistory.open(directory)
+            print(f"  → {name} history: {bundle.history[name].describe()}")
+    if FeatureHistory.exists(_paths["sector_table"]):
+        bundle.sectors = FeatureHistory.open(_paths["sector_table"])
+        print(f"  → sector table: {bundle.sectors.describe()}")
+    done()
+    return bundle
+
+
+def embedder(model):
+    """Function mapping scaled feature rows to the model's penultimate Dense activations."""
+    if hasattr(model, "embed"):
+        return model.embed
+    import tensorflow as tf
+
+    dense = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+    sub_model = tf.keras.Model(model.inputs, dense[-2].output)
+    return lambda x: sub_model.predict(x, batch_size=UNIVERSE_CHUNK, verbose=0)
+
+
+def in_chunks(fn, matrix):
+    """fn() over the rows of `matrix` UNIVERSE_CHUNK at a time, stacked."""
+    parts = [fn(np.asarray(matrix[i:i + UNIVERSE_CHUNK])) for i in range(0, len(matrix), UNIVERSE_CHUNK)]
+    return np.concatenate(parts, axis=0) if parts else np.empty((0, 0), dtype=np.float32)
+
+
+def universe_arrays(bundle):
+    """Predict every row once and build a VectorIndex per embedding; {name: array} of everything computed."""
+    matrix = bundle.feature_store.matrix
+    arrays = {"predictions": in_chunks(bundle.predict, matrix) >= 0.5}
+    for name in SIMILARITY_EMBEDDINGS:
+        if name == "features":
+            # Scaled NUMERIC_COLS + SECTOR_COLS, compared by L2 distance
+            vectors = matrix
+        elif name == "model":
+            # Penultimate Dense(64) ReLU activations, compared by cosine distance
+            vectors = in_chunks(embedder(bundle.model), matrix)
+        else:
+            raise ValueError(f"Unknown similarity embedding '{name}'. Available: {sorted(EMBEDDING_METRICS)}")
+        index = VectorIndex(vectors, metric=EMBEDDING_METRICS[name], brute_force_max=SIMILARITY_BRUTE_FORCE_MAX)
+        arrays.update({f"{name}.{part}": values for part, values in index.to_arrays().items()})
+    return arrays
+
+
+def index_universe(bundle, key=None):
+    """
+    Screener bitsets + similarity indexes over the universe-wide predictions. With
+    APP_SHARED_FEATURES_DIR and the feature store's key, the arrays are computed by
+    the first worker and memory-mapped by the others.
+    """
+    store = bundle.feature_store
+    if SHARED_FEATURES_DIR and key:
+        config = (key, SIMILARITY_EMBEDDINGS, SIMILARITY_BRUTE_FORCE_MAX)
+        universe_key = hashlib.sha1(repr(config).encode()).hexdigest()[:16]
+        arrays = shared_arrays(SHARED_FEATURES_DIR, f"universe-{universe_key}", lambda: universe_arrays(bundle))
+    else:
+        arrays = universe_arrays(bundle)
+
+    bundle.predictions = arrays["predictions"]
+    bundle.screener = LabelBitmaps(bundle.predictions, bundle.label_cols, store.symbols, list(store.index.values()))
+    print(f"  → screener: {bundle.screener.describe()}")
+    for name in SIMILARITY_EMBEDDINGS:
+        parts = {part[len(name) + 1:]: values for part, values in arrays.items() if part.startswith(name + ".")}
+        bundle.indexes[name] = VectorIndex.from_arrays(parts, EMBEDDING_METRICS[name], vectors=store.matrix,
+                                                       n_probe=SIMILARITY_PROBES)
+        print(f"  → {name} index: {bundle.indexes[name].describe()}")
+
+
+def _on_swap(bundle):
+    """Any successful load makes the service ready, including a reload after a failed startup."""
+    if not _ready.is_set():
+        _status.update(state="ready", stage=None, error=None, ready_at=time.time())
+        _ready.set()
+
+
+artifacts = ArtifactManager(load_artifacts, artifact_sources, poll_interval=RELOAD_POLL_S, on_swap=_on_swap)
+
+# Coalesce concurrent single-ticker requests into one forward pass; each request
+# carries its bundle's predict function, so versions are never mixed in a batch
+batcher = None
+if MICRO_BATCHING:
+    batcher = MicroBatcher(max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
+
+
+def _warmup():
+    _status["state"] = "loading"
+    _status["started_at"] = time.time()
+    try:
+        artifacts.reload(force=True, reason="startup")  # _on_swap marks the service ready
+    except Exception as exc:  # surfaced through /readyz; the process stays up for inspection
+        if artifacts.current is None:  # a concurrent SIGHUP/admin reload may have succeeded meanwhile
+            _status["state"] = "failed"
+            _status["error"] = f"{type(exc).__name__}: {exc}"
+        print(f"[warm-up] FAILED: {type(exc).__name__}: {exc} (retrying on file change, SIGHUP or /admin/reload)")
+    else:
+        print(f"[warm-up] ready in {_status['ready_at'] - _status['started_at']:.2f}s.")
+    # Watch even after a failure: fixing the files on disk brings the service up without a restart
+    artifacts.start_watching()
+
+
+def start_warmup():
+    """Start loading artifacts in a background thread (idempotent). Paths resolve against the current cwd."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _paths.update(
+                model=os.path.abspath(MODEL_PATH),
+                scaler=os.path.abspath(SCALER_PATH),
+                combined=os.path.abspath(COMBINED_CSV),
+                numpy_model=os.path.abspath(NUMPY_MODEL_PATH),
+                **{f"history_{name}": os.path.abspath(path) for name, path in HISTORY_DIRS.items()},
+                sector_table=os.path.abspath(SECTOR_TABLE_DIR),
+            )
+            _warmup_thread = threading.Thread(target=_warmup, name="warm-up", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def wait_until_ready(timeout=None):
+    """Block until warm-up finishes; raises RuntimeError if it failed or timed out."""
+    start_warmup()
+    _warmup_thread.join(timeout)
+    if artifacts.current is None:
+        raise RuntimeError(f"Service not ready: {_status['error'] or _status['state']}")
+
+
+def install_reload_signal():
+    """Reload on SIGHUP (call from the main thread; no-op where SIGHUP does not exist)."""
+    import signal
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: artifacts.request_reload(reason="SIGHUP"))
+
+
+def warmup_status():
+    status = dict(_status, stages=dict(_status["stages"]), backend=INFERENCE_BACKEND, pid=os.getpid())
+    status["progress"] = f"{len(status['stages'])}/{len(WARMUP_STAGES)}"
+    if status["started_at"] is not None:
+        status["elapsed_s"] = round((status["ready_at"] or time.time()) - status["started_at"], 3)
+    status["version"] = artifacts.current.version if artifacts.current else None
+    return status
+
+
+if WARMUP_ON_IMPORT:
+    start_warmup()
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and serving HTTP (artifacts may still be loading)
+    return jsonify({"status": "ok"})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # Readiness: 200 while a loaded, warmed bundle is serving, 503 before that
+    status = warmup_status()
+    return jsonify(status), (200 if artifacts.current is not None else 503)
+
+
+@app.before_request
+def require_ready():
+    # Probes and /admin/* (reload, status) must work before the first successful load
+    if request.endpoint in ("healthz", "readyz") or request.path.startswith("/admin/"):
+        return None
+    if artifacts.current is not None:
+        return None
+    status = warmup_status()
+    message = "Service is warming up." if status["state"] != "failed" else "Service failed to load its artifacts."
+    return jsonify({"error": message, "status": status}), 503
+
+
+@app.after_request
+def tag_version(response):
+    # Which artifact version served this response (see current_bundle())
+    version = g.get("artifact_version")
+    if version:
+        response.headers["X-Artifact-Version"] = version
+    return response
+
+
+def current_bundle():
+    """The bundle this request uses from start to finish (a reload mid-request does not affect it)."""
+    bundle = artifacts.current
+    g.artifact_version = bundle.version
+    return bundle
+
+
+def _admin_denied():
+    if ADMIN_TOKEN and request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+
+def _serving_version():
+    current = artifacts.current
+    return current.version if current is not None else None
+
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    # ?force=1 reloads even if the files are unchanged; ?wait=0 returns immediately (202)
+    denied = _admin_denied()
+    if denied:
+        return denied
+    force = request.args.get("force", default="0") == "1"
+    if request.args.get("wait", default="1") == "0":
+        artifacts.request_reload(force=force, reason="admin")
+        return jsonify({"status": "reload started", "version": _serving_version()}), 202
+    previous = _serving_version()
+    try:
+        version = artifacts.reload(force=force, reason="admin")
+    except Exception as exc:
+        return jsonify({"error": f"Reload failed: {type(exc).__name__}: {exc}", "version": previous}), 500
+    return jsonify({"version": version, "previous": previous, "reloaded": version != previous})
+
+
+@app.route("/admin/artifacts", methods=["GET"])
+def admin_artifacts():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify(artifacts.status())
+
+
+# Upper bound on tickers per /predict/batch call (keeps one request from pinning the worker)
+MAX_BATCH_TICKERS = 10000
+
+
+def build_label_map(probs, label_cols):
+    """Convert one row of sigmoid outputs into {label_name: bool} with threshold 0.5."""
+    preds = (probs >= 0.5).astype(int)
+    return {label_name: bool(p) for label_name, p in zip(label_cols, preds)}
+
+
+def features_as_of(bundle, ticker, as_of):
+    """
+    Scaled (1, n_features) row for `ticker` as it stood on `as_of`, plus the date
+    each numeric feature was observed. Each numeric column is read from the first
+    history that has it (binary search within the ticker's date-sorted segment).
+    Sector columns are static: they come from the stored sector table, which keeps
+    tickers that have left today's feature store, else from the store. Raises LookupError.
+    """
+    sectors = static_sectors(bundle, ticker)
+    if sectors is None:
+        raise LookupError(f"Ticker '{ticker}' not found.")
+
+    raw = np.empty(len(NUMERIC_COLS), dtype=np.float64)
+    observed, missing = {}, []
+    for j, col in enumerate(NUMERIC_COLS):
+        history = next((h for h in bundle.history.values() if col in h.columns), None)
+        pos = history.as_of(ticker, as_of) if history is not None else None
+        raw[j] = history.columns[col][pos] if pos is not None else np.nan
+        if np.isnan(raw[j]):
+            missing.append(col)
+        else:
+            observed[col] = history.date_of(pos)
+    if missing:
+        raise LookupError(f"No {', '.join(missing)} for '{ticker}' as of {as_of}.")
+
+    feats = np.empty((1, len(bundle.feature_cols)), dtype=np.float32)
+    feats[:, : len(NUMERIC_COLS)] = bundle.scaler.transform(raw[None, :])
+    feats[0, len(NUMERIC_COLS):] = sectors
+    return feats, observed
+
+
+def static_sectors(bundle, ticker):
+    """Sector one-hots of `ticker` in bundle.sector_cols order, or None if it has no known sector."""
+    table = bundle.sectors
+    bounds = table.span(ticker) if table is not None else None
+    if bounds is not None:
+        pos = bounds[1] - 1  # latest stored row
+        return np.array([table.columns[c][pos] if c in table.columns else 0.0 for c in bundle.sector_cols],
+                        dtype=np.float32)
+    store_row = bundle.feature_store.lookup(ticker)
+    if store_row is None:
+        return None
+    return bundle.feature_store.matrix[store_row, len(NUMERIC_COLS):]
 
 
 @app.route("/predict", methods=["GET"])
@@ -46,28 +488,200 @@ def predict():
         return jsonify({"error": "No ticker provided"}), 400
 
     ticker = ticker.upper()
-    # Look up the row in data_df
-    row = data_df[data_df["symbol"] == ticker]
-    if row.empty:
-        return jsonify({"error": f"Ticker '{ticker}' not found."}), 404
-
-    # Extract feature values
-    feats = row[FEATURE_COLS].values.astype(float)  # shape = (1, n_features)
-    # Scale numeric columns (the scaler was fit on [numeric_cols + sector_cols]—sector cols remain 0/1)
-    feats[:, : len(NUMERIC_COLS)] = scaler.transform(feats[:, : len(NUMERIC_COLS)])
-
-    # Get prediction
-    probs = model.predict(feats)[0]  # shape = (n_labels,)
-    # Convert to boolean labels with threshold 0.5
-    preds = (probs >= 0.5).astype(int)
+    bundle = current_bundle()
+    as_of = request.args.get("as_of", default=None, type=str)
+    if as_of:
+        # Historical prediction: features resolved from the point-in-time histories
+        if not bundle.history:
+            return jsonify({"error": "as_of needs a feature history (run compute_price_features.py and "
+                                     "merge_fundamentals.py with --history)."}), 400
+        try:
+            as_of = str(np.datetime64(as_of, "D"))
+        except ValueError:
+            return jsonify({"error": f"Invalid as_of date '{as_of}' (expected YYYY-MM-DD)."}), 400
+        try:
+            feats, observed = features_as_of(bundle, ticker, as_of)
+        except LookupError as exc:
+            return jsonify({"error": exc.args[0], "version": bundle.version}), 404
+    else:
+        # Look up the (already scaled) feature row in the feature store
+        feats = bundle.feature_store.row(ticker)  # shape = (1, n_features)
+        if feats is None:
+            return jsonify({"error": f"Ticker '{ticker}' not found.", "version": bundle.version}), 404
+
+    # Get prediction (coalesced with other in-flight requests when micro-batching is on)
+    if batcher is not None:
+        probs = batcher.predict(feats, predict_fn=bundle.predict)  # shape = (n_labels,)
+    else:
+        probs = bundle.predict(feats)[0]  # shape = (n_labels,)
 
     # Build response dict
-    result = {"ticker": ticker, "labels": {}}
-    for label_name, p in zip(LABEL_COLS, preds):
-        result["labels"][label_name] = bool(p)
+    result = {"ticker": ticker, "labels": build_label_map(probs, bundle.label_cols), "version": bundle.version}
+    if as_of:
+        result.update(as_of=as_of, observed=observed)
 
     return jsonify(result)
 
+
+@app.route("/predict/batch", methods=["GET", "POST"])
+def predict_batch():
+    # Accept either ?tickers=AAPL,MSFT,... or a JSON body: ["AAPL", ...] / {"tickers": [...]}
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            body = body.get("tickers")
+        if not isinstance(body, list):
+            return jsonify({"error": "Expected a JSON list of tickers or {\"tickers\": [...]}"}), 400
+        tickers = [str(t).strip().upper() for t in body if t is not None and str(t).strip()]
+    else:
+        raw = request.args.get("tickers", default="", type=str)
+        tickers = [t.strip().upper() for t in raw.split(",") if t.strip()]
+
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"Too many tickers ({len(tickers)} > {MAX_BATCH_TICKERS})."}), 400
+
+    # Gather the rows of every known ticker (deduplicated) into one matrix
+    bundle = current_bundle()
+    feature_store = bundle.feature_store
+    row_of = {}
+    for ticker in tickers:
+        idx = feature_store.lookup(ticker)
+        if idx is not None and ticker not in row_of:
+            row_of[ticker] = len(row_of)
+
+    probs = None
+    if row_of:
+        idx = [feature_store.lookup(t) for t in row_of]
+        feats = feature_store.matrix[idx]  # shape = (n_found, n_features)
+        # One vectorized forward pass for the whole batch
+        probs = bundle.predict(feats)
+
+    # Per-item results, in request order; unknown tickers do not fail the batch
+    results = []
+    for ticker in tickers:
+        if ticker in row_of:
+            results.append({"ticker": ticker, "labels": build_label_map(probs[row_of[ticker]], bundle.label_cols)})
+        else:
+            results.append({"ticker": ticker, "error": f"Ticker '{ticker}' not found."})
+
+    return jsonify({
+        "count": len(results),
+        "found": len(row_of),
+        "results": results,
+        "version": bundle.version,
+    })
+
+
+@app.route("/similar", methods=["GET"])
+def similar():
+    # /similar?ticker=AAPL&k=10&embedding=features|model&labels=LargeCap,!DividendStock
+    ticker = request.args.get("ticker", default=None, type=str)
+    if not ticker:
+        return jsonify({"error": "No ticker provided"}), 400
+    ticker = ticker.upper()
+    try:
+        k = int(request.args.get("k", default="10"))
+    except ValueError:
+        return jsonify({"error": "k must be an integer."}), 400
+    if not 1 <= k <= MAX_SIMILAR_K:
+        return jsonify({"error": f"k must be between 1 and {MAX_SIMILAR_K}."}), 400
+
+    bundle = current_bundle()
+    embedding = request.args.get("embedding", default=SIMILARITY_EMBEDDINGS[0] if SIMILARITY_EMBEDDINGS else "features")
+    index = bundle.indexes.get(embedding)
+    if index is None:
+        return jsonify({"error": f"Unknown embedding '{embedding}'. Available: {sorted(bundle.indexes)}"}), 400
+
+    row = bundle.feature_store.lookup(ticker)
+    if row is None:
+        return jsonify({"error": f"Ticker '{ticker}' not found.", "version": bundle.version}), 404
+
+    # Optional screener expression over the predicted labels, e.g. "LargeCap,!DividendStock".
+    # The mask only ever holds each symbol's first row (the one /predict serves), so
+    # duplicate listings never take up result slots.
+    labels = request.args.get("labels", default="", type=str)
+    try:
+        mask = bundle.screener.mask(labels)
+    except QueryError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    symbols = bundle.feature_store.symbols
+    rows, dists = index.search(row, k, mask=mask)
+    results = [{"ticker": symbols[r], "distance": round(float(d), 6)} for r, d in zip(rows.tolist(), dists.tolist())]
+
+    return jsonify({
+        "ticker": ticker,
+        "embedding": embedding,
+        "metric": index.metric,
+        "index": index.kind,
+        "labels": render(bundle.screener.parse(labels)) if labels.strip() else None,
+        "results": results,
+        "version": bundle.version,
+    })
+
+
+@app.route("/screen", methods=["GET", "POST"])
+def screen():
+    # /screen?q=SmallCap AND GrowthStock AND NOT DividendStock AND Technology&offset=0&limit=100
+    # or POST {"query": "...", "offset": 0, "limit": 100, "labels": true}
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({"error": "Expected a JSON object {\"query\": ...}"}), 400
+        params = body
+    else:
+        params = request.args
+    query = params.get("query", params.get("q"))
+    if not query or not isinstance(query, str):
+        return jsonify({"error": "No query provided"}), 400
+    try:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", DEFAULT_SCREEN_LIMIT))
+    except (TypeError, ValueError):
+        return jsonify({"error": "offset and limit must be integers."}), 400
+    if offset < 0 or not 1 <= limit <= MAX_SCREEN_LIMIT:
+        return jsonify({"error": f"offset must be >= 0 and limit between 1 and {MAX_SCREEN_LIMIT}."}), 400
+    with_labels = str(params.get("labels", "0")).lower() in ("1", "true", "yes")
+
+    # Bitwise ops over the bundle's precomputed label bitsets; the model is never called
+    bundle = current_bundle()
+    try:
+        canonical, total, rows = bundle.screener.screen(query, offset, limit)
+    except QueryError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    symbols = bundle.feature_store.symbols
+    if with_labels:
+        results = [{"ticker": symbols[r], "labels": dict(zip(bundle.label_cols, bundle.predictions[r].tolist()))}
+                   for r in rows.tolist()]
+    else:
+        results = [symbols[r] for r in rows.tolist()]
+
+    return jsonify({
+        "query": canonical,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "results": results,
+        "version": bundle.version,
+    })
+
+
+@app.route("/metrics/batching", methods=["GET"])
+def batching_metrics():
+    # Counters for tuning PREDICT_MAX_BATCH_SIZE / PREDICT_MAX_WAIT_MS; ?reset=1 clears them
+    if batcher is None:
+        return jsonify({"enabled": False})
+    reset = request.args.get("reset", default="0") == "1"
+    return jsonify({"enabled": True, **batcher.stats(reset=reset)})
+
+
 if __name__ == "__main__":
-    # Run on port 5000 (default) accessible from localhost
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    # Run on port 5000 (default) accessible from localhost; threaded so requests can coalesce.
+    # The port is bound right away; /readyz turns 200 once the warm-up thread finishes.
+    install_reload_signal()
+    start_warmup()
+    app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
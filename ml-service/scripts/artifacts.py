@@ -0,0 +1,228 @@
+# scripts/artifacts.py
+
+import hashlib
+import os
+import threading
+import time
+
+
+class ArtifactBundle:
+    """
+    One immutable, fully-loaded version of the serving artifacts.
+
+    Request handlers grab `manager.current` once and use only that bundle, so a
+    reload that swaps in a new bundle never changes the model, scaler or feature
+    store underneath a request that is already running.
+    """
+
+    __slots__ = ("version", "model", "scaler", "feature_store", "sector_cols", "feature_cols",
+                 "label_cols", "sources", "loaded_at", "load_seconds", "predictions", "screener",
+                 "indexes", "history", "sectors")
+
+    def __init__(self, version, model, scaler, feature_store, sector_cols, feature_cols, label_cols,
+                 sources, load_seconds=None):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.feature_store = feature_store
+        self.sector_cols = sector_cols
+        self.feature_cols = feature_cols
+        self.label_cols = label_cols
+        self.sources = sources
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        # Derived from the whole universe at load time (see app.index_universe)
+        self.predictions = None  # bool (n_rows, n_labels): label >= 0.5 for every row
+        self.screener = None     # LabelBitmaps over `predictions`
+        self.indexes = {}        # embedding name -> VectorIndex
+        self.history = {}        # "price" / "fundamentals" -> FeatureHistory (for as-of predictions)
+        self.sectors = None      # FeatureHistory of per-symbol Sector_* one-hots, incl. delisted tickers
+
+    def predict(self, feats):
+        """Forward pass on this bundle's model (also the micro-batcher's predict_fn for its requests)."""
+        return self.model.predict(feats, batch_size=len(feats), verbose=0)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "rows": len(self.feature_store),
+            "features": len(self.feature_cols),
+            "labels": len(self.label_cols),
+            "screener": self.screener.describe() if self.screener else None,
+            "indexes": {name: index.describe() for name, index in self.indexes.items()},
+            "history": {name: history.describe() for name, history in self.history.items()},
+            "sectors": self.sectors.describe() if self.sectors is not None else None,
+            "sources": {path: {"mtime": st[0], "size": st[1]} for path, st in self.sources.items()},
+        }
+
+
+def source_stats(paths):
+    """{path: (mtime, size)} for every existing path (directories: newest mtime, total size)."""
+    stats = {}
+    for path in paths:
+        if os.path.isdir(path):
+            mtime, size = 0.0, 0
+            for root, _, files in os.walk(path):
+                for name in files:
+                    st = os.stat(os.path.join(root, name))
+                    mtime, size = max(mtime, st.st_mtime), size + st.st_size
+            stats[path] = (mtime, size)
+        elif os.path.exists(path):
+            st = os.stat(path)
+            stats[path] = (st.st_mtime, st.st_size)
+    return stats
+
+
+class ArtifactManager:
+    """
+    Holds the current ArtifactBundle and replaces it when the files behind it change.
+
+    `loader(sources) -> ArtifactBundle` does the heavy work (load model, build the
+    feature store, warm-up forward pass) in whichever thread calls reload(); only
+    the final reference assignment is shared with request threads, so requests
+    never wait on a reload and in-flight ones finish on the version they started on.
+    `list_sources() -> [paths]` names the files to watch (resolved at every check,
+    so a table rewritten in another storage format is picked up too).
+    `on_swap(bundle)` is called after every successful swap (e.g. to mark the
+    service ready once any load succeeds, not just the first one).
+    """
+
+    def __init__(self, loader, list_sources, poll_interval=0.0, settle_seconds=2.0, history=20, on_swap=None):
+        self.loader = loader
+        self.list_sources = list_sources
+        self.on_swap = on_swap
+        self.poll_interval = float(poll_interval)
+        self.settle_seconds = float(settle_seconds)
+        self.current = None
+
+        self._reload_lock = threading.Lock()
+        self._counter = 0
+        self._history = []
+        self._history_size = history
+        self._last_error = None
+        self._failed_sources = None  # source stats of the last failed load (retried once they change)
+        self._reloading = False
+        self._watcher = None
+
+    # -------------------------
+    # Reloading
+    # -------------------------
+    def _version(self, stats):
+        digest = hashlib.sha1(repr(sorted(stats.items())).encode()).hexdigest()[:8]
+        return f"v{self._counter}-{digest}"
+
+    def changed(self):
+        """True when the watched files differ from the ones the current bundle was built from."""
+        if self.current is None:
+            return True
+        return source_stats(self.list_sources()) != self.current.sources
+
+    def reload(self, force=False, reason="manual"):
+        """
+        Build a new bundle and swap it in (blocking). Returns the serving version;
+        if the files are unchanged and not `force`, keeps the current bundle.
+        Loader errors are recorded and re-raised; the old bundle keeps serving.
+        """
+        with self._reload_lock:
+            stats = source_stats(self.list_sources())
+            if not force and self.current is not None and stats == self.current.sources:
+                return self.current.version
+            self._reloading = True
+            started = time.perf_counter()
+            try:
+                self._counter += 1
+                bundle = self.loader(stats)
+                bundle.version = self._version(stats)
+                bundle.sources = stats
+                bundle.load_seconds = round(time.perf_counter() - started, 4)
+            except Exception as exc:
+                self._last_error = {"at": time.time(), "reason": reason, "error": f"{type(exc).__name__}: {exc}"}
+                self._failed_sources = stats
+                print(f"[artifacts] reload ({reason}) FAILED: {self._last_error['error']}")
+                raise
+            finally:
+                self._reloading = False
+
+            previous = self.current
+            self.current = bundle  # the atomic swap: new requests see the new bundle from here on
+            self._last_error = None
+            self._failed_sources = None
+            self._history.append({"version": bundle.version, "at": bundle.loaded_at, "reason": reason,
+                                  "load_seconds": bundle.load_seconds,
+                                  "replaced": previous.version if previous else None})
+            del self._history[:-self._history_size]
+            print(f"[artifacts] serving {bundle.version} ({reason}, loaded in {bundle.load_seconds:.2f}s).")
+            if self.on_swap is not None:
+                self.on_swap(bundle)
+            return bundle.version
+
+    def request_reload(self, force=False, reason="signal"):
+        """Non-blocking reload (safe to call from a signal handler or a request)."""
+        def run():
+            try:
+                self.reload(force=force, reason=reason)
+            except Exception:
+                pass  # recorded in status()
+
+        thread = threading.Thread(target=run, name="artifact-reload", daemon=True)
+        thread.start()
+        return thread
+
+    # -------------------------
+    # Watching
+    # -------------------------
+    def start_watching(self):
+        """
+        Poll the watched files every `poll_interval` seconds (no-op when the interval
+        is 0). Also started after a failed first load, so fixed files are picked up.
+        """
+        if self.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="artifact-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        pending = None
+        while True:
+            time.sleep(self.poll_interval)
+            if self._reloading:
+                continue
+            # Compare against the serving bundle, or (nothing loaded yet) the files the last load failed on
+            baseline = self.current.sources if self.current is not None else self._failed_sources
+            if baseline is None:
+                continue
+            try:
+                stats = source_stats(self.list_sources())
+            except OSError:
+                continue
+            if stats == baseline:
+                pending = None
+                continue
+            # Wait until the files stop changing so a half-written artifact is never loaded
+            if pending is None or pending[0] != stats:
+                pending = (stats, time.monotonic())
+                continue
+            if time.monotonic() - pending[1] < self.settle_seconds:
+                continue
+            pending = None
+            try:
+                self.reload(reason="file change")
+            except Exception:
+                pass  # keep serving the old bundle; retried when the files change again
+
+    # -------------------------
+    # Introspection
+    # -------------------------
+    def status(self):
+        current = self.current
+        return {
+            "version": current.version if current else None,
+            "current": current.describe() if current else None,
+            "reloading": self._reloading,
+            "watching": self._watcher is not None,
+            "poll_interval_s": self.poll_interval,
+            "last_error": self._last_error,
+            "history": list(self._history),
+        }
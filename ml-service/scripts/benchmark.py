@@ -0,0 +1,445 @@
+# scripts/benchmark.py
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_labels import make_universe
+from labels import (DIVIDEND_LABELS, ECON_LABELS, SIZE_LABELS, STYLE_LABELS,
+                    compute_label_matrix, encode_sectors)
+from numpy_model import save_npz
+
+# ===========================
+# 1) SCALES & PATHS
+# ===========================
+# Reproducible end-to-end benchmark: deterministic synthetic raw data at a chosen
+# scale → time every pipeline stage → time /predict through the Flask test client.
+#
+#   python scripts/benchmark.py --scale small
+#   python scripts/benchmark.py --tickers 5000 --days 2520 --indicators 40
+#   python scripts/benchmark.py --compare data/benchmarks/OLD.json data/benchmarks/NEW.json
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR  = os.path.join(PROJECT_ROOT, "data", "benchmarks")
+
+SCALES = {
+    #          tickers  trading days  indicators  combined rows (serving / labels)
+    "small":  dict(tickers=200,    days=600,  indicators=8,  combined_rows=2_000),
+    "medium": dict(tickers=2_000,  days=1_500, indicators=30, combined_rows=50_000),
+    "large":  dict(tickers=10_000, days=2_520, indicators=60, combined_rows=500_000),
+}
+
+SEED = 42
+YEARS = [str(y) for y in range(2010, 2017)]  # same wide-by-year layout as indicators_by_company.csv
+CORE_INDICATORS = ["MarketCap", "RevenueGrowth", "PE", "DividendYield"]
+NUMERIC_COLS = ["MarketCap", "RevenueGrowth", "PE", "DividendYield", "volatility", "momentum"]
+
+
+def symbol_name(i):
+    return f"T{i:05d}"
+
+
+# ===========================
+# 2) SYNTHETIC DATA GENERATORS
+# ===========================
+def make_prices(n_tickers, n_days, seed=SEED):
+    """
+    prices.csv rows (Date, Symbol, Open, Close, Volume), sorted by date like a vendor
+    export. Closes follow a geometric random walk; each ticker lists on a random day
+    in the first half of the window, so some histories are too short for full windows.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2010-01-04", periods=n_days)
+    first_day = rng.integers(0, max(1, n_days // 2), size=n_tickers)
+    lengths = n_days - first_day
+
+    sym = np.repeat(np.arange(n_tickers), lengths)
+    day = np.concatenate([np.arange(f, n_days) for f in first_day]) if n_tickers else np.empty(0, dtype=np.int64)
+    log_ret = rng.normal(0.0003, 0.02, size=sym.size)
+    # Restart the cumulative walk at each ticker's first row
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if n_tickers else np.empty(0, dtype=np.int64)
+    walk = np.cumsum(log_ret)
+    walk -= np.repeat(walk[starts] - log_ret[starts], lengths)
+    close = np.repeat(rng.uniform(5, 300, size=n_tickers), lengths) * np.exp(walk)
+
+    order = np.lexsort((sym, day))
+    return pd.DataFrame({
+        "Date": dates[day[order]].strftime("%Y-%m-%d"),
+        "Symbol": np.array([symbol_name(i) for i in range(n_tickers)], dtype=object)[sym[order]],
+        "Open": np.round(close[order] * (1 + rng.normal(0, 0.005, size=sym.size)), 4),
+        "Close": np.round(close[order], 4),
+        "Volume": rng.integers(1_000, 5_000_000, size=sym.size),
+    })
+
+
+def make_indicators(n_tickers, n_indicators, seed=SEED, missing=0.05):
+    """indicators_by_company.csv: one row per (company_id, indicator_id), one column per year."""
+    rng = np.random.default_rng(seed + 1)
+    extra = [f"IND{j:03d}" for j in range(max(0, n_indicators - len(CORE_INDICATORS)))]
+    indicators = CORE_INDICATORS[:n_indicators] + extra
+    n_rows = n_tickers * len(indicators)
+
+    generators = {
+        "MarketCap": lambda n: rng.lognormal(mean=21.0, sigma=2.0, size=n),
+        "RevenueGrowth": lambda n: rng.normal(0.08, 0.20, size=n),
+        "PE": lambda n: rng.normal(20.0, 10.0, size=n),
+        "DividendYield": lambda n: np.where(rng.random(n) < 0.4, 0.0, rng.uniform(0, 0.08, size=n)),
+    }
+    values = np.empty((n_rows, len(YEARS)))
+    for j, name in enumerate(indicators):
+        gen = generators.get(name, lambda n: rng.normal(0.0, 1.0, size=n))
+        values[j::len(indicators)] = gen(n_tickers * len(YEARS)).reshape(n_tickers, len(YEARS))
+    values[rng.random(values.shape) < missing] = np.nan
+
+    df = pd.DataFrame(values, columns=YEARS)
+    df.insert(0, "indicator_id", np.tile(indicators, n_tickers))
+    df.insert(0, "company_id", np.repeat([symbol_name(i) for i in range(n_tickers)], len(indicators)))
+    return df
+
+
+def make_companies(n_tickers, seed=SEED):
+    """companies.csv: company_id, name_latest, names_previous (about a fifth renamed)."""
+    rng = np.random.default_rng(seed + 2)
+    renamed = rng.random(n_tickers) < 0.2
+    return pd.DataFrame({
+        "company_id": [symbol_name(i) for i in range(n_tickers)],
+        "name_latest": [f"Company {i}" for i in range(n_tickers)],
+        "names_previous": [f"Old Company {i}" if r else None for i, r in enumerate(renamed)],
+    })
+
+
+def make_combined(n_rows, seed=SEED):
+    """
+    combined_data.csv as the serving side sees it: symbol, the numeric features, the
+    raw sector (for labels) and its Sector_* one-hots (for the feature matrix).
+    """
+    df = make_universe(n_rows, seed)
+    df["symbol"] = [symbol_name(i) for i in range(n_rows)]
+    rng = np.random.default_rng(seed + 3)
+    df["volatility"] = rng.uniform(0.005, 0.05, size=n_rows)
+    df["momentum"] = rng.normal(0.0, 0.01, size=n_rows)
+    df = df.dropna(subset=NUMERIC_COLS).reset_index(drop=True)
+
+    codes, sector_cols, code_to_col, _ = encode_sectors(df["sector"])
+    onehot = np.zeros((len(df), len(sector_cols)), dtype=np.int64)
+    has = codes >= 0
+    onehot[np.flatnonzero(has), code_to_col[codes[has]]] = 1
+    return pd.concat([df, pd.DataFrame(onehot, columns=sector_cols)], axis=1)
+
+
+def make_numpy_model(path, combined, seed=SEED):
+    """Random-weight model.npz with train_model.build_model's shape, matching `combined`'s columns."""
+    rng = np.random.default_rng(seed + 4)
+    sector_cols = sorted(c for c in combined.columns if c.startswith("Sector_"))
+    label_cols = SIZE_LABELS + STYLE_LABELS + ECON_LABELS + sector_cols + DIVIDEND_LABELS
+    feature_names = NUMERIC_COLS + sector_cols
+    sizes = [len(feature_names), 128, 64, len(label_cols)]
+    layers = [
+        (rng.normal(0, 1 / np.sqrt(n_in), size=(n_in, n_out)).astype(np.float32),
+         np.zeros(n_out, dtype=np.float32), act)
+        for n_in, n_out, act in zip(sizes[:-1], sizes[1:], ["relu", "relu", "sigmoid"])
+    ]
+    numeric = combined[NUMERIC_COLS].to_numpy(dtype=np.float64)
+    save_npz(path, layers, feature_names, label_cols, numeric.mean(axis=0), numeric.std(axis=0) + 1e-12)
+
+
+def write_dataset(workspace, tickers, days, indicators, seed=SEED):
+    """Write the three raw CSVs under workspace/data/raw; returns their row counts."""
+    raw = os.path.join(workspace, "data", "raw")
+    os.makedirs(raw, exist_ok=True)
+    os.makedirs(os.path.join(workspace, "data", "processed"), exist_ok=True)
+    frames = {
+        "prices.csv": make_prices(tickers, days, seed),
+        "indicators_by_company.csv": make_indicators(tickers, indicators, seed),
+        "companies.csv": make_companies(tickers, seed),
+    }
+    for name, df in frames.items():
+        df.to_csv(os.path.join(raw, name), index=False)
+    return {name: len(df) for name, df in frames.items()}
+
+
+# ===========================
+# 3) PIPELINE STAGES
+# ===========================
+@contextlib.contextmanager
+def patched(module, **attrs):
+    """Temporarily point a script's module-level path constants somewhere else."""
+    saved = {k: getattr(module, k) for k in attrs}
+    for k, v in attrs.items():
+        setattr(module, k, v)
+    try:
+        yield module
+    finally:
+        for k, v in saved.items():
+            setattr(module, k, v)
+
+
+def timed(fn, repeats):
+    """(best, median, all) wall seconds over `repeats` calls, script output silenced."""
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return {"best_s": round(min(times), 6), "median_s": round(float(np.median(times)), 6),
+            "runs_s": [round(t, 6) for t in times]}
+
+
+def bench_pipeline(workspace, rows, repeats, workers, combined_rows):
+    import compute_price_features as cpf
+    import merge_all_features as maf
+    import merge_fundamentals as mf
+
+    raw = os.path.join(workspace, "data", "raw")
+    processed = os.path.join(workspace, "data", "processed")
+    report_args = ["--report-dir", os.path.join(workspace, "reports")]
+    results = {}
+
+    def record(name, timing, n_rows):
+        timing["rows"] = n_rows
+        timing["rows_per_s"] = round(n_rows / timing["best_s"], 1) if timing["best_s"] else None
+        results[name] = timing
+        print(f"  {name:32s} best {timing['best_s'] * 1000:10.1f} ms  ({n_rows:,} rows)")
+
+    with patched(mf, PROCESSED_DIR=processed,
+                 INDICATORS_CSV=os.path.join(raw, "indicators_by_company.csv"),
+                 COMPANIES_CSV=os.path.join(raw, "companies.csv"),
+                 FUNDAMENTALS_CLEAN=os.path.join(processed, "fundamentals_clean.csv"),
+                 FUNDAMENTALS_CUBE=os.path.join(processed, "fundamentals_cube.npz")):
+        record("merge_fundamentals", timed(lambda: mf.main(report_args), repeats),
+               rows["indicators_by_company.csv"])
+
+    with patched(cpf, PROCESSED_DIR=processed,
+                 PRICES_CSV=os.path.join(raw, "prices.csv"),
+                 PRICE_FEATURES_CSV=os.path.join(processed, "price_features.csv")):
+        record("compute_price_features", timed(lambda: cpf.main(report_args), repeats), rows["prices.csv"])
+        if workers > 1:
+            argv = report_args + ["--workers", str(workers)]
+            record(f"compute_price_features[workers={workers}]",
+                   timed(lambda: cpf.main(argv), repeats), rows["prices.csv"])
+
+    with patched(maf, PROCESSED_DIR=processed,
+                 FUND_CLEAN_CSV=os.path.join(processed, "fundamentals_clean.csv"),
+                 PRICE_FEATS_CSV=os.path.join(processed, "price_features.csv"),
+                 COMBINED_OUTPUT_CSV=os.path.join(processed, "combined_data.csv")):
+        record("merge_all_features", timed(lambda: maf.main(report_args), repeats), rows["companies.csv"])
+
+    # Label engine on a training-sized universe (the real combined_data has no sector yet)
+    universe = make_universe(combined_rows)
+    record("labels.compute_label_matrix", timed(lambda: compute_label_matrix(universe), repeats), combined_rows)
+    return results
+
+
+# ===========================
+# 4) SERVING
+# ===========================
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000.0
+    return {f"p{q}_ms": round(float(np.percentile(ms, q)), 3) for q in (50, 90, 95, 99)} | {
+        "mean_ms": round(float(ms.mean()), 3), "max_ms": round(float(ms.max()), 3)}
+
+
+def load_app(workspace):
+    """
+    Import scripts/app.py fresh against `workspace` (NumPy backend, synthetic model.npz).
+    Returns (module, import seconds, warm-up seconds).
+    """
+    os.environ["INFERENCE_BACKEND"] = "numpy"
+    os.environ["APP_WARMUP_ON_IMPORT"] = "0"
+    sys.modules.pop("app", None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        app_module = importlib.import_module("app")
+        import_s = time.perf_counter() - t0
+
+        cwd = os.getcwd()
+        os.chdir(workspace)  # app.py resolves its artifact paths against the working directory
+        try:
+            t0 = time.perf_counter()
+            app_module.start_warmup()
+        finally:
+            os.chdir(cwd)
+        app_module.wait_until_ready()
+        warmup_s = time.perf_counter() - t0
+    return app_module, import_s, warmup_s
+
+
+def bench_serving(workspace, combined_rows, n_requests, concurrency, batch_size, seed=SEED):
+    combined = make_combined(combined_rows, seed)
+    combined.to_csv(os.path.join(workspace, "data", "processed", "combined_data.csv"), index=False)
+    make_numpy_model(os.path.join(workspace, "model.npz"), combined, seed)
+
+    app_module, import_s, warmup_s = load_app(workspace)
+    tickers = combined["symbol"].to_numpy()
+    rng = np.random.default_rng(seed)
+    results = {"rows": len(combined), "import_s": round(import_s, 4), "warmup_s": round(warmup_s, 4),
+               "micro_batching": app_module.batcher is not None}
+    print(f"  app import {import_s * 1000:.1f} ms, warm-up ({len(combined):,} rows) {warmup_s * 1000:.1f} ms")
+
+    client = app_module.app.test_client()
+    for t in tickers[:20]:  # warm-up
+        client.get(f"/predict?ticker={t}")
+
+    # Sequential single-ticker latency
+    latencies = []
+    for t in rng.choice(tickers, size=n_requests):
+        t0 = time.perf_counter()
+        resp = client.get(f"/predict?ticker={t}")
+        latencies.append(time.perf_counter() - t0)
+        if resp.status_code != 200:
+            raise RuntimeError(f"/predict?ticker={t} returned {resp.status_code}: {resp.get_data(as_text=True)}")
+    results["predict_sequential"] = percentiles(latencies) | {
+        "requests": n_requests, "throughput_rps": round(n_requests / sum(latencies), 1)}
+    print(f"  /predict sequential      p50 {results['predict_sequential']['p50_ms']:.2f} ms  "
+          f"p99 {results['predict_sequential']['p99_ms']:.2f} ms")
+
+    # Concurrent single-ticker throughput (one test client per thread)
+    per_thread = max(1, n_requests // concurrency)
+    lat_by_thread = [[] for _ in range(concurrency)]
+
+    def worker(k):
+        c = app_module.app.test_client()
+        for t in np.random.default_rng(seed + k).choice(tickers, size=per_thread):
+            t0 = time.perf_counter()
+            c.get(f"/predict?ticker={t}")
+            lat_by_thread[k].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(concurrency)]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    total = per_thread * concurrency
+    results["predict_concurrent"] = percentiles([x for lat in lat_by_thread for x in lat]) | {
+        "requests": total, "concurrency": concurrency, "throughput_rps": round(total / elapsed, 1)}
+    print(f"  /predict x{concurrency} threads      {results['predict_concurrent']['throughput_rps']:,.0f} req/s")
+
+    # Batch endpoint
+    n_batches = max(1, n_requests // batch_size)
+    latencies = []
+    for _ in range(n_batches):
+        body = rng.choice(tickers, size=batch_size).tolist()
+        t0 = time.perf_counter()
+        client.post("/predict/batch", json=body)
+        latencies.append(time.perf_counter() - t0)
+    results["predict_batch"] = percentiles(latencies) | {
+        "requests": n_batches, "batch_size": batch_size,
+        "tickers_per_s": round(n_batches * batch_size / sum(latencies), 1)}
+    print(f"  /predict/batch ({batch_size})     {results['predict_batch']['tickers_per_s']:,.0f} tickers/s")
+
+    if app_module.batcher is not None:
+        results["batching_stats"] = app_module.batcher.stats()
+    return results
+
+
+# ===========================
+# 5) RESULTS
+# ===========================
+def environment():
+    return {"python": sys.version.split()[0], "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'metric':48s} {'old':>10s} {'new':>10s} {'ratio':>7s}")
+
+    def row(name, a, b):
+        ratio = f"{b / a:7.2f}" if a and b is not None else "      -"
+        print(f"{name:48s} {a if a is not None else '-':>10} {b if b is not None else '-':>10} {ratio}")
+
+    for stage, t in new.get("pipeline", {}).items():
+        row(f"pipeline/{stage} best_s", old.get("pipeline", {}).get(stage, {}).get("best_s"), t["best_s"])
+    for section, metrics in new.get("serving", {}).items():
+        if isinstance(metrics, dict) and section != "batching_stats":
+            for key in ("p50_ms", "p99_ms", "throughput_rps", "tickers_per_s"):
+                if key in metrics:
+                    row(f"serving/{section} {key}", old.get("serving", {}).get(section, {}).get(key), metrics[key])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ML pipeline stages and /predict on synthetic data.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--tickers", type=int, help="Override the scale's ticker count.")
+    parser.add_argument("--days", type=int, help="Override the scale's trading-day count.")
+    parser.add_argument("--indicators", type=int, help="Override the scale's indicators per company.")
+    parser.add_argument("--combined-rows", type=int, help="Override the scale's serving/label universe size.")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per pipeline stage (best and median kept).")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Also time compute_price_features --workers N (1 to skip).")
+    parser.add_argument("--requests", type=int, default=2000, help="/predict requests per serving scenario.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100, help="Tickers per /predict/batch call.")
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--skip-serving", action="store_true")
+    parser.add_argument("--workspace", help="Keep generated data here instead of a temp directory.")
+    parser.add_argument("--output", help=f"Results JSON (default {RESULTS_DIR}/benchmark-<timestamp>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files and exit.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    params = dict(SCALES[args.scale])
+    for key in ("tickers", "days", "indicators", "combined_rows"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+
+    workspace = args.workspace or tempfile.mkdtemp(prefix="investimate_bench_")
+    results = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "scale": args.scale, "params": params,
+               "seed": args.seed, "repeats": args.repeats, "environment": environment()}
+    try:
+        # 1) Generate raw data
+        print(f"Generating synthetic data ({params}) under {workspace} …")
+        t0 = time.perf_counter()
+        results["dataset_rows"] = write_dataset(workspace, params["tickers"], params["days"],
+                                                params["indicators"], args.seed)
+        print(f"  → {results['dataset_rows']} in {time.perf_counter() - t0:.1f}s")
+
+        # 2) Pipeline stages
+        if not args.skip_pipeline:
+            print("Timing pipeline stages …")
+            results["pipeline"] = bench_pipeline(workspace, results["dataset_rows"], args.repeats,
+                                                 args.workers, params["combined_rows"])
+
+        # 3) Serving
+        if not args.skip_serving:
+            print("Timing /predict through the Flask test client …")
+            results["serving"] = bench_serving(workspace, params["combined_rows"], args.requests,
+                                               args.concurrency, args.batch_size, args.seed)
+    finally:
+        if not args.workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    # 4) Save results
+    out = args.output or os.path.join(RESULTS_DIR, f"benchmark-{args.scale}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# scripts/benchmark_labels.py
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from labels import SIZE_THRESHOLDS, STYLE_THRESHOLDS, CYCLICAL_SECTORS, compute_label_matrix
+
+SECTORS = [
+    "Technology", "Consumer Discretionary", "Materials", "Industrials", "Energy",
+    "Communication Services", "Health Care", "Financials", "Utilities",
+    "Consumer Staples", "Real Estate",
+]
+SEED = 42
+
+
+def make_universe(n_rows, seed=SEED):
+    """Synthetic combined_data-like frame with realistic ranges and ~2% missing values."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "symbol": [f"SYN{i:07d}" for i in range(n_rows)],
+        "MarketCap": rng.lognormal(mean=21.0, sigma=2.0, size=n_rows),
+        "RevenueGrowth": rng.normal(0.08, 0.20, size=n_rows),
+        "PE": rng.normal(20.0, 10.0, size=n_rows),
+        "DividendYield": np.where(rng.random(n_rows) < 0.4, 0.0, rng.uniform(0, 0.08, size=n_rows)),
+        "sector": rng.choice(SECTORS, size=n_rows),
+    })
+    for col in ["MarketCap", "RevenueGrowth", "PE", "DividendYield", "sector"]:
+        df.loc[rng.random(n_rows) < 0.02, col] = np.nan
+    return df
+
+
+def legacy_labels(df):
+    """
+    The previous compute_labels + build_label_matrix (per-row apply, one pass per
+    sector): the timing baseline here and the reference tests/test_labels.py checks
+    compute_label_matrix against.
+    """
+    df = df.copy()
+    mc = df["MarketCap"].fillna(0).astype(float)
+    df["LargeCap"] = (mc >= SIZE_THRESHOLDS["LargeCap"]).astype(int)
+    df["MidCap"]   = ((mc >= SIZE_THRESHOLDS["MidCap_min"]) & (mc < SIZE_THRESHOLDS["MidCap_max"])).astype(int)
+    df["SmallCap"] = ((mc >= SIZE_THRESHOLDS["SmallCap_min"]) & (mc < SIZE_THRESHOLDS["SmallCap_max"])).astype(int)
+    df["MicroCap"] = (mc < SIZE_THRESHOLDS["MicroCap_max"]).astype(int)
+    df["GrowthStock"] = (df["RevenueGrowth"].fillna(0) >= STYLE_THRESHOLDS["GrowthStock_rev_growth"]).astype(int)
+    df["ValueStock"]  = (df["PE"].fillna(9999) <= STYLE_THRESHOLDS["ValueStock_pe"]).astype(int)
+    df["IncomeStock"] = (df["DividendYield"].fillna(0) >= STYLE_THRESHOLDS["IncomeStock_div_yield"]).astype(int)
+    df["BlueChipStock"] = ((df["LargeCap"] == 1) & (df["IncomeStock"] == 1)).astype(int)
+    df["Cyclical"]  = df["sector"].apply(lambda s: 1 if s in CYCLICAL_SECTORS else 0).astype(int)
+    df["Defensive"] = (1 - df["Cyclical"]).astype(int)
+    for sect in sorted(df["sector"].dropna().unique()):
+        df[f"Sector_{sect.replace(' ', '')}"] = (df["sector"] == sect).astype(int)
+    df["DividendStock"]    = (df["DividendYield"].fillna(0) > 0).astype(int)
+    df["NonDividendStock"] = (1 - df["DividendStock"]).astype(int)
+
+    label_cols = ["LargeCap", "MidCap", "SmallCap", "MicroCap",
+                  "GrowthStock", "ValueStock", "IncomeStock", "BlueChipStock",
+                  "Cyclical", "Defensive"]
+    label_cols += sorted([c for c in df.columns if c.startswith("Sector_")])
+    label_cols += ["DividendStock", "NonDividendStock"]
+    return df[label_cols].values.astype(int), label_cols
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark label generation on a synthetic universe.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"Generating synthetic universe with {args.rows:,} rows ...")
+    df = make_universe(args.rows)
+
+    t_legacy, (y_legacy, _) = best_of(lambda: legacy_labels(df), args.repeats)
+    t_engine, (y_engine, cols_engine) = best_of(lambda: compute_label_matrix(df), args.repeats)
+
+    print(f"  legacy compute_labels : {t_legacy * 1000:9.1f} ms  ({y_legacy.nbytes / 1e6:7.1f} MB labels)")
+    print(f"  compute_label_matrix  : {t_engine * 1000:9.1f} ms  ({y_engine.nbytes / 1e6:7.1f} MB labels)")
+    print(f"  speedup               : {t_legacy / t_engine:9.1f}x  ({len(cols_engine)} label columns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
 # File: ml-service/scripts/compute_price_features.py
 
+import hashlib
+import io
 import os
+import math
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 
+import instrumentation
+import storage
+from feature_history import FeatureHistory
+
 # ===========================
 # 1) HARDCODED FILEPATHS
 # ===========================
@@ -12,75 +24,729 @@ PROCESSED_DIR      = os.path.join(PROJECT_ROOT, "data", "processed")
 
 PRICES_CSV         = os.path.join(RAW_DIR, "prices.csv")
 PRICE_FEATURES_CSV = os.path.join(PROCESSED_DIR, "price_features.csv")
+PRICE_STATE_NPZ    = os.path.join(PROCESSED_DIR, "price_state.npz")  # incremental-mode state
+PRICE_HISTORY_DIR  = os.path.join(PROCESSED_DIR, "history", "price_features")  # --history (as-of store)
 
 # ===========================
 # 2) PARAMETERS
 # ===========================
 VOL_WINDOW = 252   # ~1 year of trading days
 MOM_WINDOW = 126   # ~6 months of trading days
+VOL_CHUNK  = 1 << 14  # rolling windows per exact std pass (VOL_CHUNK x VOL_WINDOW floats of scratch)
 
-def main():
-    # 2.1 Ensure processed directory exists
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
+# Column names in prices.csv. Replace these with whatever your CSV actually has.
+# For example, if your header is ['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume'],
+# use those exact names here:
+TIMESTAMP_COL = "Date"    # e.g., actual CSV header for date
+SYMBOL_COL    = "Symbol"  # e.g., actual CSV header for symbol
+CLOSE_COL     = "Close"   # e.g., actual CSV header for closing price
 
-    # 2.2 First, load only the header row to see actual column names
-    print(f"Inspecting columns in {PRICES_CSV} …")
-    try:
-        df_header = pd.read_csv(PRICES_CSV, nrows=0)
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Could not find '{PRICES_CSV}'. Please ensure it exists under ml-service/data/raw/."
+# Chunked mode (--chunked): default memory budget and the rough factor by which a
+# parsed DataFrame (plus sort/feature temporaries) outgrows its raw CSV bytes
+MEMORY_BUDGET_MB = 1024
+PARSE_EXPANSION  = 6
+
+# Incremental mode: bytes hashed at each end of the consumed prefix of prices.csv to
+# tell an append (prefix unchanged) from a rewrite of the file
+PREFIX_SAMPLE_BYTES = 1 << 16
+
+# ===========================
+# 3) VECTORIZED FEATURE ENGINE
+# ===========================
+# All functions below work on flat NumPy arrays of a frame sorted by (symbol, date).
+# Each symbol is a contiguous segment [starts[k], ends[k]), so no groupby/apply is needed.
+
+def segment_bounds(symbol_codes):
+    """Start/end offsets of each contiguous run of equal codes in a symbol-sorted array."""
+    codes = np.asarray(symbol_codes)
+    if codes.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    change = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate(([0], change)).astype(np.int64)
+    ends = np.concatenate((change, [codes.size])).astype(np.int64)
+    return starts, ends
+
+
+def forward_fill(close, starts):
+    """Forward-fill NaN closes without crossing symbol boundaries (leading NaNs stay NaN)."""
+    close = np.asarray(close, dtype=np.float64)
+    if close.size == 0:
+        return close
+    # Carry the last valid position; each segment start resets the carry
+    pos = np.where(np.isnan(close), 0, np.arange(close.size))
+    pos[starts] = starts
+    return close[np.maximum.accumulate(pos)]
+
+
+def daily_returns(close, starts, ends):
+    """
+    Per-symbol pct_change of `close`. Like pandas' default (fill_method="pad"), NaN
+    closes are forward-filled within the symbol first; the first row of a symbol is NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = close.size
+    filled = forward_fill(close, starts)
+
+    returns = np.full(n, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = filled[1:] / filled[:-1] - 1.0
+    returns[starts] = np.nan
+    return returns
+
+
+def rolling_volatility(returns, starts, ends, window=VOL_WINDOW):
+    """
+    Full time series of rolling std (ddof=1, min_periods=window) per symbol. NaN
+    wherever the window crosses the start of the symbol or contains a NaN or ±inf
+    return (a zero close followed by a nonzero one), like pandas.
+
+    Each window's std is taken over its own mean-centred values (a strided view,
+    VOL_CHUNK windows at a time), not as a difference of cumulative sums: that
+    difference cancels catastrophically after one huge return, corrupting every
+    later window of every later symbol.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n = returns.size
+    valid = np.isfinite(returns)
+    r = np.where(valid, returns, 0.0)
+    cnan = np.concatenate(([0], np.cumsum(~valid)))
+
+    vol = np.full(n, np.nan)
+    if n >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(r, window)  # row j = r[j : j + window]
+        for start in range(0, len(windows), VOL_CHUNK):
+            block = windows[start:start + VOL_CHUNK]
+            vol[start + window - 1 : start + window - 1 + len(block)] = block.std(axis=1, ddof=1)
+
+    i = np.arange(n)
+    lo = i - window + 1
+    seg_start = np.repeat(starts, ends - starts)
+    ok = lo >= seg_start
+    lo = np.maximum(lo, 0)
+    vol[~ok | (cnan[i + 1] - cnan[lo] > 0)] = np.nan
+    return vol
+
+
+def rolling_momentum(close, starts, ends, window=MOM_WINDOW):
+    """Full time series of close / close.shift(window) - 1 per symbol."""
+    close = np.asarray(close, dtype=np.float64)
+    n = close.size
+    mom = np.full(n, np.nan)
+    i = np.arange(window, n)
+    seg_start = np.repeat(starts, ends - starts)
+    ok = i - window >= seg_start[window:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom[i[ok]] = close[i[ok]] / close[i[ok] - window] - 1.0
+    return mom
+
+
+def latest_features(close, returns, starts, ends, vol_window=VOL_WINDOW, mom_window=MOM_WINDOW):
+    """
+    Fast path: volatility & momentum for the LAST row of each symbol only.
+    Gathers just the final `vol_window` returns / `mom_window`-lagged close per
+    symbol, so the full feature time series is never materialized.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.asarray(returns, dtype=np.float64)
+    last = ends - 1
+    n_sym = starts.size
+
+    vol = np.full(n_sym, np.nan)
+    has_vol = (ends - starts) >= vol_window
+    if has_vol.any():
+        idx = last[has_vol][:, None] - np.arange(vol_window - 1, -1, -1)
+        # std propagates NaN (and inf → NaN), matching rolling(min_periods=vol_window)
+        with np.errstate(invalid="ignore"):
+            vol[has_vol] = returns[idx].std(axis=1, ddof=1)
+
+    mom = np.full(n_sym, np.nan)
+    has_mom = last - mom_window >= starts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom[has_mom] = close[last[has_mom]] / close[last[has_mom] - mom_window] - 1.0
+    return vol, mom
+
+
+def sort_prices(df):
+    """Drop rows without a symbol and sort by (symbol, date) so symbols are contiguous."""
+    df = df[df["symbol"].notna()]
+    return df.sort_values(["symbol", "date"], kind="stable").reset_index(drop=True)
+
+
+def symbol_segments(df):
+    """Segment bounds for a frame already sorted by sort_prices()."""
+    codes = pd.factorize(df["symbol"], sort=False)[0]
+    return segment_bounds(codes)
+
+
+def compute_feature_series(df):
+    """
+    Full per-row volatility & momentum series for a frame sorted by sort_prices().
+    Returns a frame with columns: symbol, date, close, return, volatility, momentum.
+    """
+    starts, ends = symbol_segments(df)
+    close = df["close"].to_numpy(dtype=np.float64)
+    returns = daily_returns(close, starts, ends)
+    return pd.DataFrame({
+        "symbol": df["symbol"].to_numpy(),
+        "date": df["date"].to_numpy(),
+        "close": close,
+        "return": returns,
+        "volatility": rolling_volatility(returns, starts, ends, VOL_WINDOW),
+        "momentum": rolling_momentum(close, starts, ends, MOM_WINDOW),
+    })
+
+
+def compute_latest_features(df, workers=1):
+    """
+    Latest (symbol, date, volatility, momentum) per ticker for a frame sorted by
+    sort_prices(), ordered by that latest date (ties by symbol). With workers > 1
+    the symbols are sharded across a process pool (see latest_features_parallel).
+    """
+    starts, ends = symbol_segments(df)
+    close = df["close"].to_numpy(dtype=np.float64)
+    if workers > 1 and starts.size > 1:
+        vol, mom = latest_features_parallel(close, starts, ends, workers)
+    else:
+        returns = daily_returns(close, starts, ends)
+        vol, mom = latest_features(close, returns, starts, ends, VOL_WINDOW, MOM_WINDOW)
+    last = ends - 1
+    latest = pd.DataFrame({
+        "symbol": df["symbol"].to_numpy()[last],
+        "date": df["date"].to_numpy()[last],
+        "volatility": vol,
+        "momentum": mom,
+    })
+    return order_latest(latest)
+
+
+def order_latest(latest):
+    """Canonical output order for price_features: by latest date, then symbol."""
+    latest = latest.assign(symbol=latest["symbol"].astype(str))
+    return latest.sort_values(["date", "symbol"], kind="stable").reset_index(drop=True)
+
+
+# ===========================
+# 4) INCREMENTAL STATE
+# ===========================
+class PriceFeatureState:
+    """
+    Compact per-symbol state for the incremental mode (--incremental).
+
+    Per symbol: a ring buffer of the last VOL_WINDOW returns with a running count
+    of non-finite ones, a ring buffer of the last MOM_WINDOW + 1 closes,
+    the last (forward-filled) close and the last date consumed. Slots are NaN
+    until filled, so "window complete" is simply "no NaN (or inf) in the window".
+    `offset` is the byte position in prices.csv up to which rows were consumed and
+    `prefix_hash` a fingerprint of those bytes (see prefix_fingerprint).
+    """
+
+    def __init__(self, vol_window=VOL_WINDOW, mom_window=MOM_WINDOW):
+        self.vol_window = vol_window
+        self.mom_window = mom_window
+        self.symbols = []
+        self.index = {}
+        self.last_date = np.zeros(0, dtype="datetime64[ns]")
+        self.last_close = np.zeros(0)
+        self.ret_buf = np.zeros((0, vol_window))
+        self.ret_pos = np.zeros(0, dtype=np.int64)
+        self.ret_nans = np.zeros(0, dtype=np.int64)
+        self.close_buf = np.zeros((0, mom_window + 1))
+        self.close_pos = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+        self.prefix_hash = ""
+
+    # -------------------------
+    # Construction
+    # -------------------------
+    @classmethod
+    def from_history(cls, df, vol_window=VOL_WINDOW, mom_window=MOM_WINDOW):
+        """Vectorized bootstrap from a full-history frame sorted by sort_prices()."""
+        state = cls(vol_window, mom_window)
+        starts, ends = symbol_segments(df)
+        close = df["close"].to_numpy(dtype=np.float64)
+        filled = forward_fill(close, starts)
+        returns = daily_returns(close, starts, ends)
+        last = ends - 1
+
+        # Last `window` values per symbol, oldest first, NaN-padded before the segment start
+        def tail_window(values, window):
+            idx = last[:, None] - np.arange(window - 1, -1, -1)
+            buf = values[np.maximum(idx, 0)]
+            buf[idx < starts[:, None]] = np.nan
+            return buf
+
+        state.symbols = [str(s) for s in df["symbol"].to_numpy()[last]]
+        state.index = {s: i for i, s in enumerate(state.symbols)}
+        state.last_date = df["date"].to_numpy(dtype="datetime64[ns]")[last]
+        state.last_close = filled[last]
+        state.ret_buf = tail_window(returns, vol_window)
+        state.ret_pos = np.zeros(len(last), dtype=np.int64)  # oldest slot = next write slot
+        state.close_buf = tail_window(close, mom_window + 1)
+        state.close_pos = np.zeros(len(last), dtype=np.int64)
+        state._count_gaps()
+        return state
+
+    def _count_gaps(self):
+        """Non-finite returns (NaN or ±inf) per buffer; they count as gaps, like rolling_volatility()."""
+        self.ret_nans = (~np.isfinite(self.ret_buf)).sum(axis=1).astype(np.int64)
+
+    def _grow(self, new_symbols):
+        k = len(new_symbols)
+        for sym in new_symbols:
+            self.index[sym] = len(self.symbols)
+            self.symbols.append(sym)
+        self.last_date = np.concatenate((self.last_date, np.full(k, np.datetime64("NaT"), dtype="datetime64[ns]")))
+        self.last_close = np.concatenate((self.last_close, np.full(k, np.nan)))
+        self.ret_buf = np.vstack((self.ret_buf, np.full((k, self.vol_window), np.nan)))
+        self.ret_pos = np.concatenate((self.ret_pos, np.zeros(k, dtype=np.int64)))
+        self.ret_nans = np.concatenate((self.ret_nans, np.full(k, self.vol_window, dtype=np.int64)))
+        self.close_buf = np.vstack((self.close_buf, np.full((k, self.mom_window + 1), np.nan)))
+        self.close_pos = np.concatenate((self.close_pos, np.zeros(k, dtype=np.int64)))
+
+    # -------------------------
+    # Updates
+    # -------------------------
+    def update(self, df):
+        """
+        Consume new rows (symbol, date, close) sorted by sort_prices(). Rows dated on
+        or before a symbol's last consumed date are ignored. Returns rows applied.
+        """
+        new_symbols = sorted({str(s) for s in df["symbol"].unique()} - set(self.index))
+        if new_symbols:
+            self._grow(new_symbols)
+
+        applied = 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for sym, date, close in zip(
+                df["symbol"].astype(str).tolist(),
+                df["date"].to_numpy(dtype="datetime64[ns]"),
+                df["close"].to_numpy(dtype=np.float64),
+            ):
+                k = self.index[sym]
+                if not np.isnat(self.last_date[k]) and date <= self.last_date[k]:
+                    continue
+                self._push(k, date, close)
+                applied += 1
+        return applied
+
+    def _push(self, k, date, close):
+        """Append one (date, close) bar to symbol row k."""
+        # Return on forward-filled closes (same semantics as daily_returns)
+        prev = self.last_close[k]
+        filled = prev if np.isnan(close) else close
+        ret = filled / prev - 1.0
+        self.last_close[k] = filled
+
+        # Ring buffer of returns: evict the oldest, add the newest
+        pos = self.ret_pos[k]
+        self.ret_nans[k] += int(not np.isfinite(ret)) - int(not np.isfinite(self.ret_buf[k, pos]))
+        self.ret_buf[k, pos] = ret
+        self.ret_pos[k] = (pos + 1) % self.vol_window
+
+        # Ring buffer of raw closes for momentum
+        self.close_buf[k, self.close_pos[k]] = close
+        self.close_pos[k] = (self.close_pos[k] + 1) % (self.mom_window + 1)
+
+        self.last_date[k] = date
+
+    def features(self):
+        """Latest (symbol, date, volatility, momentum) per symbol, in order_latest() order."""
+        W, M = self.vol_window, self.mom_window + 1
+        n = len(self.symbols)
+        # Exact std of each buffer (order within the ring does not matter); running
+        # sums would carry the cancellation error of any huge return that has left it
+        vol = np.full(n, np.nan)
+        full = self.ret_nans == 0
+        vol[full] = self.ret_buf[full].std(axis=1, ddof=1)
+
+        rows = np.arange(n)
+        newest = self.close_buf[rows, (self.close_pos - 1) % M]
+        oldest = self.close_buf[rows, self.close_pos]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mom = newest / oldest - 1.0
+
+        return order_latest(pd.DataFrame({
+            "symbol": self.symbols,
+            "date": self.last_date,
+            "volatility": vol,
+            "momentum": mom,
+        }))
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            vol_window=self.vol_window, mom_window=self.mom_window,
+            symbols=np.array(self.symbols, dtype=str),
+            last_date=self.last_date, last_close=self.last_close,
+            ret_buf=self.ret_buf, ret_pos=self.ret_pos,
+            close_buf=self.close_buf, close_pos=self.close_pos,
+            offset=self.offset, prefix_hash=self.prefix_hash,
         )
-    print("  → Detected columns:", df_header.columns.tolist())
+        os.replace(tmp, path)  # never leave a half-written state behind
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            state = cls(int(z["vol_window"]), int(z["mom_window"]))
+            state.symbols = [str(s) for s in z["symbols"]]
+            state.index = {s: i for i, s in enumerate(state.symbols)}
+            state.last_date = z["last_date"]
+            state.last_close = z["last_close"]
+            state.ret_buf = z["ret_buf"]
+            state.ret_pos = z["ret_pos"]
+            state.close_buf = z["close_buf"]
+            state.close_pos = z["close_pos"]
+            state.offset = int(z["offset"])
+            # States written before the fingerprint existed never match, forcing one rebuild
+            state.prefix_hash = str(z["prefix_hash"]) if "prefix_hash" in z.files else ""
+        state._count_gaps()
+        return state
+
+
+def consumed_size(path):
+    """Byte length of `path` up to and including its last newline (whole rows only)."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            nl = chunk.rfind(b"\n")
+            if nl >= 0:
+                return pos - step + nl + 1
+            pos -= step
+    return 0
 
-    # 2.3 Now load using the correct column names.
-    #     Replace these with whatever your CSV actually has.
-    #     For example, if your header is ['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume'],
-    #     use those exact names here:
-    TIMESTAMP_COL = "Date"    # e.g., actual CSV header for date
-    SYMBOL_COL    = "Symbol"  # e.g., actual CSV header for symbol
-    CLOSE_COL     = "Close"   # e.g., actual CSV header for closing price
 
-    print(f"Loading price data using ([{TIMESTAMP_COL}], [{SYMBOL_COL}], [{CLOSE_COL}]) …")
+def prefix_fingerprint(path, offset, sample=PREFIX_SAMPLE_BYTES):
+    """
+    sha256 of the first and last `sample` bytes of path[:offset] (plus the offset),
+    so checking that an append left the consumed rows untouched never rereads the
+    whole file.
+    """
+    digest = hashlib.sha256(str(offset).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(min(sample, offset)))
+        tail = max(0, offset - sample)
+        f.seek(tail)
+        digest.update(f.read(offset - tail))
+    return digest.hexdigest()
+
+
+def read_prices(source, header=True, names=None):
+    """Read (date, symbol, close) from prices.csv (a path or an open file positioned at a row)."""
     df = pd.read_csv(
-        PRICES_CSV,
+        source,
+        header=0 if header else None,
+        names=names,
         usecols=[TIMESTAMP_COL, SYMBOL_COL, CLOSE_COL],
         parse_dates=[TIMESTAMP_COL],
         dtype={SYMBOL_COL: "category"}
     )
-    print(f"  → Loaded {df.shape[0]:,} rows for {df[SYMBOL_COL].nunique():,} unique tickers.")
-
-    # 2.4 Rename columns to standardized names used below
     df.rename(columns={TIMESTAMP_COL: "date", SYMBOL_COL: "symbol", CLOSE_COL: "close"}, inplace=True)
+    return df
 
-    # 2.5 Sort by symbol then date to prepare for rolling computations
-    df = df.sort_values(["symbol", "date"])
 
-    # 2.6 Compute daily returns per ticker
-    df["return"] = df.groupby("symbol")["close"].pct_change()
+def save_price_features(latest, fmt=None):
+    """Drop tickers without full windows and write price_features (CSV unless `fmt` says otherwise)."""
+    price_features = latest[["symbol", "volatility", "momentum"]].dropna(subset=["volatility", "momentum"])
+    print(f"  → {price_features.shape[0]:,} tickers have full VOL & MOM data (≥ {VOL_WINDOW} days history).")
+    print(f"Saving price features to:\n  {storage.table_path(PRICE_FEATURES_CSV, fmt or storage.DEFAULT_FORMAT)}")
+    storage.write_table(price_features, PRICE_FEATURES_CSV, fmt)
+    return price_features
 
-    # 2.7 Compute rolling volatility & momentum for each ticker
-    def compute_feats(grp):
-        grp = grp.copy()
-        grp["volatility"] = grp["return"].rolling(window=VOL_WINDOW, min_periods=VOL_WINDOW).std()
-        grp["momentum"]   = (grp["close"] / grp["close"].shift(MOM_WINDOW)) - 1.0
-        return grp
 
-    print("Computing rolling volatility & momentum per ticker …")
-    df_feats = df.groupby("symbol", group_keys=False).apply(compute_feats)
+def run_incremental(state_path=PRICE_STATE_NPZ, fmt=None):
+    """
+    Update price_features.csv from only the rows appended to prices.csv since the
+    last run. Falls back to a full bootstrap when there is no state yet or the file
+    was rewritten/truncated instead of appended to (the bytes consumed last time no
+    longer hash to the saved fingerprint).
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    size = consumed_size(PRICES_CSV)
 
-    # 2.8 For each ticker, keep only the most recent row (latest date)
-    print("Selecting latest row per ticker …")
-    latest = df_feats.sort_values("date").groupby("symbol").tail(1)
+    state = None
+    if os.path.exists(state_path):
+        state = PriceFeatureState.load(state_path)
+        if (state.vol_window, state.mom_window) != (VOL_WINDOW, MOM_WINDOW):
+            print("  → Saved state was built with other window settings; rebuilding.")
+            state = None
+        elif size < state.offset or prefix_fingerprint(PRICES_CSV, state.offset) != state.prefix_hash:
+            print("  → prices.csv was rewritten since the last run (not appended to); rebuilding.")
+            state = None
 
-    # 2.9 Extract symbol, volatility, momentum; drop any NaNs
-    price_features = latest[["symbol", "volatility", "momentum"]].dropna(subset=["volatility", "momentum"])
-    print(f"  → {price_features.shape[0]:,} tickers have full VOL & MOM data (≥ {VOL_WINDOW} days history).")
+    if state is None:
+        print(f"Bootstrapping incremental state from full history in {PRICES_CSV} …")
+        df = sort_prices(read_prices(PRICES_CSV))
+        state = PriceFeatureState.from_history(df, VOL_WINDOW, MOM_WINDOW)
+        print(f"  → State built for {len(state.symbols):,} tickers from {df.shape[0]:,} rows.")
+    elif size > state.offset:
+        names = pd.read_csv(PRICES_CSV, nrows=0).columns.tolist()
+        with open(PRICES_CSV, "rb") as f:
+            f.seek(state.offset)
+            new_rows = read_prices(io.BytesIO(f.read(size - state.offset)), header=False, names=names)
+        new_rows = sort_prices(new_rows)
+        applied = state.update(new_rows)
+        print(f"  → Read {new_rows.shape[0]:,} new rows; applied {applied:,}.")
+    else:
+        print("  → No new rows since last run.")
+
+    state.offset = size
+    state.prefix_hash = prefix_fingerprint(PRICES_CSV, size)
+    state.save(state_path)
+    print(f"Saved incremental state to:\n  {state_path}")
+
+    save_price_features(state.features(), fmt)
+    print("Done: price features updated under data/processed/.")
+
+
+# ===========================
+# 5) CHUNKED INGESTION
+# ===========================
+def plan_chunks(path, budget_mb=MEMORY_BUDGET_MB):
+    """
+    (n_buckets, chunk_rows) so that one spill bucket, or one read chunk, parses to
+    roughly `budget_mb` MB at most (estimated from the file size and average line length).
+    """
+    budget = budget_mb * 1024 * 1024
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()  # header
+        sample = [len(line) for _, line in zip(range(1000), f)]
+    avg_line = (sum(sample) / len(sample)) if sample else 64
+    n_buckets = max(1, math.ceil(size * PARSE_EXPANSION / budget))
+    chunk_rows = max(10_000, int(budget / (avg_line * PARSE_EXPANSION)))
+    return n_buckets, chunk_rows
+
+
+def spill_by_symbol(path, spill_dir, n_buckets, chunk_rows):
+    """
+    Stream prices.csv in chunks and append each row to spill_dir/bucket_<i>.csv by
+    hash(symbol) % n_buckets, so every ticker's full history lands in one bucket.
+    Returns the bucket file paths that received rows.
+    """
+    written = set()
+    reader = pd.read_csv(
+        path,
+        usecols=[TIMESTAMP_COL, SYMBOL_COL, CLOSE_COL],
+        dtype=str,  # keep raw text so buckets re-parse exactly like the source file
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        chunk = chunk[chunk[SYMBOL_COL].notna()]
+        buckets = pd.util.hash_array(chunk[SYMBOL_COL].to_numpy(dtype=object)) % np.uint64(n_buckets)
+        for b, part in chunk.groupby(buckets, sort=False):
+            bucket_path = os.path.join(spill_dir, f"bucket_{int(b):05d}.csv")
+            part.to_csv(bucket_path, mode="a", header=bucket_path not in written, index=False)
+            written.add(bucket_path)
+    return sorted(written)
+
+
+def run_chunked(budget_mb=MEMORY_BUDGET_MB, spill_dir=None, fmt=None, workers=1):
+    """
+    Memory-bounded equivalent of the in-memory path: partition rows by symbol into
+    on-disk buckets, then compute features one bucket at a time. Only the per-ticker
+    latest rows are kept in memory across buckets, so the output is identical.
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    n_buckets, chunk_rows = plan_chunks(PRICES_CSV, budget_mb)
+    print(f"Chunked mode: budget {budget_mb} MB → {n_buckets} bucket(s), {chunk_rows:,} rows per read chunk.")
+
+    tmp_dir = tempfile.mkdtemp(prefix="price_spill_", dir=spill_dir or PROCESSED_DIR)
+    try:
+        print(f"Spilling {PRICES_CSV} into symbol buckets under:\n  {tmp_dir}")
+        bucket_paths = spill_by_symbol(PRICES_CSV, tmp_dir, n_buckets, chunk_rows)
+
+        latest_parts = []
+        for i, bucket_path in enumerate(bucket_paths, 1):
+            df = sort_prices(read_prices(bucket_path))
+            latest_parts.append(compute_latest_features(df, workers))
+            print(f"  → Bucket {i}/{len(bucket_paths)}: {df.shape[0]:,} rows, {latest_parts[-1].shape[0]:,} tickers.")
+            del df
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if latest_parts:
+        latest = order_latest(pd.concat(latest_parts, ignore_index=True))
+    else:
+        latest = pd.DataFrame(columns=["symbol", "date", "volatility", "momentum"])
+    save_price_features(latest, fmt)
+    print("Done: price features created under data/processed/.")
+
+
+# ===========================
+# 6) PROCESS-POOL EXECUTION
+# ===========================
+# Shards are contiguous ranges of symbol segments. Inputs and outputs live in
+# memory-mapped .npy files, so workers only receive (first, last) symbol indices
+# and never a pickled DataFrame. Each symbol is computed by exactly the same code
+# as the single-process path, so results are identical and deterministic.
+_SHARED = {}
+
+
+def _init_worker(shared_dir):
+    _SHARED["close"] = np.load(os.path.join(shared_dir, "close.npy"), mmap_mode="r")
+    _SHARED["starts"] = np.load(os.path.join(shared_dir, "starts.npy"), mmap_mode="r")
+    _SHARED["ends"] = np.load(os.path.join(shared_dir, "ends.npy"), mmap_mode="r")
+    _SHARED["vol"] = np.load(os.path.join(shared_dir, "vol.npy"), mmap_mode="r+")
+    _SHARED["mom"] = np.load(os.path.join(shared_dir, "mom.npy"), mmap_mode="r+")
+
+
+def _latest_shard(bounds):
+    """Compute symbols [k0, k1) in a worker, writing into the shared output arrays."""
+    k0, k1 = bounds
+    starts = np.asarray(_SHARED["starts"][k0:k1])
+    ends = np.asarray(_SHARED["ends"][k0:k1])
+    r0, r1 = starts[0], ends[-1]
+    close = np.asarray(_SHARED["close"][r0:r1])
+    returns = daily_returns(close, starts - r0, ends - r0)
+    vol, mom = latest_features(close, returns, starts - r0, ends - r0, VOL_WINDOW, MOM_WINDOW)
+    _SHARED["vol"][k0:k1] = vol
+    _SHARED["mom"][k0:k1] = mom
+    _SHARED["vol"].flush()
+    _SHARED["mom"].flush()
+    return k1 - k0
+
+
+def shard_symbols(starts, ends, n_shards):
+    """Split symbols into <= n_shards contiguous ranges with roughly equal row counts."""
+    rows = np.cumsum(ends - starts)
+    targets = rows[-1] * np.arange(1, n_shards) / n_shards
+    cuts = np.unique(np.concatenate(([0], np.searchsorted(rows, targets, side="right"), [starts.size])))
+    return [(int(a), int(b)) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+
+
+def latest_features_parallel(close, starts, ends, workers, shared_dir=None):
+    """latest_features() for every symbol, sharded across `workers` processes."""
+    tmp_dir = tempfile.mkdtemp(prefix="price_shared_", dir=shared_dir)
+    try:
+        np.save(os.path.join(tmp_dir, "close.npy"), np.ascontiguousarray(close, dtype=np.float64))
+        np.save(os.path.join(tmp_dir, "starts.npy"), starts)
+        np.save(os.path.join(tmp_dir, "ends.npy"), ends)
+        np.save(os.path.join(tmp_dir, "vol.npy"), np.full(starts.size, np.nan))
+        np.save(os.path.join(tmp_dir, "mom.npy"), np.full(starts.size, np.nan))
+
+        # A few shards per worker keeps the pool busy when symbol lengths are skewed
+        shards = shard_symbols(starts, ends, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tmp_dir,)) as pool:
+            done = sum(pool.map(_latest_shard, shards))
+        if done != starts.size:
+            raise RuntimeError(f"Parallel run computed {done} of {starts.size} symbols.")
+
+        vol = np.load(os.path.join(tmp_dir, "vol.npy"))
+        mom = np.load(os.path.join(tmp_dir, "mom.npy"))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return vol, mom
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute per-ticker volatility & momentum features.")
+    # The two alternative run modes cannot be combined
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental", action="store_true",
+        help="Only consume rows appended to prices.csv since the last run (state in price_state.npz)."
+    )
+    mode.add_argument(
+        "--chunked", action="store_true",
+        help="Stream prices.csv in chunks through on-disk symbol buckets (for files larger than RAM)."
+    )
+    parser.add_argument(
+        "--memory-budget-mb", type=int, default=MEMORY_BUDGET_MB,
+        help=f"Approximate peak memory for --chunked (default {MEMORY_BUDGET_MB})."
+    )
+    parser.add_argument("--state", default=PRICE_STATE_NPZ, help="Path of the incremental state file.")
+    parser.add_argument("--spill-dir", default=None, help="Where --chunked writes its temporary buckets.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Shard per-symbol feature computation across N processes (default 1 = in-process)."
+    )
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=storage.DEFAULT_FORMAT,
+        help="Storage format for price_features (default: $STORAGE_FORMAT or csv)."
+    )
+    parser.add_argument(
+        "--history", action="store_true",
+        help=f"Also keep the full per-day volatility/momentum series as a point-in-time store in {PRICE_HISTORY_DIR}."
+    )
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.history and (args.incremental or args.chunked):
+        parser.error("--history needs the full in-memory run (not --incremental / --chunked).")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with instrumentation.Run("compute_price_features", args) as run:
+        if args.incremental:
+            with run.step("incremental update"):
+                run_incremental(args.state, args.format)
+            return
+        if args.chunked:
+            with run.step("chunked run"):
+                run_chunked(args.memory_budget_mb, args.spill_dir, args.format, args.workers)
+            return
+
+        # 2.1 Ensure processed directory exists
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+
+        # 2.2 First, load only the header row to see actual column names
+        print(f"Inspecting columns in {PRICES_CSV} …")
+        try:
+            df_header = pd.read_csv(PRICES_CSV, nrows=0)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Could not find '{PRICES_CSV}'. Please ensure it exists under ml-service/data/raw/."
+            )
+        print("  → Detected columns:", df_header.columns.tolist())
+
+        # 2.3 Now load using the column names configured under PARAMETERS, and
+        # 2.4 rename them to the standardized names used below
+        with run.step("2.3 load prices") as step:
+            print(f"Loading price data using ([{TIMESTAMP_COL}], [{SYMBOL_COL}], [{CLOSE_COL}]) …")
+            df = read_prices(PRICES_CSV)
+            step.rows = len(df)
+            print(f"  → Loaded {df.shape[0]:,} rows for {df['symbol'].nunique():,} unique tickers.")
+
+        # 2.5 Sort by symbol then date so each ticker is one contiguous segment
+        with run.step("2.5 sort by symbol/date", rows=len(df)):
+            df = sort_prices(df)
+
+        # 2.6 Compute daily returns per ticker, and
+        # 2.7 rolling volatility & momentum, and
+        # 2.8 keep only the most recent row per ticker — in one vectorized pass over
+        #     symbol segments that only evaluates the final window of each ticker
+        #     (sharded across a process pool when --workers > 1)
+        with run.step("2.6-2.8 rolling features", rows=len(df)) as step:
+            print("Computing rolling volatility & momentum for each ticker's latest row …")
+            latest = compute_latest_features(df, args.workers)
+            step.extra["tickers"] = int(latest.shape[0])
+            print(f"  → Computed latest features for {latest.shape[0]:,} tickers.")
+
+        # 2.9 Extract symbol, volatility, momentum; drop any NaNs, and
+        # 2.10 save (CSV by default, or a binary columnar format via --format)
+        with run.step("2.9-2.10 save price features") as step:
+            step.rows = len(save_price_features(latest, args.format))
 
-    # 2.10 Save to CSV
-    print(f"Saving price features to:\n  {PRICE_FEATURES_CSV}")
-    price_features.to_csv(PRICE_FEATURES_CSV, index=False)
-    print("Done: 'price_features.csv' created under data/processed/.")
+        # 2.11 Optionally keep every day's features (not just the latest) for as-of queries
+        if args.history:
+            with run.step("2.11 save feature history", rows=len(df)) as step:
+                print("Computing the full volatility & momentum series for the feature history …")
+                series = compute_feature_series(df)
+                history = FeatureHistory.from_frame(series, ["close", "volatility", "momentum"])
+                history.save(PRICE_HISTORY_DIR)
+                step.extra["tickers"] = len(history.symbols)
+                print(f"  → {len(history):,} rows for {len(history.symbols):,} tickers saved to:\n  {PRICE_HISTORY_DIR}")
+        print("Done: price features created under data/processed/.")
 
 if __name__ == "__main__":
     main()
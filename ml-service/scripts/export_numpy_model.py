@@ -0,0 +1,121 @@
+# scripts/export_numpy_model.py
+
+import argparse
+import os
+import numpy as np
+import tensorflow as tf
+import joblib
+
+import instrumentation
+import storage
+from numpy_model import NumpyModel, save_npz
+
+# === CONFIGURATION ===
+# Same artifact locations as train_model.py / app.py
+MODEL_PATH = os.path.join("model.h5")
+SCALER_PATH = os.path.join("data", "processed", "scaler.save")
+COMBINED_CSV = os.path.join("data", "processed", "combined_data.csv")
+NPZ_OUTPUT = os.path.join("model.npz")
+
+NUMERIC_COLS = ["MarketCap", "RevenueGrowth", "PE", "DividendYield", "volatility", "momentum"]
+
+# Max |keras - numpy| allowed on the parity check
+PARITY_TOL = 1e-4
+PARITY_ROWS = 1000
+
+
+def extract_dense_layers(model):
+    """(kernel, bias, activation) for every Dense layer; Dropout is a no-op at inference."""
+    layers = []
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.Dense):
+            kernel, bias = layer.get_weights()
+            layers.append((kernel, bias, layer.get_config()["activation"]))
+        elif isinstance(layer, (tf.keras.layers.Dropout, tf.keras.layers.InputLayer)):
+            continue
+        else:
+            raise TypeError(f"Cannot export layer '{layer.name}' ({type(layer).__name__}) to NumPy.")
+    return layers
+
+
+def verify_parity(model, np_model, X):
+    """Compare Keras and NumPy outputs on X; returns max absolute difference."""
+    keras_out = model.predict(X, batch_size=len(X), verbose=0)
+    numpy_out = np_model.predict(X)
+    max_diff = float(np.max(np.abs(keras_out - numpy_out)))
+    labels_match = bool(np.array_equal(keras_out >= 0.5, numpy_out >= 0.5))
+    return max_diff, labels_match
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export model.h5 + scaler to the NumPy inference artifact.")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with instrumentation.Run("export_numpy_model", args) as run:
+        # 1) Load trained Keras model + scaler
+        with run.step("1) load keras model"):
+            print(f"Loading Keras model from {MODEL_PATH} ...")
+            model = tf.keras.models.load_model(MODEL_PATH)
+            print(f"Loading scaler from {SCALER_PATH} ...")
+            scaler = joblib.load(SCALER_PATH)
+
+        # 2) Feature / label names (same derivation as app.py)
+        with run.step("2) read feature columns") as step:
+            print(f"Reading feature columns from {COMBINED_CSV} ...")
+            data_df = storage.read_table(COMBINED_CSV, dtype={"symbol": str})
+            step.rows = len(data_df)
+        sector_cols = sorted([c for c in data_df.columns if c.startswith("Sector_")])
+        feature_names = NUMERIC_COLS + sector_cols
+        label_names = [
+            "LargeCap", "MidCap", "SmallCap", "MicroCap",
+            "GrowthStock", "ValueStock", "IncomeStock", "BlueChipStock",
+            "Cyclical", "Defensive"
+        ] + sector_cols + ["DividendStock", "NonDividendStock"]
+
+        # 3) Dump weights + scaler + names into one .npz (published only once step 4 passes)
+        tmp_output = NPZ_OUTPUT + ".tmp.npz"
+        with run.step("3) write npz"):
+            layers = extract_dense_layers(model)
+            if layers[0][0].shape[0] != len(feature_names):
+                raise ValueError(
+                    f"Model expects {layers[0][0].shape[0]} inputs but {COMBINED_CSV} yields "
+                    f"{len(feature_names)} feature columns: {feature_names}"
+                )
+            save_npz(tmp_output, layers, feature_names, label_names, scaler.mean_, scaler.scale_)
+        print(f"Wrote {len(layers)} Dense layers to {tmp_output}.")
+
+        # 4) Parity check: reload the artifact and compare against Keras on real rows;
+        #    a failed check deletes the temp file so no unverified model.npz is left behind
+        try:
+            with run.step("4) parity check") as step:
+                np_model = NumpyModel.load(tmp_output)
+                X = data_df[feature_names].dropna().head(PARITY_ROWS).to_numpy(dtype=np.float64)
+                if len(X) == 0:
+                    # Random inputs would not exercise the scaler / feature order this check exists for
+                    raise ValueError(
+                        f"No complete feature rows in {COMBINED_CSV} to verify {NPZ_OUTPUT} against; "
+                        f"refusing to export an unchecked artifact."
+                    )
+                X[:, : len(NUMERIC_COLS)] = np_model.scaler.transform(X[:, : len(NUMERIC_COLS)])
+                X = X.astype(np.float32)
+
+                max_diff, labels_match = verify_parity(model, np_model, X)
+                step.rows = len(X)
+                step.extra["max_abs_diff"] = max_diff
+            print(f"Parity on {len(X)} rows: max |keras - numpy| = {max_diff:.2e}, labels match = {labels_match}")
+            if max_diff > PARITY_TOL:
+                raise AssertionError(f"NumPy backend diverges from Keras (max diff {max_diff:.2e} > {PARITY_TOL}).")
+        except BaseException:
+            os.remove(tmp_output)
+            raise
+        os.replace(tmp_output, NPZ_OUTPUT)
+        print(f"Done: NumPy inference artifact exported to {NPZ_OUTPUT}.")
+
+
+if __name__ == "__main__":
+    main()
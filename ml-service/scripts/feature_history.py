@@ -0,0 +1,230 @@
+# scripts/feature_history.py
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+# Dates are stored as int32 days since 1970-01-01; queries accept anything np.datetime64 parses
+EPOCH = np.datetime64("1970-01-01", "D")
+
+# Saved versions kept next to the live one, for readers that resolved CURRENT just before a swap
+HISTORY_KEEP = 2
+POINTER = "CURRENT"
+
+
+def to_days(value):
+    """Day number of a date-like value ('2015-06-30', datetime, np.datetime64, pd.Timestamp, arrays)."""
+    if isinstance(value, (str, bytes)):
+        value = np.datetime64(value, "D")
+    days = (np.asarray(value).astype("datetime64[D]") - EPOCH).astype(np.int64)
+    return days if days.ndim else int(days)
+
+
+def from_days(days):
+    return EPOCH + np.asarray(days).astype("timedelta64[D]")
+
+
+def _forward_fill(values, starts):
+    """Carry the last non-NaN value forward within each segment (never across segment starts)."""
+    pos = np.where(np.isnan(values), 0, np.arange(values.size))
+    pos[starts] = starts
+    return values[np.maximum.accumulate(pos)]
+
+
+class FeatureHistory:
+    """
+    Point-in-time feature history: per-symbol, date-sorted columnar arrays.
+
+    Rows are sorted by (symbol, date), so every symbol is one contiguous segment
+    [offsets[k], offsets[k + 1]) of `dates` and of each value column. An as-of
+    lookup is a dict hit for the segment plus np.searchsorted over its dates; a
+    range scan is a slice (no copy). On disk every array is its own .npy file,
+    opened memory-mapped, so only the pages a query touches are read. Each save
+    is a new version directory; the CURRENT file names the live one and is
+    swapped with a single atomic rename:
+
+        <directory>/CURRENT                   name of the live version, e.g. v1760000000000000000-123
+        <directory>/<version>/index.json      symbols, column names, row count
+        <directory>/<version>/offsets.npy     int64 (n_symbols + 1)
+        <directory>/<version>/dates.npy       int32 days since 1970-01-01
+        <directory>/<version>/c0000.npy ...   float32, one file per column
+    """
+
+    def __init__(self, symbols, offsets, dates, columns):
+        self.symbols = [str(s) for s in symbols]
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.dates = dates
+        self.columns = columns  # {name: 1-D float32 array}, in column order
+        self.index = {sym: k for k, sym in enumerate(self.symbols)}
+        self._keys = None
+
+    @classmethod
+    def from_arrays(cls, symbols, dates, columns, ffill=False):
+        """
+        Build from unsorted per-row arrays. Rows are sorted by (symbol, date); with
+        `ffill` each column carries its last non-NaN value forward within a symbol,
+        so an as-of row holds the latest known value of every column.
+        """
+        import pandas as pd
+
+        codes, uniques = pd.factorize(pd.Series(np.asarray(symbols, dtype=object)).astype(str), sort=True)
+        days = np.asarray(to_days(dates), dtype=np.int64)
+        order = np.lexsort((days, codes))
+        codes = codes[order]
+        offsets = np.searchsorted(codes, np.arange(len(uniques) + 1)).astype(np.int64)
+        cols = {}
+        for name, values in columns.items():
+            values = np.asarray(values, dtype=np.float64)[order]
+            if ffill and values.size:
+                values = _forward_fill(values, offsets[:-1][np.diff(offsets) > 0])
+            cols[str(name)] = values.astype(np.float32)
+        return cls(list(uniques), offsets, days[order].astype(np.int32), cols)
+
+    @classmethod
+    def from_frame(cls, df, value_cols, symbol_col="symbol", date_col="date", ffill=False):
+        return cls.from_arrays(df[symbol_col].to_numpy(), df[date_col].to_numpy(),
+                               {c: df[c].to_numpy() for c in value_cols}, ffill=ffill)
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, directory):
+        """
+        Write a new version directory, then point CURRENT at it with one atomic
+        rename: a reader always resolves a complete version, and the previous
+        one stays on disk (open memory maps of pruned versions stay valid too).
+        Returns the version's path.
+        """
+        directory = os.path.abspath(directory)
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        path = os.path.join(directory, version)
+        os.makedirs(path)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        np.save(os.path.join(path, "dates.npy"), np.asarray(self.dates, dtype=np.int32))
+        for j, values in enumerate(self.columns.values()):
+            np.save(os.path.join(path, f"c{j:04d}.npy"), np.ascontiguousarray(values, dtype=np.float32))
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"symbols": self.symbols, "columns": list(self.columns), "rows": len(self)}, f)
+
+        pointer = os.path.join(directory, POINTER)
+        with open(f"{pointer}.tmp-{os.getpid()}", "w") as f:
+            f.write(version)
+        os.replace(f"{pointer}.tmp-{os.getpid()}", pointer)
+        _prune(directory, version, keep=HISTORY_KEEP)
+        return path
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, POINTER)) or os.path.exists(os.path.join(directory, "index.json"))
+
+    @staticmethod
+    def resolve(directory):
+        """Path of the live version (the directory itself for the older single-version layout)."""
+        try:
+            with open(os.path.join(directory, POINTER)) as f:
+                return os.path.join(directory, f.read().strip())
+        except FileNotFoundError:
+            return directory
+
+    @classmethod
+    def open(cls, directory):
+        """Open the live version read-only; every array is a memory map."""
+        for attempt in range(3):
+            path = cls.resolve(directory)
+            try:
+                return cls._open(path)
+            except FileNotFoundError:
+                # Pruned between reading CURRENT and opening it: CURRENT has moved on, read it again
+                if attempt == 2:
+                    raise
+
+    @classmethod
+    def _open(cls, path):
+        with open(os.path.join(path, "index.json")) as f:
+            meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        columns = {name: load(f"c{j:04d}.npy") for j, name in enumerate(meta["columns"])}
+        return cls(meta["symbols"], load("offsets.npy"), load("dates.npy"), columns)
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def __len__(self):
+        return int(self.offsets[-1]) if len(self.offsets) else 0
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def span(self, symbol):
+        """(lo, hi) row bounds of `symbol`, or None if it has no history."""
+        k = self.index.get(symbol)
+        if k is None:
+            return None
+        return int(self.offsets[k]), int(self.offsets[k + 1])
+
+    def as_of(self, symbol, date):
+        """Row of the latest observation of `symbol` dated on or before `date`, or None."""
+        bounds = self.span(symbol)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        pos = lo + int(np.searchsorted(self.dates[lo:hi], to_days(date), side="right")) - 1
+        return pos if pos >= lo else None
+
+    def as_of_many(self, symbols, date):
+        """Vectorised as_of() for a list of symbols at one date; -1 where there is no row."""
+        if self._keys is None:
+            # One globally sorted key per row: (segment, date) packed into an int64
+            segment = np.repeat(np.arange(len(self.symbols), dtype=np.int64), np.diff(self.offsets))
+            self._keys = (segment << 32) | (np.asarray(self.dates, dtype=np.int64) + 2 ** 31)
+        k = np.array([self.index.get(s, -1) for s in symbols], dtype=np.int64)
+        found = k >= 0
+        rows = np.full(len(k), -1, dtype=np.int64)
+        query = (k[found] << 32) | (to_days(date) + 2 ** 31)
+        pos = np.searchsorted(self._keys, query, side="right") - 1
+        rows[found] = np.where(pos >= self.offsets[k[found]], pos, -1)
+        return rows
+
+    def range(self, symbol, start=None, end=None, columns=None):
+        """
+        {"date": datetime64[D] array, column: values, ...} for `symbol` with
+        start <= date <= end (either bound optional). Value arrays are views.
+        """
+        bounds = self.span(symbol)
+        lo, hi = bounds if bounds is not None else (0, 0)
+        dates = self.dates[lo:hi]
+        if start is not None:
+            lo += int(np.searchsorted(dates, to_days(start), side="left"))
+        if end is not None:
+            hi = bounds[0] + int(np.searchsorted(dates, to_days(end), side="right")) if bounds else 0
+        hi = max(hi, lo)
+        out = {"date": from_days(self.dates[lo:hi])}
+        for name in columns or self.columns:
+            out[name] = self.columns[name][lo:hi]
+        return out
+
+    def row(self, pos, columns=None):
+        """{column: float} of one row."""
+        return {name: float(self.columns[name][pos]) for name in columns or self.columns}
+
+    def date_of(self, pos):
+        return str(from_days(self.dates[pos]))
+
+    def describe(self):
+        return {"symbols": len(self.symbols), "rows": len(self), "columns": len(self.columns)}
+
+
+def _prune(directory, live, keep):
+    """Delete all but `live` and the `keep` newest other versions, plus files of the old single-version layout."""
+    # Version names start with a fixed-width nanosecond timestamp, so name order is age order
+    versions = sorted((name for name in os.listdir(directory)
+                       if name.startswith("v") and name != live and os.path.isdir(os.path.join(directory, name))),
+                      reverse=True)
+    for name in versions[keep:]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    for name in os.listdir(directory):
+        if name.endswith(".npy") or name == "index.json":
+            os.remove(os.path.join(directory, name))
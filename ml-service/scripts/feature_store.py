@@ -0,0 +1,182 @@
+# scripts/feature_store.py
+
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl  # POSIX; without it concurrent builders just race to the same atomic rename
+except ImportError:
+    fcntl = None
+
+# How many shared snapshots per kind ("features-*", "universe-*") to keep around for still-running workers
+SHARED_KEEP = 3
+
+
+class FeatureStore:
+    """
+    Startup-time feature store for the inference service.
+
+    Holds one contiguous float32 matrix with the scaler already applied to the
+    numeric columns, plus a symbol -> row dictionary, so a ticker lookup is a
+    single dict hit and a row slice (no per-request pandas work).
+    """
+
+    def __init__(self, symbols, features, scaler, n_numeric):
+        # features: raw (unscaled) matrix, shape = (n_rows, n_features)
+        feats = np.array(features, dtype=np.float64)  # own copy; scaled in place below
+        if n_numeric and feats.shape[0]:
+            feats[:, :n_numeric] = scaler.transform(feats[:, :n_numeric])
+        self._set(symbols, np.ascontiguousarray(feats, dtype=np.float32))
+
+    def _set(self, symbols, matrix):
+        self.matrix = matrix
+
+        # First occurrence wins (same row the old boolean-mask lookup used)
+        self.symbols = []
+        self.index = {}
+        for i, sym in enumerate(symbols):
+            sym = str(sym)
+            self.symbols.append(sym)
+            self.index.setdefault(sym, i)
+
+    @classmethod
+    def from_frame(cls, df, scaler, numeric_cols, sector_cols):
+        """Build the store from the combined_data DataFrame."""
+        cols = ["symbol"] + numeric_cols + sector_cols
+        return cls.from_columns({c: df[c].to_numpy() for c in cols}, scaler, numeric_cols, sector_cols)
+
+    @classmethod
+    def from_columns(cls, columns, scaler, numeric_cols, sector_cols):
+        """
+        Build the store from {name: 1-D array} (e.g. storage.read_columns memory maps).
+        Rows without a symbol are skipped.
+        """
+        symbols = np.asarray(columns["symbol"], dtype=object)
+        keep = np.array([s is not None and s == s and s != "" for s in symbols], dtype=bool)
+        features = np.empty((int(keep.sum()), len(numeric_cols) + len(sector_cols)), dtype=np.float64)
+        for j, name in enumerate(numeric_cols + sector_cols):
+            features[:, j] = np.asarray(columns[name], dtype=np.float64)[keep]
+        return cls(symbols[keep].tolist(), features, scaler, len(numeric_cols))
+
+    # -------------------------
+    # Shared, memory-mapped snapshots (multi-worker serving)
+    # -------------------------
+    def save(self, directory, key):
+        """Write <key>.npy (scaled matrix) + <key>.symbols.json atomically; returns the .npy path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, key)
+        with open(base + ".symbols.json.tmp", "w") as f:
+            json.dump(self.symbols, f)
+        os.replace(base + ".symbols.json.tmp", base + ".symbols.json")
+        with open(base + ".npy.tmp", "wb") as f:
+            np.save(f, self.matrix)
+        os.replace(base + ".npy.tmp", base + ".npy")  # the .npy appearing marks the snapshot complete
+        return base + ".npy"
+
+    @classmethod
+    def open(cls, directory, key):
+        """Open a saved snapshot read-only; the matrix is a memory map shared with every other reader."""
+        base = os.path.join(directory, key)
+        with open(base + ".symbols.json") as f:
+            symbols = json.load(f)
+        store = cls.__new__(cls)
+        store._set(symbols, np.load(base + ".npy", mmap_mode="r"))
+        return store
+
+    @classmethod
+    def shared(cls, directory, key, build):
+        """
+        Memory-mapped store for `key`, building it with `build()` (and saving it) only if
+        no process has yet. With N workers only the first one parses and scales the
+        data; all of them map the same file, so the page cache holds one copy.
+        """
+        with _locked(directory):
+            if not os.path.exists(os.path.join(directory, key + ".npy")):
+                build().save(directory, key)
+                _prune(directory, keep=SHARED_KEEP)
+            # Map it before releasing the lock: another process's _prune() may unlink
+            # the files right after, but an open memory map stays valid
+            return cls.open(directory, key)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def lookup(self, ticker):
+        """Return the row index for `ticker`, or None if it is unknown."""
+        return self.index.get(ticker)
+
+    def row(self, ticker):
+        """Return the scaled (1, n_features) feature row for `ticker`, or None."""
+        idx = self.index.get(ticker)
+        if idx is None:
+            return None
+        return self.matrix[idx : idx + 1]
+
+
+def shared_arrays(directory, key, build):
+    """
+    {name: read-only memory map} for `key`, computing them with `build()` ({name: array})
+    only if no process has yet — same locking as FeatureStore.shared(). Stored as
+    <key>.<name>.npy plus a <key>.json manifest written last (marks the set complete).
+    """
+    manifest = os.path.join(directory, key + ".json")
+    with _locked(directory):
+        if not os.path.exists(manifest):
+            arrays = build()
+            for name, values in arrays.items():
+                base = os.path.join(directory, f"{key}.{name}.npy")
+                with open(base + ".tmp", "wb") as f:
+                    np.save(f, np.ascontiguousarray(values))
+                os.replace(base + ".tmp", base)
+            with open(manifest + ".tmp", "w") as f:
+                json.dump(list(arrays), f)
+            os.replace(manifest + ".tmp", manifest)
+            _prune(directory, keep=SHARED_KEEP)
+        with open(manifest) as f:
+            names = json.load(f)
+        return {name: np.load(os.path.join(directory, f"{key}.{name}.npy"), mmap_mode="r") for name in names}
+
+
+@contextmanager
+def _locked(directory):
+    """Exclusive flock on <directory>/.lock for the duration of the block."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _prune(directory, keep):
+    """
+    Delete all but the `keep` newest snapshots of each kind (the key prefix before "-");
+    a snapshot is every file named <key>.* (open memory maps stay valid after unlink).
+    """
+    groups = {}
+    for name in os.listdir(directory):
+        if name.startswith("."):
+            continue
+        key = name.split(".", 1)[0]
+        mtime = os.path.getmtime(os.path.join(directory, name))
+        groups.setdefault(key, [0.0, []])
+        groups[key][0] = max(groups[key][0], mtime)
+        groups[key][1].append(name)
+
+    by_kind = {}
+    for key, (mtime, names) in groups.items():
+        by_kind.setdefault(key.split("-", 1)[0], []).append((mtime, names))
+    for snapshots in by_kind.values():
+        snapshots.sort(key=lambda s: s[0], reverse=True)
+        for _, names in snapshots[keep:]:
+            for name in names:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,247 @@
+# scripts/instrumentation.py
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource  # POSIX only; peak RSS is reported as None elsewhere
+except ImportError:
+    resource = None
+
+# ===========================
+# Run reports for the pipeline scripts
+# ===========================
+# Each script wraps its numbered main() steps in spans:
+#
+#   with instrumentation.Run("merge_fundamentals", args) as run:
+#       with run.step("2) load indicators") as step:
+#           df = pd.read_csv(...)
+#           step.rows = len(df)
+#
+# and every run writes data/processed/reports/<script>-<timestamp>.json with
+# wall time, CPU time, peak RSS and row counts per step (plus <script>.latest.json).
+# Compare two runs with:  python scripts/instrumentation.py OLD.json NEW.json
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REPORT_DIR   = os.environ.get("PIPELINE_REPORT_DIR", os.path.join(PROJECT_ROOT, "data", "processed", "reports"))
+
+PROFILE_TOP_N = 25
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def add_arguments(parser):
+    """Add the --profile / --trace-memory / --report-dir switches to a script's parser."""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument(
+        "--profile", action="store_true", default=_env_flag("PIPELINE_PROFILE"),
+        help="Capture a cProfile of the run (.prof next to the report; top functions in the JSON)."
+    )
+    group.add_argument(
+        "--trace-memory", action="store_true", default=_env_flag("PIPELINE_TRACEMALLOC"),
+        help="Track Python heap peaks per step with tracemalloc (slows the run down)."
+    )
+    group.add_argument("--report-dir", default=REPORT_DIR, help=f"Where run reports go (default {REPORT_DIR}).")
+    return parser
+
+
+def _peak_rss_mb(who=None):
+    """High-water RSS of this process (or its reaped children) in MB; ru_maxrss is KB on Linux, bytes on macOS."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / scale, 2)
+
+
+def _children_cpu_s():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Span:
+    """One timed step; set `.rows` (and anything in `.extra`) from inside the block."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.extra = {}
+        self.record = None
+
+
+class Run:
+    def __init__(self, script, args=None, report_dir=None, profile=None, trace_memory=None):
+        self.script = script
+        self.report_dir = report_dir or getattr(args, "report_dir", None) or REPORT_DIR
+        self.profile = getattr(args, "profile", False) if profile is None else profile
+        self.trace_memory = getattr(args, "trace_memory", False) if trace_memory is None else trace_memory
+        self.args = {k: v for k, v in vars(args).items()} if args is not None else {}
+        self.steps = []
+        self.report_path = None
+        self._profiler = None
+
+    # -------------------------
+    # Run lifetime
+    # -------------------------
+    def __enter__(self):
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._child_cpu0 = _children_cpu_s()
+        self._rss0 = _peak_rss_mb()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profiler is not None:
+            self._profiler.disable()
+        status = "ok" if exc_type is None else f"failed: {exc_type.__name__}: {exc}"
+        self.write_report(status)
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return False
+
+    # -------------------------
+    # Steps
+    # -------------------------
+    @contextmanager
+    def step(self, name, rows=None):
+        span = Span(name)
+        span.rows = rows
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        rss_before = _peak_rss_mb()
+        wall0, cpu0, child0 = time.perf_counter(), time.process_time(), _children_cpu_s()
+        status = "ok"
+        try:
+            yield span
+        except BaseException as exc:
+            status = f"failed: {type(exc).__name__}"
+            raise
+        finally:
+            wall = time.perf_counter() - wall0
+            rss_after = _peak_rss_mb()
+            record = {
+                "name": name,
+                "status": status,
+                "wall_s": round(wall, 6),
+                "cpu_s": round(time.process_time() - cpu0, 6),
+                "child_cpu_s": round(_children_cpu_s() - child0, 6),
+                "peak_rss_mb": rss_after,
+                "peak_rss_growth_mb": None if rss_after is None else round(rss_after - rss_before, 2),
+                "rows": None if span.rows is None else int(span.rows),
+            }
+            if record["rows"] and wall > 0:
+                record["rows_per_s"] = round(record["rows"] / wall, 1)
+            if self.trace_memory:
+                record["py_heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            record.update(span.extra)
+            span.record = record
+            self.steps.append(record)
+            rows = f", {record['rows']:,} rows" if record["rows"] is not None else ""
+            print(f"  ⏱ {name}: {wall:.3f}s wall, {record['cpu_s']:.3f}s cpu{rows}")
+
+    # -------------------------
+    # Report
+    # -------------------------
+    def _profile_summary(self, prof_path):
+        self._profiler.dump_stats(prof_path)
+        buf = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=buf)
+        top = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            top.append({
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": ncalls,
+                "tottime_s": round(tottime, 6),
+                "cumtime_s": round(cumtime, 6),
+            })
+        top.sort(key=lambda r: r["cumtime_s"], reverse=True)
+        return {"file": prof_path, "top_cumulative": top[:PROFILE_TOP_N]}
+
+    def write_report(self, status="ok"):
+        os.makedirs(self.report_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.report_dir, f"{self.script}-{stamp}-{os.getpid()}")
+
+        report = {
+            "script": self.script,
+            "started_at": self.started_at,
+            "status": status,
+            "argv": sys.argv[1:],
+            "args": {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v)
+                     for k, v in self.args.items()},
+            "python": sys.version.split()[0],
+            "wall_s": round(time.perf_counter() - self._wall0, 6),
+            "cpu_s": round(time.process_time() - self._cpu0, 6),
+            "child_cpu_s": round(_children_cpu_s() - self._child_cpu0, 6),
+            "peak_rss_mb": _peak_rss_mb(),
+            "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            "steps": self.steps,
+        }
+        if self._profiler is not None:
+            report["profile"] = self._profile_summary(base + ".prof")
+
+        self.report_path = base + ".json"
+        for path in (self.report_path, os.path.join(self.report_dir, f"{self.script}.latest.json")):
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(report, f, indent=2)
+            os.replace(tmp, path)
+        print(f"Run report written to {self.report_path}")
+        return self.report_path
+
+
+# ===========================
+# Run-over-run comparison
+# ===========================
+def compare(old, new):
+    """Rows of (step, old wall, new wall, ratio) for steps present in either report."""
+    old_steps = {s["name"]: s for s in old["steps"]}
+    rows = []
+    for step in new["steps"]:
+        prev = old_steps.pop(step["name"], None)
+        before = prev["wall_s"] if prev else None
+        ratio = step["wall_s"] / before if before else None
+        rows.append((step["name"], before, step["wall_s"], ratio))
+    rows.extend((name, s["wall_s"], None, None) for name, s in old_steps.items())
+    rows.append(("TOTAL", old["wall_s"], new["wall_s"], new["wall_s"] / old["wall_s"] if old["wall_s"] else None))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two pipeline run reports step by step.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Flag steps slower than this ratio.")
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    fmt = lambda v: "-" if v is None else f"{v:.3f}"  # noqa: E731
+    print(f"{'step':40s} {'old s':>10s} {'new s':>10s} {'ratio':>7s}")
+    for name, before, after, ratio in compare(old, new):
+        flag = "  ← slower" if ratio is not None and ratio > args.threshold else ""
+        print(f"{name[:40]:40s} {fmt(before):>10s} {fmt(after):>10s} {fmt(ratio):>7s}{flag}")
+
+
+if __name__ == "__main__":
+    main()
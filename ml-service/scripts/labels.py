@@ -0,0 +1,111 @@
+# scripts/labels.py
+
+import numpy as np
+import pandas as pd
+
+# Thresholds & mappings (tune here; train_model.py imports them)
+SIZE_THRESHOLDS = {
+    "LargeCap": 10e9,      # MarketCap ≥ $10B
+    "MidCap_min": 2e9,     # $2B ≤ MarketCap < $10B
+    "MidCap_max": 10e9,
+    "SmallCap_min": 300e6, # $300M ≤ MarketCap < $2B
+    "SmallCap_max": 2e9,
+    "MicroCap_max": 300e6  # MarketCap < $300M
+}
+
+STYLE_THRESHOLDS = {
+    "GrowthStock_rev_growth": 0.15,   # 15% YoY revenue growth
+    "ValueStock_pe": 15.0,            # P/E ≤ 15
+    "IncomeStock_div_yield": 0.03     # Dividend yield ≥ 3%
+}
+
+CYCLICAL_SECTORS = {
+    "Technology", "Consumer Discretionary", "Materials",
+    "Industrials", "Energy", "Communication Services"
+}
+# Any sector not in CYCLICAL_SECTORS → Defensive
+
+REQUIRED_COLS = ["MarketCap", "RevenueGrowth", "PE", "DividendYield", "sector"]
+
+# Label layout: size, style, economic sensitivity, then sector one-hots, then dividend policy
+SIZE_LABELS = ["LargeCap", "MidCap", "SmallCap", "MicroCap"]
+STYLE_LABELS = ["GrowthStock", "ValueStock", "IncomeStock", "BlueChipStock"]
+ECON_LABELS = ["Cyclical", "Defensive"]
+DIVIDEND_LABELS = ["DividendStock", "NonDividendStock"]
+
+
+def sector_column_name(sector):
+    return f"Sector_{sector.replace(' ', '')}"
+
+
+def encode_sectors(sector, cyclical_sectors=CYCLICAL_SECTORS):
+    """
+    Factorize the sector column once.
+
+    Returns (codes, sector_cols, code_to_col, cyclical_by_code): codes are -1 for
+    missing sectors, sector_cols the sorted one-hot column names, code_to_col maps
+    a code to its one-hot column, and cyclical_by_code is an int8 lookup table with
+    one extra trailing 0 so that code -1 (missing) indexes to "not cyclical".
+    """
+    codes, uniques = pd.factorize(sector, sort=True)
+    names = [sector_column_name(str(s)) for s in uniques]
+    sector_cols = sorted(set(names))
+    col_of_name = {name: j for j, name in enumerate(sector_cols)}
+    code_to_col = np.array([col_of_name[n] for n in names], dtype=np.int64)
+    cyclical_by_code = np.zeros(len(uniques) + 1, dtype=np.int8)
+    cyclical_by_code[:-1] = [s in cyclical_sectors for s in uniques]
+    return codes, sector_cols, code_to_col, cyclical_by_code
+
+
+def compute_label_matrix(df,
+                         size_thresholds=SIZE_THRESHOLDS,
+                         style_thresholds=STYLE_THRESHOLDS,
+                         cyclical_sectors=CYCLICAL_SECTORS):
+    """
+    Vectorized label engine: (y, label_cols) with y a preallocated int8 matrix of
+    shape (n_rows, n_labels). No label columns are added to `df`.
+    """
+    for col in REQUIRED_COLS:
+        if col not in df.columns:
+            raise KeyError(f"Missing column '{col}' in combined_data.csv. Found: {list(df.columns)}")
+
+    codes, sector_cols, code_to_col, cyclical_by_code = encode_sectors(df["sector"], cyclical_sectors)
+    label_cols = SIZE_LABELS + STYLE_LABELS + ECON_LABELS + sector_cols + DIVIDEND_LABELS
+    col = {name: j for j, name in enumerate(label_cols)}
+
+    n = len(df)
+    y = np.zeros((n, len(label_cols)), dtype=np.int8)
+
+    def numeric(name, fill):
+        values = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.where(np.isnan(values), fill, values)
+
+    # --- 1) Size Labels ---
+    mc = numeric("MarketCap", 0.0)
+    y[:, col["LargeCap"]] = mc >= size_thresholds["LargeCap"]
+    y[:, col["MidCap"]]   = (mc >= size_thresholds["MidCap_min"]) & (mc < size_thresholds["MidCap_max"])
+    y[:, col["SmallCap"]] = (mc >= size_thresholds["SmallCap_min"]) & (mc < size_thresholds["SmallCap_max"])
+    y[:, col["MicroCap"]] = mc < size_thresholds["MicroCap_max"]
+
+    # --- 2) Style Labels ---
+    dy = numeric("DividendYield", 0.0)
+    y[:, col["GrowthStock"]] = numeric("RevenueGrowth", 0.0) >= style_thresholds["GrowthStock_rev_growth"]
+    y[:, col["ValueStock"]]  = numeric("PE", 9999.0) <= style_thresholds["ValueStock_pe"]
+    y[:, col["IncomeStock"]] = dy >= style_thresholds["IncomeStock_div_yield"]
+    # Blue‐chip = LargeCap AND IncomeStock
+    y[:, col["BlueChipStock"]] = y[:, col["LargeCap"]] & y[:, col["IncomeStock"]]
+
+    # --- 3) Economic Sensitivity Labels (lookup by sector code; -1 hits the trailing 0) ---
+    y[:, col["Cyclical"]]  = cyclical_by_code[codes]
+    y[:, col["Defensive"]] = 1 - y[:, col["Cyclical"]]
+
+    # --- 4) Sector One‐Hot Encoding (one scatter from the codes) ---
+    has_sector = codes >= 0
+    first_sector = len(SIZE_LABELS + STYLE_LABELS + ECON_LABELS)
+    y[np.flatnonzero(has_sector), first_sector + code_to_col[codes[has_sector]]] = 1
+
+    # --- 5) Dividend Policy Labels ---
+    y[:, col["DividendStock"]]    = dy > 0
+    y[:, col["NonDividendStock"]] = 1 - y[:, col["DividendStock"]]
+
+    return y, label_cols
@@ -0,0 +1,224 @@
+# scripts/load_test.py
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+# ===========================
+# Load test for serve.py: throughput and memory vs. worker count
+# ===========================
+#   python scripts/load_test.py --synthetic --rows 200000 --workers 1,2,4 --duration 15
+#   python scripts/load_test.py --workspace .            # real artifacts under ml-service/
+#
+# For each worker count it starts serve.py, waits for /readyz, records the
+# workers' RSS and PSS (proportional set size: shared pages are split between
+# the processes mapping them, so a shared feature matrix is counted once), then
+# drives /predict from separate client processes for --duration seconds.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS_DIR  = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR  = os.path.join(PROJECT_ROOT, "data", "benchmarks")
+
+READY_TIMEOUT = 300.0
+SEED = 42
+
+
+# -------------------------
+# Server lifecycle
+# -------------------------
+def start_server(workspace, port, workers, backend):
+    env = dict(os.environ, INFERENCE_BACKEND=backend, APP_RELOAD_POLL_S="0",
+               APP_SHARED_FEATURES_DIR=os.path.join(workspace, "serving"))
+    log = open(os.path.join(workspace, f"serve-{workers}.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "serve.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        cwd=workspace, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def get(port, path, timeout=10.0):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def wait_ready(proc, port, workers):
+    """Until /readyz has answered 200 from every worker pid (connections land on arbitrary workers)."""
+    ready_pids, deadline = set(), time.monotonic() + READY_TIMEOUT
+    while len(ready_pids) < workers:
+        if proc.poll() is not None:
+            raise RuntimeError(f"serve.py exited with code {proc.returncode} before becoming ready.")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Only {len(ready_pids)}/{workers} workers ready after {READY_TIMEOUT}s.")
+        try:
+            status, body = get(port, "/readyz", timeout=2.0)
+            if status == 200:
+                ready_pids.add(json.loads(body)["pid"])
+                continue
+        except (ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return sorted(ready_pids)
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def memory_mb(pids):
+    """Summed RSS and PSS of `pids` in MB from /proc/<pid>/smaps_rollup (Linux only; None elsewhere)."""
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            return None, None
+    return round(rss / 1024, 1), round(pss / 1024, 1)
+
+
+# -------------------------
+# Load generation
+# -------------------------
+def _client(args):
+    port, tickers, duration, seed = args
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(tickers, size=100_000)
+    latencies, errors, i = [], 0, 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        try:
+            status, _ = get(port, f"/predict?ticker={picks[i % len(picks)]}")
+            if status != 200:
+                errors += 1
+        except OSError:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+    return latencies, errors
+
+
+def drive(port, tickers, clients, duration):
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        t0 = time.perf_counter()
+        parts = pool.map(_client, [(port, tickers, duration, SEED + k) for k in range(clients)])
+        elapsed = time.perf_counter() - t0
+    latencies = np.concatenate([np.asarray(lat) for lat, _ in parts]) * 1000.0
+    requests = int(latencies.size)
+    return {
+        "requests": requests,
+        "errors": int(sum(err for _, err in parts)),
+        "throughput_rps": round(requests / min(elapsed, duration + 1e-9), 1),
+        **{f"p{q}_ms": round(float(np.percentile(latencies, q)), 3) for q in (50, 90, 99)},
+    }
+
+
+# -------------------------
+# Workspace
+# -------------------------
+def synthetic_workspace(rows):
+    """Temp workspace with a synthetic combined_data.csv + matching model.npz (NumPy backend)."""
+    from benchmark import make_combined, make_numpy_model
+
+    workspace = tempfile.mkdtemp(prefix="investimate_load_")
+    os.makedirs(os.path.join(workspace, "data", "processed"))
+    combined = make_combined(rows)
+    combined.to_csv(os.path.join(workspace, "data", "processed", "combined_data.csv"), index=False)
+    make_numpy_model(os.path.join(workspace, "model.npz"), combined)
+    return workspace
+
+
+def load_tickers(workspace):
+    path = os.path.join(workspace, "data", "processed", "combined_data.csv")
+    symbols = pd.Series(storage.read_columns(path, ["symbol"])["symbol"]).dropna().astype(str)
+    return symbols.str.upper().unique().tolist()
+
+
+def parse_args(argv=None):
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    parser = argparse.ArgumentParser(description="Load-test serve.py across worker counts.")
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)),
+                        help="Comma-separated worker counts to test (default: 1,2,4 up to the CPU count).")
+    parser.add_argument("--clients", type=int, default=None,
+                        help="Client processes generating load (default: 2 × the largest worker count).")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count.")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--backend", choices=("numpy", "keras"), default="numpy")
+    parser.add_argument("--synthetic", action="store_true", help="Generate a synthetic workspace.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows of synthetic combined_data.")
+    parser.add_argument("--workspace", default=PROJECT_ROOT,
+                        help="Directory holding model.npz/model.h5 and data/processed/ (ignored with --synthetic).")
+    parser.add_argument("--output", help=f"Results JSON (default {RESULTS_DIR}/load-<timestamp>.json).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    clients = args.clients or 2 * max(worker_counts)
+
+    workspace = synthetic_workspace(args.rows) if args.synthetic else os.path.abspath(args.workspace)
+    tickers = load_tickers(workspace)
+    print(f"Workspace {workspace}: {len(tickers):,} tickers; {clients} client processes, {args.duration}s per run.")
+
+    results = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpus": os.cpu_count(), "clients": clients,
+               "duration_s": args.duration, "backend": args.backend, "tickers": len(tickers), "runs": []}
+    try:
+        for n in worker_counts:
+            proc = start_server(workspace, args.port, n, args.backend)
+            try:
+                pids = wait_ready(proc, args.port, n)
+                rss, pss = memory_mb(pids)
+                run = {"workers": n, "rss_mb": rss, "pss_mb": pss, **drive(args.port, tickers, clients, args.duration)}
+                run["rss_after_mb"], run["pss_after_mb"] = memory_mb(pids)
+            finally:
+                stop_server(proc)
+            results["runs"].append(run)
+            print(f"  workers={n:<3d} {run['throughput_rps']:>9,.0f} req/s  p50 {run['p50_ms']:7.2f} ms  "
+                  f"p99 {run['p99_ms']:7.2f} ms  errors {run['errors']}  RSS {run['rss_after_mb']} MB  "
+                  f"PSS {run['pss_after_mb']} MB")
+    finally:
+        if args.synthetic:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    base = results["runs"][0] if results["runs"] else None
+    for run in results["runs"]:
+        run["speedup"] = round(run["throughput_rps"] / base["throughput_rps"], 2) if base["throughput_rps"] else None
+
+    out = args.output or os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
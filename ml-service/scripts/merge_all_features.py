@@ -1,8 +1,15 @@
 # File: ml-service/scripts/merge_all_features.py
 
+import argparse
+import numpy as np
 import pandas as pd
 import os
 
+import instrumentation
+import storage
+from feature_history import FeatureHistory, to_days
+from labels import encode_sectors
+
 # ===========================
 # 1) HARDCODED FILEPATHS
 # ===========================
@@ -12,58 +19,137 @@ PROCESSED_DIR       = os.path.join(PROJECT_ROOT, "data", "processed")
 FUND_CLEAN_CSV      = os.path.join(PROCESSED_DIR, "fundamentals_clean.csv")
 PRICE_FEATS_CSV     = os.path.join(PROCESSED_DIR, "price_features.csv")
 COMBINED_OUTPUT_CSV = os.path.join(PROCESSED_DIR, "combined_data.csv")
+SECTOR_TABLE_DIR    = os.path.join(PROCESSED_DIR, "history", "sectors")  # per-symbol sectors for /predict?as_of=
+
+
+# ===========================
+# 2) PER-SYMBOL SECTOR TABLE
+# ===========================
+def sector_onehots(df):
+    """{Sector_*: 0/1 column} from the Sector_* columns, else from a raw 'sector' column; None if neither."""
+    sector_cols = sorted(c for c in df.columns if c.startswith("Sector_"))
+    if sector_cols:
+        return {c: df[c].to_numpy(dtype=np.float64) for c in sector_cols}
+    if "sector" not in df.columns:
+        return None
+    codes, sector_cols, code_to_col, _ = encode_sectors(df["sector"])
+    onehot = np.zeros((len(df), len(sector_cols)))
+    has = np.flatnonzero(codes >= 0)
+    onehot[has, code_to_col[codes[has]]] = 1.0
+    return {c: onehot[:, j] for j, c in enumerate(sector_cols)}
 
 
-def main():
-    # 1) Ensure processed directory exists
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
-
-    # 2) Load cleaned fundamentals
-    print(f"Loading fundamentals from:\n  {FUND_CLEAN_CSV}")
-    try:
-        df_fund = pd.read_csv(FUND_CLEAN_CSV, dtype={"company_id": str})
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Could not find '{FUND_CLEAN_CSV}'. Ensure merge_fundamentals.py has run successfully."
-        )
-    print(f"  → Fundamentals shape: {df_fund.shape} (columns: {list(df_fund.columns)})") 
-
-    # 3) Load price features
-    print(f"Loading price features from:\n  {PRICE_FEATS_CSV}")
-    try:
-        df_price = pd.read_csv(PRICE_FEATS_CSV, dtype={"symbol": str})
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Could not find '{PRICE_FEATS_CSV}'. Ensure compute_price_features.py has run successfully."
-        )
-    print(f"  → Price features shape: {df_price.shape} (columns: {list(df_price.columns)})") 
-
-    # 4) Align keys: fundamentals use 'company_id', price features use 'symbol' 
-    #    We assume company_id == ticker symbol, so rename for merging
-    df_fund_renamed = df_fund.rename(columns={"company_id": "symbol"})
-    print(f"Renamed 'company_id' to 'symbol' in fundamentals. New columns: {list(df_fund_renamed.columns)}")
-
-    # 5) Merge on 'symbol' with inner join (keep only tickers present in both)
-    print("Merging fundamentals with price features on 'symbol' …")
-    df_combined = pd.merge(
-        df_fund_renamed,
-        df_price,
-        on="symbol",
-        how="inner",
-        validate="one_to_one"   # ensures no duplicates on either side 
+def update_sector_table(df, directory=SECTOR_TABLE_DIR, today=None):
+    """
+    Merge the sectors of `df` into the stored per-symbol table: its symbols get
+    today's row, symbols that have dropped out keep their last stored row, so an
+    as-of prediction for a delisted ticker still finds its sector. Returns the
+    merged FeatureHistory (one row per symbol), or None if `df` has no sectors.
+    """
+    current = sector_onehots(df)
+    if current is None:
+        return None
+    symbols = df["symbol"].astype(str).to_numpy()
+    dates = np.full(len(symbols), to_days(today or np.datetime64("today", "D")), dtype=np.int64)
+
+    if FeatureHistory.exists(directory):
+        old = FeatureHistory.open(directory)
+        gone = sorted(set(old.symbols) - set(symbols))
+        last = np.array([old.span(sym)[1] - 1 for sym in gone], dtype=np.int64)
+        for col in old.columns:
+            current.setdefault(col, np.zeros(len(symbols)))
+        for col in current:
+            kept = old.columns[col][last] if col in old.columns else np.zeros(len(gone))
+            current[col] = np.concatenate([current[col], kept])
+        symbols = np.concatenate([symbols, np.asarray(gone, dtype=object).astype(str)])
+        dates = np.concatenate([dates, np.asarray(old.dates, dtype=np.int64)[last]])
+
+    table = FeatureHistory.from_arrays(symbols, dates.astype("datetime64[D]"), dict(sorted(current.items())))
+    table.save(directory)
+    return table
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Join fundamentals_clean with price_features into combined_data.")
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=storage.DEFAULT_FORMAT,
+        help="Storage format for combined_data (default: $STORAGE_FORMAT or csv; "
+             "'npy' gives the memory-mappable layout app.py can load zero-copy)."
     )
-    print(f"  → After merge: {df_combined.shape[0]:,} rows × {df_combined.shape[1]:,} columns")
-
-    # 6) Optional: Reorder columns so that 'symbol' comes first, then fundamentals, then price features
-    cols = ["symbol"] + \
-           [c for c in df_combined.columns if c not in ["symbol","volatility","momentum"]] + \
-           ["volatility","momentum"]
-    df_combined = df_combined[cols]
-
-    # 7) Save combined dataset
-    print(f"Saving combined dataset to:\n  {COMBINED_OUTPUT_CSV}")
-    df_combined.to_csv(COMBINED_OUTPUT_CSV, index=False)
-    print("Done: 'combined_data.csv' created under data/processed/.")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with instrumentation.Run("merge_all_features", args) as run:
+        # 1) Ensure processed directory exists
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+
+        # 2) Load cleaned fundamentals
+        with run.step("2) load fundamentals") as step:
+            print(f"Loading fundamentals from:\n  {FUND_CLEAN_CSV}")
+            try:
+                df_fund = storage.read_table(FUND_CLEAN_CSV, dtype={"company_id": str})
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    f"Could not find '{FUND_CLEAN_CSV}'. Ensure merge_fundamentals.py has run successfully."
+                )
+            step.rows = len(df_fund)
+            print(f"  → Fundamentals shape: {df_fund.shape} (columns: {list(df_fund.columns)})") 
+
+        # 3) Load price features
+        with run.step("3) load price features") as step:
+            print(f"Loading price features from:\n  {PRICE_FEATS_CSV}")
+            try:
+                df_price = storage.read_table(PRICE_FEATS_CSV, dtype={"symbol": str})
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    f"Could not find '{PRICE_FEATS_CSV}'. Ensure compute_price_features.py has run successfully."
+                )
+            step.rows = len(df_price)
+            print(f"  → Price features shape: {df_price.shape} (columns: {list(df_price.columns)})") 
+
+        # 4) Align keys: fundamentals use 'company_id', price features use 'symbol' 
+        #    We assume company_id == ticker symbol, so rename for merging
+        df_fund_renamed = df_fund.rename(columns={"company_id": "symbol"})
+        print(f"Renamed 'company_id' to 'symbol' in fundamentals. New columns: {list(df_fund_renamed.columns)}")
+
+        # 5) Merge on 'symbol' with inner join (keep only tickers present in both)
+        with run.step("5) merge on symbol") as step:
+            print("Merging fundamentals with price features on 'symbol' …")
+            df_combined = pd.merge(
+                df_fund_renamed,
+                df_price,
+                on="symbol",
+                how="inner",
+                validate="one_to_one"   # ensures no duplicates on either side 
+            )
+            step.rows = len(df_combined)
+            print(f"  → After merge: {df_combined.shape[0]:,} rows × {df_combined.shape[1]:,} columns")
+
+        # 6) Optional: Reorder columns so that 'symbol' comes first, then fundamentals, then price features
+        cols = ["symbol"] + \
+               [c for c in df_combined.columns if c not in ["symbol","volatility","momentum"]] + \
+               ["volatility","momentum"]
+        df_combined = df_combined[cols]
+
+        # 7) Save combined dataset
+        with run.step("7) save combined", rows=len(df_combined)):
+            out_path = storage.table_path(COMBINED_OUTPUT_CSV, args.format)
+            print(f"Saving combined dataset to:\n  {out_path}")
+            storage.write_table(df_combined, COMBINED_OUTPUT_CSV, args.format)
+
+        # 8) Keep every symbol's sector, including tickers that have left combined_data
+        with run.step("8) update sector table") as step:
+            table = update_sector_table(df_combined)
+            if table is None:
+                print("No sector columns in the combined data; sector table not updated.")
+            else:
+                step.rows = len(table)
+                print(f"  → Sector table: {len(table):,} symbols × {len(table.columns)} sectors in:\n  {SECTOR_TABLE_DIR}")
+        print(f"Done: '{os.path.basename(out_path)}' created under data/processed/.")
 
 
 if __name__ == "__main__":
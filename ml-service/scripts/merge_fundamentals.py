@@ -1,8 +1,15 @@
 # File: ml-service/scripts/merge_fundamentals.py
 
+import argparse
+import re
+import numpy as np
 import pandas as pd
 import os
 
+import instrumentation
+import storage
+from feature_history import FeatureHistory
+
 # ===========================
 # 1) HARDCODED FILEPATHS
 # ===========================
@@ -13,74 +20,277 @@ PROCESSED_DIR      = os.path.join(PROJECT_ROOT, "data", "processed")
 INDICATORS_CSV     = os.path.join(RAW_DIR, "indicators_by_company.csv")
 COMPANIES_CSV      = os.path.join(RAW_DIR, "companies.csv")
 FUNDAMENTALS_CLEAN = os.path.join(PROCESSED_DIR, "fundamentals_clean.csv")
+FUNDAMENTALS_CUBE  = os.path.join(PROCESSED_DIR, "fundamentals_cube.npz")  # all years, reusable
+FUNDAMENTALS_HISTORY_DIR = os.path.join(PROCESSED_DIR, "history", "fundamentals")  # --history (as-of store)
 
+# ===========================
+# 2) PARAMETERS
+# ===========================
+DEFAULT_YEAR = "2016"   # snapshot year written to fundamentals_clean ("latest" = newest non-null)
+YEAR_COLUMN  = re.compile(r"^\d{4}$")
+YEAR_END     = "12-31"  # fiscal year end assumed for every company (the raw data has no period dates)
+# Annual figures are only public once the 10-K is filed (60-90 days after year end
+# for US filers), so the feature history dates a year's values YEAR_END + this lag;
+# dating them at year end would let as-of predictions see numbers before publication
+PUBLICATION_LAG_DAYS = 90
 
-def main():
-    # 1) Ensure the processed directory exists
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-    # 2) Load the wide-format fundamentals CSV (2010–2016)
-    print(f"Loading indicators (wide-by-year) from:\n  {INDICATORS_CSV}")
-    try:
-        df_ind = pd.read_csv(
-            INDICATORS_CSV,
-            dtype={"company_id": str, "indicator_id": str}
-        )
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Could not find '{INDICATORS_CSV}'. Ensure it exists under ml-service/data/raw/."
-        )
-    print(f"  → Read {df_ind.shape[0]:,} rows, columns = {list(df_ind.columns)}")
+# ===========================
+# 3) MULTI-YEAR PIVOT ENGINE
+# ===========================
+class IndicatorCube:
+    """
+    (company × indicator × year) view of indicators_by_company.csv.
 
-    # 3) Extract the 2016 values for each (company_id, indicator_id)
-    if "2016" not in df_ind.columns:
-        raise KeyError(
-            f"Expected a column named '2016' in {INDICATORS_CSV}, but it was not found.\n"
-            f"Available columns: {list(df_ind.columns)}"
-        )
-    df_2016 = df_ind[["company_id", "indicator_id", "2016"]].copy()
-    df_2016.rename(columns={"2016": "value_2016"}, inplace=True)
-    print("  → Extracted 2016 values into 'value_2016' column.")
-
-    # 4) Pivot so each indicator_id becomes its own column (with the 2016 value)
-    print("Pivoting so that each indicator_id becomes a column (2016 values) …")
-    df_wide = df_2016.pivot_table(
-        index="company_id",
-        columns="indicator_id",
-        values="value_2016"
-    ).reset_index()
-    df_wide.columns.name = None  # remove the pivot_table name
-    print(f"  → Pivoted DataFrame has shape {df_wide.shape}")
-
-    # 5) Load company metadata from companies.csv
-    print(f"Loading company metadata from:\n  {COMPANIES_CSV}")
-    try:
-        df_comp = pd.read_csv(
-            COMPANIES_CSV,
-            dtype={"company_id": str, "name_latest": str, "names_previous": str}
+    company_id / indicator_id are factorized once into sorted integer codes and
+    the values of every year are scattered in one vectorized pass. Storage is
+    sparse over (company, indicator) cells that actually occur: `cells` holds the
+    flat code company * n_indicators + indicator, `values` one row per cell and
+    one column per year (mean of duplicates, like pivot_table; NaN if missing).
+    """
+
+    def __init__(self, companies, indicators, years, cells, values):
+        self.companies = np.asarray(companies, dtype=object)
+        self.indicators = np.asarray(indicators, dtype=object)
+        self.years = [str(y) for y in years]
+        self.cells = np.asarray(cells, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @classmethod
+    def from_long(cls, df_ind, years=None):
+        """Build from the raw frame: company_id, indicator_id, one column per year."""
+        years = years or sorted(c for c in df_ind.columns if YEAR_COLUMN.match(str(c)))
+        if not years:
+            raise KeyError(f"No year columns (e.g. '2016') found. Available: {list(df_ind.columns)}")
+
+        comp_codes, companies = pd.factorize(df_ind["company_id"], sort=True)
+        ind_codes, indicators = pd.factorize(df_ind["indicator_id"], sort=True)
+        keep = (comp_codes >= 0) & (ind_codes >= 0)  # pivot_table drops missing keys
+        flat = comp_codes[keep].astype(np.int64) * len(indicators) + ind_codes[keep]
+        cells, cell_of_row = np.unique(flat, return_inverse=True)
+
+        # Scatter every (row, year) value into its (cell, year) slot in one bincount
+        vals = df_ind.loc[keep, years].to_numpy(dtype=np.float64)
+        observed = ~np.isnan(vals)
+        n_years = len(years)
+        slot = (cell_of_row[:, None] * n_years + np.arange(n_years)).ravel()
+        size = len(cells) * n_years
+        sums = np.bincount(slot, weights=np.where(observed, vals, 0.0).ravel(), minlength=size)
+        counts = np.bincount(slot, weights=observed.ravel(), minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.where(counts > 0, sums / counts, np.nan).reshape(len(cells), n_years)
+        return cls(companies, indicators, years, cells, values)
+
+    # -------------------------
+    # Views
+    # -------------------------
+    def _scatter(self, cell_values, fill=np.nan):
+        """Dense (n_companies, n_indicators) matrix from one value per cell."""
+        cell_values = np.asarray(cell_values)
+        dense = np.full(len(self.companies) * len(self.indicators), fill, dtype=cell_values.dtype)
+        dense[self.cells] = cell_values
+        return dense.reshape(len(self.companies), len(self.indicators))
+
+    def year(self, year):
+        """Dense (company × indicator) matrix for one year."""
+        year = str(year)
+        if year not in self.years:
+            raise KeyError(f"Year '{year}' not in indicator data. Available years: {self.years}")
+        return self._scatter(self.values[:, self.years.index(year)])
+
+    def latest(self, as_of=None):
+        """
+        Latest non-null value per (company, indicator) across years ≤ `as_of`
+        (all years if None), plus the matrix of years it came from (0 = none).
+        """
+        n_years = len(self.years)
+        if as_of is not None:
+            n_years = sum(int(y) <= int(as_of) for y in self.years)
+        picked = np.full(len(self.cells), np.nan)
+        from_year = np.zeros(len(self.cells), dtype=np.int64)
+        if n_years:
+            vals = self.values[:, :n_years]
+            observed = ~np.isnan(vals)
+            has = observed.any(axis=1)
+            # Position of the last observed year per cell
+            last = n_years - 1 - np.argmax(observed[:, ::-1], axis=1)
+            picked[has] = vals[has, last[has]]
+            from_year[has] = np.array([int(y) for y in self.years[:n_years]])[last[has]]
+        return self._scatter(picked), self._scatter(from_year, fill=0)
+
+    def to_history(self):
+        """
+        FeatureHistory with one row per (company, year) that has any value, dated
+        when the year's figures are assumed public (YEAR_END + PUBLICATION_LAG_DAYS),
+        and one column per indicator. Values are carried forward across years, so
+        an as-of row matches latest(as_of=year).
+        """
+        n_ind, n_years = len(self.indicators), len(self.years)
+        comp, ind = self.cells // n_ind, self.cells % n_ind
+        observed = ~np.isnan(self.values)
+
+        # Company-years with at least one observation become the rows
+        has = np.zeros((len(self.companies), n_years), dtype=bool)
+        np.logical_or.at(has, comp, observed)
+        row_comp, row_year = np.nonzero(has)
+        row_of = np.full(has.shape, -1, dtype=np.int64)
+        row_of[row_comp, row_year] = np.arange(len(row_comp))
+
+        values = np.full((len(row_comp), n_ind), np.nan, dtype=np.float32)
+        cell, year = np.nonzero(observed)
+        values[row_of[comp[cell], year], ind[cell]] = self.values[cell, year]
+        published = np.array([f"{y}-{YEAR_END}" for y in self.years], dtype="datetime64[D]") + PUBLICATION_LAG_DAYS
+        dates = published[row_year]
+        return FeatureHistory.from_arrays(
+            self.companies[row_comp].astype(str), dates,
+            {name: values[:, j] for j, name in enumerate(self.indicators.astype(str))}, ffill=True,
         )
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Could not find '{COMPANIES_CSV}'. Ensure it exists under ml-service/data/raw/."
+
+    def dense(self):
+        """Full (company × indicator × year) array; only for universes that fit in memory."""
+        cube = np.full((len(self.companies) * len(self.indicators), len(self.years)), np.nan)
+        cube[self.cells] = self.values
+        return cube.reshape(len(self.companies), len(self.indicators), len(self.years))
+
+    def to_frame(self, matrix):
+        """
+        Wide DataFrame (company_id + one column per indicator) from a company ×
+        indicator matrix, dropping all-NaN rows/columns exactly like pivot_table.
+        """
+        row_ok = ~np.isnan(matrix).all(axis=1)
+        col_ok = ~np.isnan(matrix).all(axis=0)
+        df_wide = pd.DataFrame(matrix[np.ix_(row_ok, col_ok)], columns=list(self.indicators[col_ok]))
+        df_wide.insert(0, "company_id", self.companies[row_ok])
+        return df_wide
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, path):
+        np.savez(
+            path,
+            companies=self.companies.astype(str), indicators=self.indicators.astype(str),
+            years=np.array(self.years), cells=self.cells, values=self.values,
         )
-    print(f"  → Read {df_comp.shape[0]:,} rows, columns = {list(df_comp.columns)}")
-
-    # 6) Merge pivoted fundamentals with company metadata on company_id
-    print("Merging pivoted fundamentals with company metadata …")
-    df_merged = pd.merge(
-        df_wide,
-        df_comp[["company_id", "name_latest", "names_previous"]],
-        on="company_id",
-        how="left"
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z["companies"], z["indicators"], z["years"], z["cells"], z["values"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pivot indicators_by_company.csv into fundamentals_clean.")
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=storage.DEFAULT_FORMAT,
+        help="Storage format for fundamentals_clean (default: $STORAGE_FORMAT or csv)."
+    )
+    parser.add_argument(
+        "--year", default=DEFAULT_YEAR,
+        help=f"Year to snapshot (default {DEFAULT_YEAR}), or 'latest' for the newest non-null value per indicator."
     )
-    print(f"  → After merge: {df_merged.shape[0]:,} rows × {df_merged.shape[1]:,} columns")
+    parser.add_argument(
+        "--history", action="store_true",
+        help=f"Also write every year as a point-in-time store in {FUNDAMENTALS_HISTORY_DIR} "
+             f"(a year's values become visible {PUBLICATION_LAG_DAYS} days after {YEAR_END})."
+    )
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with instrumentation.Run("merge_fundamentals", args) as run:
+        # 1) Ensure the processed directory exists
+        os.makedirs(PROCESSED_DIR, exist_ok=True)
+
+        # 2) Load the wide-format fundamentals CSV (2010–2016)
+        with run.step("2) load indicators") as step:
+            print(f"Loading indicators (wide-by-year) from:\n  {INDICATORS_CSV}")
+            try:
+                df_ind = pd.read_csv(
+                    INDICATORS_CSV,
+                    dtype={"company_id": str, "indicator_id": str}
+                )
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    f"Could not find '{INDICATORS_CSV}'. Ensure it exists under ml-service/data/raw/."
+                )
+            step.rows = len(df_ind)
+            print(f"  → Read {df_ind.shape[0]:,} rows, columns = {list(df_ind.columns)}")
+
+        # 3) Encode company_id / indicator_id once and scatter ALL years into the cube
+        if args.year != "latest" and args.year not in df_ind.columns:
+            raise KeyError(
+                f"Expected a column named '{args.year}' in {INDICATORS_CSV}, but it was not found.\n"
+                f"Available columns: {list(df_ind.columns)}"
+            )
+        with run.step("3) build indicator cube", rows=len(df_ind)) as step:
+            print("Building (company × indicator × year) cube …")
+            cube = IndicatorCube.from_long(df_ind)
+            cube.save(FUNDAMENTALS_CUBE)
+            step.extra["cells"] = int(len(cube.cells))
+            print(f"  → {len(cube.companies):,} companies × {len(cube.indicators):,} indicators × "
+                  f"{len(cube.years)} years ({cube.years[0]}–{cube.years[-1]}), {len(cube.cells):,} populated cells.")
+            print(f"  → Saved cube to:\n  {FUNDAMENTALS_CUBE}")
+
+        # 3b) Optionally lay out every year per company for as-of lookups
+        if args.history:
+            with run.step("3b) save fundamentals history") as step:
+                history = cube.to_history()
+                history.save(FUNDAMENTALS_HISTORY_DIR)
+                step.rows = len(history)
+                print(f"  → {len(history):,} company-years for {len(history.symbols):,} companies saved to:\n"
+                      f"  {FUNDAMENTALS_HISTORY_DIR}")
+
+        # 4) Select the requested year (or latest non-null) so each indicator_id becomes its own column
+        with run.step("4) select year") as step:
+            if args.year == "latest":
+                print("Selecting the latest non-null value per (company, indicator) …")
+                matrix, _ = cube.latest()
+            else:
+                print(f"Selecting {args.year} values (one column per indicator_id) …")
+                matrix = cube.year(args.year)
+            df_wide = cube.to_frame(matrix)
+            step.rows = len(df_wide)
+            print(f"  → Pivoted DataFrame has shape {df_wide.shape}")
+
+        # 5) Load company metadata from companies.csv
+        with run.step("5) load companies") as step:
+            print(f"Loading company metadata from:\n  {COMPANIES_CSV}")
+            try:
+                df_comp = pd.read_csv(
+                    COMPANIES_CSV,
+                    dtype={"company_id": str, "name_latest": str, "names_previous": str}
+                )
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    f"Could not find '{COMPANIES_CSV}'. Ensure it exists under ml-service/data/raw/."
+                )
+            step.rows = len(df_comp)
+            print(f"  → Read {df_comp.shape[0]:,} rows, columns = {list(df_comp.columns)}")
+
+        # 6) Merge pivoted fundamentals with company metadata on company_id
+        with run.step("6) merge company metadata") as step:
+            print("Merging pivoted fundamentals with company metadata …")
+            df_merged = pd.merge(
+                df_wide,
+                df_comp[["company_id", "name_latest", "names_previous"]],
+                on="company_id",
+                how="left"
+            )
+            step.rows = len(df_merged)
+            print(f"  → After merge: {df_merged.shape[0]:,} rows × {df_merged.shape[1]:,} columns")
 
-    # 7) No filtering on exchange/sector (companies.csv has no such columns)
+        # 7) No filtering on exchange/sector (companies.csv has no such columns)
 
-    # 8) Save the cleaned fundamentals to CSV
-    print(f"Saving cleaned fundamentals to:\n  {FUNDAMENTALS_CLEAN}")
-    df_merged.to_csv(FUNDAMENTALS_CLEAN, index=False)
-    print("Done: 'fundamentals_clean.csv' created under data/processed/.")
+        # 8) Save the cleaned fundamentals (CSV by default, or a binary columnar format)
+        with run.step("8) save fundamentals", rows=len(df_merged)):
+            out_path = storage.table_path(FUNDAMENTALS_CLEAN, args.format)
+            print(f"Saving cleaned fundamentals to:\n  {out_path}")
+            storage.write_table(df_merged, FUNDAMENTALS_CLEAN, args.format)
+        print(f"Done: '{os.path.basename(out_path)}' created under data/processed/.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+# scripts/micro_batcher.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("features", "predict_fn", "future", "enqueued_at")
+
+    def __init__(self, features, predict_fn):
+        self.features = features
+        self.predict_fn = predict_fn
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Coalesces single-row predictions arriving from concurrent requests.
+
+    A background thread takes the first waiting request, keeps collecting until
+    `max_batch_size` rows are queued or `max_wait_ms` has passed since that first
+    request arrived, runs ONE `predict_fn` call on the stacked rows and fans the
+    output rows back out to the waiting callers. A request that is alone in flight
+    (nothing queued, nothing being computed) is dispatched at once: with no
+    concurrent traffic there is nothing to wait for, and the window would only
+    add latency.
+
+    A request may carry its own `predict_fn` (e.g. the model of the artifact version
+    it started on); rows are only ever stacked with rows for the same function, so a
+    hot reload never mixes model versions inside one forward pass.
+    """
+
+    def __init__(self, predict_fn=None, max_batch_size=64, max_wait_ms=2.0):
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be >= 1, got {max_batch_size}")
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = 0  # submitted requests whose future is not resolved yet
+        self._reset_counters()
+
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def _reset_counters(self):
+        self._batches = 0
+        self._requests = 0
+        self._immediate = 0
+        self._batch_size_counts = {}
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+        self._forward_total = 0.0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def submit(self, features, predict_fn=None):
+        """Queue one (1, n_features) row; returns a Future resolving to its (n_labels,) output."""
+        predict_fn = predict_fn or self.predict_fn
+        if predict_fn is None:
+            raise ValueError("No predict_fn given to submit() and no default set on the batcher.")
+        req = _Request(features, predict_fn)
+        with self._lock:
+            self._in_flight += 1
+        self._queue.put(req)
+        return req.future
+
+    def predict(self, features, timeout=None, predict_fn=None):
+        """Blocking helper: submit one row and wait for its output row."""
+        return self.submit(features, predict_fn).result(timeout=timeout)
+
+    def stats(self, reset=False):
+        """Snapshot of the tuning counters (batch sizes + queueing delay)."""
+        with self._lock:
+            batches = self._batches
+            requests = self._requests
+            snapshot = {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "requests": requests,
+                "immediate_dispatches": self._immediate,
+                "mean_batch_size": (requests / batches) if batches else 0.0,
+                "batch_size_counts": {str(k): v for k, v in sorted(self._batch_size_counts.items())},
+                "mean_queue_delay_ms": (self._queue_delay_total / requests * 1000.0) if requests else 0.0,
+                "max_queue_delay_ms": self._queue_delay_max * 1000.0,
+                "mean_forward_ms": (self._forward_total / batches * 1000.0) if batches else 0.0,
+            }
+            if reset:
+                self._reset_counters()
+        return snapshot
+
+    # -------------------------
+    # Worker loop
+    # -------------------------
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        with self._lock:
+            alone = self._in_flight == 1
+            self._immediate += alone
+        if alone:
+            return batch
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window closed: still sweep up anything already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            # Usually one group; more only while a reload has requests on two model versions
+            groups = {}
+            for req in collected:
+                groups.setdefault(req.predict_fn, []).append(req)
+            for batch in groups.values():
+                self._forward(batch)
+
+    def _forward(self, batch):
+        started = time.perf_counter()
+        try:
+            outputs = batch[0].predict_fn(np.concatenate([req.features for req in batch], axis=0))
+        except Exception as exc:  # propagate to every waiting request
+            with self._lock:
+                self._in_flight -= len(batch)
+            for req in batch:
+                req.future.set_exception(exc)
+            return
+        finished = time.perf_counter()
+
+        with self._lock:
+            self._in_flight -= len(batch)
+        for i, req in enumerate(batch):
+            req.future.set_result(outputs[i])
+
+        delays = [started - req.enqueued_at for req in batch]
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+            self._queue_delay_total += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+            self._forward_total += finished - started
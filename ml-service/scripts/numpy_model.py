@@ -0,0 +1,114 @@
+# scripts/numpy_model.py
+
+import numpy as np
+
+
+def _relu(z):
+    return np.maximum(z, 0.0)
+
+
+def _sigmoid(z):
+    # tanh form avoids overflow warnings from exp() on large |z|
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+ACTIVATIONS = {
+    "linear": lambda z: z,
+    "relu": _relu,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+    "softmax": _softmax,
+}
+
+
+class NumpyScaler:
+    """Drop-in for the fitted StandardScaler's transform() (mean/scale from the .npz)."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class NumpyModel:
+    """
+    Pure-NumPy forward pass for the Dense/Dropout MLP built by train_model.build_model.
+
+    Dropout is the identity at inference time, so only the Dense kernels, biases
+    and activations are kept. `predict` mirrors the Keras signature used by app.py.
+    """
+
+    def __init__(self, layers, feature_names, label_names, scaler=None):
+        # layers: list of (kernel (in, out) float32, bias (out,) float32, activation name)
+        self.layers = []
+        for kernel, bias, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation '{activation}' in exported model.")
+            self.layers.append((
+                np.ascontiguousarray(kernel, dtype=np.float32),
+                np.ascontiguousarray(bias, dtype=np.float32),
+                activation,
+            ))
+        self.feature_names = list(feature_names)
+        self.label_names = list(label_names)
+        self.scaler = scaler
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as art:
+            n_layers = int(art["n_layers"])
+            activations = [str(a) for a in art["activations"]]
+            layers = [(art[f"W{i}"], art[f"b{i}"], activations[i]) for i in range(n_layers)]
+            scaler = NumpyScaler(art["scaler_mean"], art["scaler_scale"])
+            return cls(
+                layers,
+                [str(f) for f in art["feature_names"]],
+                [str(l) for l in art["label_names"]],
+                scaler=scaler,
+            )
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    def predict(self, x, batch_size=None, verbose=0):
+        """Sigmoid outputs for a (n_rows, n_features) matrix; extra Keras kwargs are ignored."""
+        h = np.asarray(x, dtype=np.float32)
+        if h.ndim == 1:
+            h = h[None, :]
+        for kernel, bias, activation in self.layers:
+            h = ACTIVATIONS[activation](h @ kernel + bias)
+        return h
+
+    def embed(self, x, layer=-2):
+        """Activations of Dense layer `layer` (default the penultimate one, i.e. the 64-unit layer)."""
+        h = np.asarray(x, dtype=np.float32)
+        if h.ndim == 1:
+            h = h[None, :]
+        for kernel, bias, activation in self.layers[: len(self.layers) + layer + 1 if layer < 0 else layer + 1]:
+            h = ACTIVATIONS[activation](h @ kernel + bias)
+        return h
+
+
+def save_npz(path, layers, feature_names, label_names, scaler_mean, scaler_scale):
+    """Write the single-file artifact read by NumpyModel.load."""
+    arrays = {
+        "n_layers": np.int64(len(layers)),
+        "activations": np.array([a for _, _, a in layers]),
+        "feature_names": np.array(feature_names, dtype=str),
+        "label_names": np.array(label_names, dtype=str),
+        "scaler_mean": np.asarray(scaler_mean, dtype=np.float64),
+        "scaler_scale": np.asarray(scaler_scale, dtype=np.float64),
+    }
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"W{i}"] = np.asarray(kernel, dtype=np.float32)
+        arrays[f"b{i}"] = np.asarray(bias, dtype=np.float32)
+    np.savez(path, **arrays)
@@ -0,0 +1,180 @@
+# scripts/screener.py
+
+import re
+
+import numpy as np
+
+# Set bits per byte value, for counting matches without unpacking the bitset
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|(&|,)|(\|)|(!)|([A-Za-z_][\w.]*))")
+
+
+class QueryError(ValueError):
+    """Malformed screener query or unknown label name."""
+
+
+# -------------------------
+# Query parsing
+# -------------------------
+#   expr   := term (OR term)*
+#   term   := factor ((AND | & | ,) factor)*
+#   factor := (NOT | !) factor | "(" expr ")" | label
+#
+# Labels are matched case-insensitively; sector labels may drop their "Sector_" prefix.
+#   "SmallCap AND GrowthStock AND NOT DividendStock AND Technology"
+#   "(LargeCap | MidCap), !Cyclical"
+def tokenize(query):
+    tokens, pos = [], 0
+    query = query.rstrip()
+    while pos < len(query):
+        m = _TOKEN.match(query, pos)
+        if m is None:
+            raise QueryError(f"Unexpected character {query[pos:].lstrip()[:1]!r} at position {pos}.")
+        pos = m.end()
+        lparen, rparen, and_, or_, not_, word = m.groups()
+        if word is not None and word.upper() in ("AND", "OR", "NOT"):
+            tokens.append(word.upper())
+        elif word is not None:
+            tokens.append(("label", word))
+        else:
+            tokens.append({"(": "(", ")": ")", "&": "AND", ",": "AND", "|": "OR", "!": "NOT"}[
+                lparen or rparen or and_ or or_ or not_])
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens, resolve):
+        self.tokens = tokens
+        self.pos = 0
+        self.resolve = resolve
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise QueryError("Empty query.")
+        node = self.expr()
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected {self._show(self.peek())} after a complete expression.")
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek() == "OR":
+            self.take()
+            node = ("or", node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek() == "AND":
+            self.take()
+            node = ("and", node, self.factor())
+        return node
+
+    def factor(self):
+        token = self.take()
+        if token == "NOT":
+            return ("not", self.factor())
+        if token == "(":
+            node = self.expr()
+            if self.take() != ")":
+                raise QueryError("Missing closing parenthesis.")
+            return node
+        if isinstance(token, tuple):
+            return ("label", self.resolve(token[1]))
+        raise QueryError(f"Expected a label, NOT or '(' but got {self._show(token)}.")
+
+    @staticmethod
+    def _show(token):
+        if token is None:
+            return "end of query"
+        return repr(token[1]) if isinstance(token, tuple) else token
+
+
+def render(node):
+    """Canonical, fully parenthesised form of a parsed query (echoed back in responses)."""
+    kind = node[0]
+    if kind == "label":
+        return node[1]
+    if kind == "not":
+        return f"NOT {render(node[1])}"
+    return f"({render(node[1])} {kind.upper()} {render(node[2])})"
+
+
+# -------------------------
+# Bitset index
+# -------------------------
+class LabelBitmaps:
+    """
+    One packed bitset per predicted label over every feature-store row.
+
+    Built once per artifact bundle from the universe-wide predictions, so a screen
+    is a handful of vectorised AND/OR/NOT ops over n_rows / 8 bytes per label and
+    never touches the model. `universe` has a bit for the first row of every symbol
+    (the row /predict serves), so results list each ticker once and NOT only ever
+    selects served rows.
+    """
+
+    def __init__(self, predictions, label_cols, symbols, canonical_rows):
+        predictions = np.asarray(predictions, dtype=bool)
+        self.n_rows = len(predictions)
+        self.label_cols = list(label_cols)
+        self.symbols = symbols
+        self.bits = np.packbits(predictions.T, axis=1)  # (n_labels, ceil(n_rows / 8)) uint8
+        self.served = np.zeros(self.n_rows, dtype=bool)
+        self.served[np.asarray(canonical_rows, dtype=np.int64)] = True
+        self.universe = np.packbits(self.served)
+        self._by_name = {name.lower(): j for j, name in enumerate(self.label_cols)}
+        for j, name in enumerate(self.label_cols):
+            if name.startswith("Sector_"):
+                self._by_name.setdefault(name[len("Sector_"):].lower(), j)
+
+    def resolve(self, name):
+        j = self._by_name.get(name.lower())
+        if j is None:
+            raise QueryError(f"Unknown label '{name}'. Available: {self.label_cols}")
+        return self.label_cols[j]
+
+    def parse(self, query):
+        return _Parser(tokenize(query), self.resolve).parse()
+
+    def evaluate(self, node):
+        """Packed bitset of the served rows matching a parsed query."""
+        kind = node[0]
+        if kind == "label":
+            return self.bits[self.label_cols.index(node[1])] & self.universe
+        if kind == "not":
+            return ~self.evaluate(node[1]) & self.universe
+        left, right = self.evaluate(node[1]), self.evaluate(node[2])
+        return left & right if kind == "and" else left | right
+
+    def count(self, bits):
+        return int(POPCOUNT[bits].sum())
+
+    def rows(self, bits):
+        """Matching row indices in row order."""
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def mask(self, query):
+        """Boolean mask of the served rows matching `query` (all served rows for an empty one) — the /similar filter."""
+        if not query or not query.strip():
+            return self.served
+        return np.unpackbits(self.evaluate(self.parse(query)), count=self.n_rows).astype(bool)
+
+    def screen(self, query, offset=0, limit=100):
+        """(canonical query, total matches, rows of the requested page)."""
+        node = self.parse(query)
+        bits = self.evaluate(node)
+        return render(node), self.count(bits), self.rows(bits)[offset:offset + limit]
+
+    def describe(self):
+        return {"rows": self.n_rows, "symbols": self.count(self.universe), "labels": len(self.label_cols),
+                "bytes": int(self.bits.nbytes + self.universe.nbytes)}
@@ -0,0 +1,204 @@
+# scripts/serve.py
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# ===========================
+# Production serving: pre-forked workers on one listening socket
+# ===========================
+#   cd ml-service && python scripts/serve.py --workers 4 --port 5000
+#
+# The master binds the port, then forks N workers. Each worker imports app.py,
+# warms up its own model and serves the shared socket with a threaded WSGI server
+# (the kernel spreads connections across workers). The scaled feature matrix is
+# written once to SHARED_FEATURES_DIR and memory-mapped read-only by every worker,
+# so it is held once in the page cache however many workers run.
+#
+# Signals to the master: SIGTERM/SIGINT = graceful stop, SIGHUP = every worker
+# reloads its artifacts (see app.py). Dead workers are respawned with exponential
+# back-off; if workers keep dying right after start the master gives up and exits.
+PROJECT_ROOT        = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SHARED_FEATURES_DIR = os.path.join(PROJECT_ROOT, "data", "processed", "serving")
+
+LISTEN_BACKLOG   = 2048
+SHUTDOWN_TIMEOUT = 30.0  # seconds to let in-flight requests finish
+RESPAWN_DELAY    = 1.0   # initial back-off before replacing a worker that died (doubles per fast failure)
+MAX_RESPAWN_DELAY = 60.0
+FAST_FAILURE_S   = 10.0  # a worker dying sooner than this after its start counts as a crash loop
+MAX_FAST_FAILURES = 5    # consecutive fast failures before the master stops the whole server
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+# -------------------------
+# Worker
+# -------------------------
+def run_worker(sock, host, port, wait):
+    """Body of a forked worker: import the app, warm up, serve the inherited socket until SIGTERM."""
+    from werkzeug.serving import make_server
+
+    import app as service
+
+    service.install_reload_signal()
+    service.start_warmup()
+    if wait:
+        service.wait_until_ready()
+
+    server = make_server(host, port, service.app, threaded=True, fd=sock.fileno())
+    server.daemon_threads = False  # track request threads so server_close() waits for in-flight ones
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"[worker {os.getpid()}] serving on {host}:{port}", flush=True)
+    server.serve_forever()
+    server.server_close()
+
+
+def spawn(sock, args):
+    pid = os.fork()
+    if pid == 0:
+        # Drop the master's handlers (forward() on a stale copy of `workers`). Until
+        # run_worker installs its own, SIGTERM just ends a worker that is still warming
+        # up; SIGHUP is ignored (a warming worker loads the newest files anyway) and so is
+        # SIGINT (the master handles Ctrl-C for the whole group)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        code = 0
+        try:
+            run_worker(sock, args.host, args.port, args.wait)
+        except BaseException as exc:  # never fall back into the master's loop
+            print(f"[worker {os.getpid()}] exiting: {type(exc).__name__}: {exc}", flush=True)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+# -------------------------
+# Master
+# -------------------------
+def respawn_delay(fast_failures):
+    """Back-off before the next respawn: RESPAWN_DELAY doubled per consecutive fast failure, capped."""
+    return min(RESPAWN_DELAY * 2 ** max(fast_failures - 1, 0), MAX_RESPAWN_DELAY)
+
+
+def supervise(sock, args):
+    """Run the workers until stopped; returns the master's exit code (1 after a crash loop)."""
+    started = {}  # pid -> monotonic start time
+    for _ in range(args.workers):
+        started[spawn(sock, args)] = time.monotonic()
+    workers = set(started)
+    print(f"[master {os.getpid()}] {len(workers)} worker(s): {sorted(workers)}", flush=True)
+
+    state = {"stopping": False}
+    respawn_at = []       # monotonic times at which to replace a dead worker
+    fast_failures = 0     # consecutive workers that died within FAST_FAILURE_S of starting
+    exit_code = 0
+
+    def forward(signum, frame):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            state["stopping"] = True
+            signum = signal.SIGTERM
+        for pid in list(workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    deadline = None
+    while workers or (respawn_at and not state["stopping"]):
+        now = time.monotonic()
+        if state["stopping"] and deadline is None:
+            deadline = now + SHUTDOWN_TIMEOUT
+            respawn_at.clear()
+        if deadline is not None and now > deadline:
+            for pid in workers:
+                os.kill(pid, signal.SIGKILL)
+
+        # Replacements whose back-off has elapsed (scheduled, so signals are handled meanwhile)
+        while respawn_at and respawn_at[0] <= now and not state["stopping"]:
+            respawn_at.pop(0)
+            pid = spawn(sock, args)
+            started[pid] = time.monotonic()
+            workers.add(pid)
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        workers.discard(pid)
+        lived = now - started.pop(pid, now)
+        if state["stopping"]:
+            continue
+
+        fast_failures = fast_failures + 1 if lived < FAST_FAILURE_S else 0
+        if fast_failures >= MAX_FAST_FAILURES:
+            print(f"[master] {fast_failures} workers in a row died within {FAST_FAILURE_S:.0f}s of starting; "
+                  f"giving up.", flush=True)
+            exit_code = 1
+            forward(signal.SIGTERM, None)
+            continue
+        delay = respawn_delay(fast_failures)
+        print(f"[master] worker {pid} exited (status {status}) after {lived:.1f}s; respawning in {delay:.1f}s.",
+              flush=True)
+        respawn_at.append(time.monotonic() + delay)
+        respawn_at.sort()
+    print("[master] all workers stopped.", flush=True)
+    return exit_code
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the inference API with N pre-forked worker processes.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: one per CPU).")
+    parser.add_argument("--shared-dir", default=os.environ.get("APP_SHARED_FEATURES_DIR", SHARED_FEATURES_DIR),
+                        help="Where the memory-mapped feature matrix is written for the workers to share.")
+    parser.add_argument("--wait", action="store_true",
+                        help="Workers finish warm-up before accepting connections.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork (Linux/macOS); use app/main.py elsewhere.")
+
+    # Inherited by every worker before app.py is imported
+    os.environ["APP_SHARED_FEATURES_DIR"] = os.path.abspath(args.shared_dir)
+    os.environ.setdefault("APP_WARMUP_ON_IMPORT", "0")  # each worker starts its own warm-up after fork
+
+    sock = bind_socket(args.host, args.port)
+    print(f"[master {os.getpid()}] listening on {args.host}:{args.port}", flush=True)
+    try:
+        code = supervise(sock, args)
+    finally:
+        sock.close()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# scripts/storage.py
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# ===========================
+# Pluggable storage for processed artifacts
+# ===========================
+# Every processed table is addressed by its historical ".csv" path
+# (e.g. data/processed/combined_data.csv); the format only changes the suffix:
+#   csv      → combined_data.csv       (text, kept as the export option)
+#   parquet  → combined_data.parquet   (typed columnar, needs pyarrow)
+#   feather  → combined_data.feather   (typed columnar, needs pyarrow)
+#   npy      → combined_data.cols/     (one .npy per column + _schema.json; memory-mappable)
+FORMATS = ("csv", "parquet", "feather", "npy")
+SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "npy": ".cols"}
+
+# Default write format for the pipeline scripts (override per run with --format)
+DEFAULT_FORMAT = os.environ.get("STORAGE_FORMAT", "csv")
+
+SCHEMA_FILE = "_schema.json"
+
+
+def table_path(path, fmt):
+    """Location of the table `path` (a .csv path) when stored as `fmt`."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown storage format '{fmt}'. Choose one of {FORMATS}.")
+    return os.path.splitext(path)[0] + SUFFIXES[fmt]
+
+
+def resolve_table(path):
+    """
+    (actual_path, fmt) of the most recently written variant of table `path`.
+    Raises FileNotFoundError if no variant exists.
+    """
+    found = []
+    for fmt in FORMATS:
+        candidate = table_path(path, fmt)
+        if os.path.exists(candidate):
+            found.append((os.path.getmtime(candidate), candidate, fmt))
+    if not found:
+        raise FileNotFoundError(
+            f"No stored table for '{path}' (looked for {[table_path(path, f) for f in FORMATS]})."
+        )
+    _, actual, fmt = max(found)
+    return actual, fmt
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"Storage format '{fmt}' needs pyarrow. Install it with: pip install pyarrow")
+
+
+# -------------------------
+# Writing
+# -------------------------
+def write_table(df, path, fmt=None):
+    """Write `df` as table `path` in `fmt` (default DEFAULT_FORMAT); returns the file written."""
+    fmt = fmt or DEFAULT_FORMAT
+    out = table_path(path, fmt)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    if fmt == "csv":
+        df.to_csv(out, index=False)
+    elif fmt == "parquet":
+        _require_pyarrow(fmt)
+        df.to_parquet(out, index=False)
+    elif fmt == "feather":
+        _require_pyarrow(fmt)
+        df.reset_index(drop=True).to_feather(out)
+    else:
+        _write_npy_dir(df, out)
+    return out
+
+
+def _write_npy_dir(df, out):
+    """One C-contiguous .npy per column, so each column can be np.load(mmap_mode="r")-ed."""
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    schema = {"n_rows": int(len(df)), "columns": []}
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        entry = {"name": str(name), "file": f"{i:04d}.npy"}
+        if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+            arr = col.to_numpy()
+            if arr.dtype == object:  # nullable ints/bools with NA
+                arr = col.to_numpy(dtype=np.float64, na_value=np.nan)
+            entry["kind"] = "numeric"
+        elif pd.api.types.is_datetime64_any_dtype(col):
+            # Keep the column's resolution (pandas 3 defaults to us); tz-aware columns are stored as naive UTC
+            unit = np.datetime_data(col.dtype)[0] if isinstance(col.dtype, np.dtype) else col.dtype.unit
+            arr = col.to_numpy(dtype=f"datetime64[{unit}]")
+            entry["kind"] = "datetime"
+        else:
+            nulls = col.isna().to_numpy()
+            arr = col.fillna("").astype(str).to_numpy(dtype=str)
+            entry["kind"] = "str"
+            if nulls.any():
+                entry["mask"] = f"{i:04d}.mask.npy"
+                np.save(os.path.join(tmp, entry["mask"]), nulls)
+        np.save(os.path.join(tmp, entry["file"]), np.ascontiguousarray(arr))
+        entry["dtype"] = str(arr.dtype)
+        schema["columns"].append(entry)
+
+    with open(os.path.join(tmp, SCHEMA_FILE), "w") as f:
+        json.dump(schema, f, indent=2)
+
+    # Swap the finished directory into place
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+
+
+# -------------------------
+# Reading
+# -------------------------
+def _read_schema(out):
+    with open(os.path.join(out, SCHEMA_FILE)) as f:
+        return json.load(f)
+
+
+def list_columns(path):
+    """Column names of table `path` without loading its data."""
+    actual, fmt = resolve_table(path)
+    if fmt == "csv":
+        return pd.read_csv(actual, nrows=0).columns.tolist()
+    if fmt == "npy":
+        return [c["name"] for c in _read_schema(actual)["columns"]]
+    _require_pyarrow(fmt)
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    if fmt == "parquet":
+        return pq.read_schema(actual).names
+    return feather.read_table(actual, memory_map=True).schema.names
+
+
+def read_columns(path, columns=None, mmap=True, dtype=None):
+    """
+    {name: ndarray} for the requested columns of table `path`. With the npy layout
+    numeric columns are returned as read-only memory maps (zero-copy); string
+    columns with missing values come back as object arrays with NaN.
+    """
+    actual, fmt = resolve_table(path)
+    if fmt != "npy":
+        df = read_table(path, dtype=dtype, columns=columns)
+        return {c: df[c].to_numpy() for c in (columns if columns is not None else df.columns)}
+
+    schema = _read_schema(actual)
+    by_name = {c["name"]: c for c in schema["columns"]}
+    wanted = columns if columns is not None else list(by_name)
+    missing = [c for c in wanted if c not in by_name]
+    if missing:
+        raise KeyError(f"Columns {missing} not found in {actual}. Available: {list(by_name)}")
+
+    out = {}
+    for name in wanted:
+        entry = by_name[name]
+        arr = np.load(os.path.join(actual, entry["file"]), mmap_mode="r" if mmap else None)
+        if "mask" in entry:
+            arr = arr.astype(object)
+            arr[np.load(os.path.join(actual, entry["mask"]))] = np.nan
+        out[name] = arr
+    return out
+
+
+def read_table(path, dtype=None, columns=None):
+    """Load table `path` as a DataFrame from whichever stored variant is newest."""
+    actual, fmt = resolve_table(path)
+    if fmt == "csv":
+        return pd.read_csv(actual, dtype=dtype, usecols=columns)
+    if fmt == "npy":
+        df = pd.DataFrame({name: np.asarray(arr) for name, arr in read_columns(path, columns, mmap=True).items()})
+        schema = {c["name"]: c for c in _read_schema(actual)["columns"]}
+        for name in df.columns:
+            if schema[name]["kind"] == "str":
+                df[name] = df[name].astype(object)
+    elif fmt == "parquet":
+        _require_pyarrow(fmt)
+        df = pd.read_parquet(actual, columns=columns)
+    else:
+        _require_pyarrow(fmt)
+        df = pd.read_feather(actual, columns=columns)
+    if dtype:
+        # Binary formats already store strings as strings; only cast the rest
+        casts = {c: t for c, t in dtype.items() if c in df.columns and t not in (str, "str", object)}
+        df = df.astype(casts)
+    return df
@@ -1,6 +1,7 @@
 # scripts/train_model.py
 
 import os
+import argparse
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -8,6 +9,10 @@ from sklearn.preprocessing import StandardScaler
 import tensorflow as tf
 import joblib
 
+import instrumentation
+import storage
+from labels import SIZE_THRESHOLDS, STYLE_THRESHOLDS, CYCLICAL_SECTORS, compute_label_matrix
+
 # === CONFIGURATION ===
 PROCESSED_DIR = os.path.join("data", "processed")
 COMBINED_CSV = os.path.join(PROCESSED_DIR, "combined_data.csv")
@@ -15,74 +20,23 @@ MODEL_OUTPUT = "model.h5"
 SCALER_OUTPUT = os.path.join(PROCESSED_DIR, "scaler.save")
 HISTORY_OUTPUT = os.path.join(PROCESSED_DIR, "training_history.csv")
 
-# Thresholds & mappings
-SIZE_THRESHOLDS = {
-    "LargeCap": 10e9,      # MarketCap ≥ $10B
-    "MidCap_min": 2e9,     # $2B ≤ MarketCap < $10B
-    "MidCap_max": 10e9,
-    "SmallCap_min": 300e6, # $300M ≤ MarketCap < $2B
-    "SmallCap_max": 2e9,
-    "MicroCap_max": 300e6  # MarketCap < $300M
-}
-
-STYLE_THRESHOLDS = {
-    "GrowthStock_rev_growth": 0.15,   # 15% YoY revenue growth
-    "ValueStock_pe": 15.0,            # P/E ≤ 15
-    "IncomeStock_div_yield": 0.03     # Dividend yield ≥ 3%
-}
-
-CYCLICAL_SECTORS = {
-    "Technology", "Consumer Discretionary", "Materials",
-    "Industrials", "Energy", "Communication Services"
-}
-# Any sector not in CYCLICAL_SECTORS → Defensive
+# Thresholds & mappings (SIZE_THRESHOLDS, STYLE_THRESHOLDS, CYCLICAL_SECTORS) live in labels.py
 
 SEED = 42
 
+# Training defaults
+EPOCHS = 50
+BATCH_SIZE = 32            # array input (model.fit on NumPy arrays)
+STREAM_BATCH_SIZE = 1024   # --stream input (tf.data pipeline)
+EARLY_STOPPING_PATIENCE = 5  # epochs without val_loss improvement; 0 disables
+
 def load_data(path):
     print(f"Loading combined data from {path} ...")
-    df = pd.read_csv(path, dtype={"symbol": str})
+    df = storage.read_table(path, dtype={"symbol": str})
     print(f"  → {df.shape[0]} rows, {df.shape[1]} columns.")
     return df
 
-def compute_labels(df):
-    df = df.copy()
-    # REQUIRED COLUMNS: 'MarketCap', 'RevenueGrowth', 'PE', 'DividendYield', 'sector'
-    for col in ["MarketCap", "RevenueGrowth", "PE", "DividendYield", "sector"]:
-        if col not in df.columns:
-            raise KeyError(f"Missing column '{col}' in combined_data.csv. Found: {list(df.columns)}")
-
-    # --- 1) Size Labels ---
-    mc = df["MarketCap"].fillna(0).astype(float)
-    df["LargeCap"] = (mc >= SIZE_THRESHOLDS["LargeCap"]).astype(int)
-    df["MidCap"]   = ((mc >= SIZE_THRESHOLDS["MidCap_min"]) & (mc < SIZE_THRESHOLDS["MidCap_max"])).astype(int)
-    df["SmallCap"] = ((mc >= SIZE_THRESHOLDS["SmallCap_min"]) & (mc < SIZE_THRESHOLDS["SmallCap_max"])).astype(int)
-    df["MicroCap"] = (mc < SIZE_THRESHOLDS["MicroCap_max"]).astype(int)
-
-    # --- 2) Style Labels ---
-    df["GrowthStock"] = (df["RevenueGrowth"].fillna(0) >= STYLE_THRESHOLDS["GrowthStock_rev_growth"]).astype(int)
-    df["ValueStock"]  = (df["PE"].fillna(9999) <= STYLE_THRESHOLDS["ValueStock_pe"]).astype(int)
-    df["IncomeStock"] = (df["DividendYield"].fillna(0) >= STYLE_THRESHOLDS["IncomeStock_div_yield"]).astype(int)
-    # Blue‐chip = LargeCap AND IncomeStock
-    df["BlueChipStock"] = ((df["LargeCap"] == 1) & (df["IncomeStock"] == 1)).astype(int)
-
-    # --- 3) Economic Sensitivity Labels ---
-    df["Cyclical"]  = df["sector"].apply(lambda s: 1 if s in CYCLICAL_SECTORS else 0).astype(int)
-    df["Defensive"] = (1 - df["Cyclical"]).astype(int)
-
-    # --- 4) Sector One‐Hot Encoding ---
-    unique_sectors = sorted(df["sector"].dropna().unique())
-    for sect in unique_sectors:
-        col_name = f"Sector_{sect.replace(' ', '')}"
-        df[col_name] = (df["sector"] == sect).astype(int)
-
-    # --- 5) Dividend Policy Labels ---
-    df["DividendStock"]    = (df["DividendYield"].fillna(0) > 0).astype(int)
-    df["NonDividendStock"] = (1 - df["DividendStock"]).astype(int)
-
-    return df
-
-def build_feature_matrix(df):
+def build_feature_matrix(df, sector_onehot, sector_cols):
     # 1) Numeric columns (adjust if your combined_data.csv uses different names)
     numeric_cols = [
         "MarketCap",
@@ -96,14 +50,11 @@ def build_feature_matrix(df):
     if missing_num:
         raise KeyError(f"Missing numeric columns: {missing_num}")
 
-    # 2) Sector one-hot columns
-    sector_cols = [c for c in df.columns if c.startswith("Sector_")]
-
-    feature_df = df[numeric_cols + sector_cols].copy()
+    # 2) Sector one-hot columns come straight from the label matrix (see build_label_matrix)
     scaler = StandardScaler()
-    feature_df[numeric_cols] = scaler.fit_transform(feature_df[numeric_cols])
-
-    X = feature_df.values
+    X = np.empty((len(df), len(numeric_cols) + len(sector_cols)), dtype=np.float32)
+    X[:, : len(numeric_cols)] = scaler.fit_transform(df[numeric_cols])
+    X[:, len(numeric_cols):] = sector_onehot
     feature_names = numeric_cols + sector_cols
 
     # Save scaler for inference
@@ -113,37 +64,38 @@ def build_feature_matrix(df):
     return X, feature_names
 
 def build_label_matrix(df):
-    # 1) Size
-    label_cols = ["LargeCap", "MidCap", "SmallCap", "MicroCap"]
-    # 2) Style
-    label_cols += ["GrowthStock", "ValueStock", "IncomeStock", "BlueChipStock"]
-    # 3) Econ sensitivity
-    label_cols += ["Cyclical", "Defensive"]
-    # 4) Sector one-hot (must match exactly the columns created above)
-    sector_label_cols = sorted([c for c in df.columns if c.startswith("Sector_")])
-    label_cols += sector_label_cols
-    # 5) Dividend
-    label_cols += ["DividendStock", "NonDividendStock"]
-
-    missing_lbl = [c for c in label_cols if c not in df.columns]
-    if missing_lbl:
-        raise KeyError(f"Missing label columns: {missing_lbl}")
-
-    y = df[label_cols].values.astype(int)
+    # Size, style, econ sensitivity, sector one-hot (sorted), dividend — as an int8 matrix.
+    # Thresholds are read at call time, so retuning them only needs a re-call.
+    y, label_cols = compute_label_matrix(df, SIZE_THRESHOLDS, STYLE_THRESHOLDS, CYCLICAL_SECTORS)
     return y, label_cols
 
-def split_data(X, y, test_size=0.20, val_size=0.10):
+def split_indices(n_rows, test_size=0.20, val_size=0.10):
+    # Same partitions as splitting the arrays themselves, but only row indices are shuffled
+    idx = np.arange(n_rows)
     # First split out test set
-    X_train_val, X_test, y_train_val, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=SEED
-    )
+    train_val_idx, test_idx = train_test_split(idx, test_size=test_size, random_state=SEED)
     # Then split train vs. validation
     val_fraction = val_size / (1 - test_size)
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_train_val, y_train_val, test_size=val_fraction, random_state=SEED
+    train_idx, val_idx = train_test_split(train_val_idx, test_size=val_fraction, random_state=SEED)
+    print(f"Train: {len(train_idx)} | Val: {len(val_idx)} | Test: {len(test_idx)}")
+    return train_idx, val_idx, test_idx
+
+def split_data(X, y, test_size=0.20, val_size=0.10):
+    train_idx, val_idx, test_idx = split_indices(len(X), test_size, val_size)
+    return X[train_idx], X[val_idx], X[test_idx], y[train_idx], y[val_idx], y[test_idx]
+
+def make_dataset(X_t, y_t, idx, batch_size, shuffle=False):
+    # Streams batches of rows out of the shared float32/uint8 tensors by index:
+    # each split is just its index vector, never a copy of X or y.
+    ds = tf.data.Dataset.from_tensor_slices(idx)
+    if shuffle:
+        ds = ds.shuffle(buffer_size=len(idx), seed=SEED, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(
+        lambda i: (tf.gather(X_t, i), tf.cast(tf.gather(y_t, i), tf.float32)),
+        num_parallel_calls=tf.data.AUTOTUNE,
     )
-    print(f"Train: {X_train.shape[0]} | Val: {X_val.shape[0]} | Test: {X_test.shape[0]}")
-    return X_train, X_val, X_test, y_train, y_val, y_test
+    return ds.prefetch(tf.data.AUTOTUNE)
 
 def build_model(input_dim, output_dim):
     model = tf.keras.Sequential([
@@ -161,47 +113,106 @@ def build_model(input_dim, output_dim):
     )
     return model
 
-def main():
-    # 1) Load data
-    df = load_data(COMBINED_CSV)
-
-    # 2) Compute labels
-    df_labeled = compute_labels(df)
-    print("Labels computed.")
-
-    # 3) Build X and y
-    X, feature_names = build_feature_matrix(df_labeled)
-    y, label_names = build_label_matrix(df_labeled)
-    print(f"Features: {len(feature_names)} columns | Labels: {len(label_names)} columns")
-
-    # 4) Split into train/val/test
-    X_train, X_val, X_test, y_train, y_val, y_test = split_data(X, y)
-
-    # 5) Build and train model
-    model = build_model(input_dim=X.shape[1], output_dim=y.shape[1])
-    model.summary()
-
-    print("Starting training ...")
-    history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=50,
-        batch_size=32,
-        verbose=2
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the multi-label stock classifier.")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Feed training through a shuffled, prefetched tf.data pipeline over index-based splits."
     )
-
-    # 6) Evaluate on test set
-    test_loss, test_acc = model.evaluate(X_test, y_test, verbose=0)
-    print(f"Test Loss: {test_loss:.4f} | Test Acc: {test_acc:.4f}")
-
-    # 7) Save the model
-    print(f"Saving trained model to {MODEL_OUTPUT} ...")
-    model.save(MODEL_OUTPUT)
-
-    # 8) Save training history
-    hist_df = pd.DataFrame(history.history)
-    hist_df.to_csv(HISTORY_OUTPUT, index=False)
-    print(f"Training history saved to {HISTORY_OUTPUT}.")
+    parser.add_argument(
+        "--batch-size", type=int, default=None,
+        help=f"Batch size (default {BATCH_SIZE}, or {STREAM_BATCH_SIZE} with --stream)."
+    )
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument(
+        "--patience", type=int, default=EARLY_STOPPING_PATIENCE,
+        help="Early-stopping patience on val_loss in epochs (0 disables early stopping)."
+    )
+    instrumentation.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    batch_size = args.batch_size or (STREAM_BATCH_SIZE if args.stream else BATCH_SIZE)
+
+    with instrumentation.Run("train_model", args) as run:
+        # 1) Load data
+        with run.step("1) load data") as step:
+            df = load_data(COMBINED_CSV)
+            step.rows = len(df)
+
+        # 2) Compute labels (vectorized engine, straight into an int8 matrix)
+        with run.step("2) compute labels", rows=len(df)):
+            y, label_names = build_label_matrix(df)
+        print("Labels computed.")
+
+        # 3) Build X (numeric features + the sector one-hots from y)
+        with run.step("3) build features", rows=len(df)):
+            sector_cols = [c for c in label_names if c.startswith("Sector_")]
+            sector_idx = [label_names.index(c) for c in sector_cols]
+            X, feature_names = build_feature_matrix(df, y[:, sector_idx], sector_cols)
+        print(f"Features: {len(feature_names)} columns | Labels: {len(label_names)} columns")
+
+        # 4) Split into train/val/test (index vectors; rows are only gathered per batch)
+        train_idx, val_idx, test_idx = split_indices(len(X))
+
+        # 5) Build and train model
+        model = build_model(input_dim=X.shape[1], output_dim=y.shape[1])
+        model.summary()
+
+        callbacks = []
+        if args.patience > 0:
+            callbacks.append(tf.keras.callbacks.EarlyStopping(
+                monitor="val_loss", patience=args.patience, restore_best_weights=True, verbose=1
+            ))
+
+        print(f"Starting training ({'tf.data stream' if args.stream else 'in-memory arrays'}, batch size {batch_size}) ...")
+        with run.step("5) model.fit") as step:
+            if args.stream:
+                # float32 features / uint8 labels, converted to tensors once and shared by all splits
+                X_t = tf.constant(X)
+                y_t = tf.constant(y.view(np.uint8))
+                train_ds = make_dataset(X_t, y_t, train_idx, batch_size, shuffle=True)
+                val_ds = make_dataset(X_t, y_t, val_idx, batch_size)
+                test_ds = make_dataset(X_t, y_t, test_idx, batch_size)
+                history = model.fit(
+                    train_ds,
+                    validation_data=val_ds,
+                    epochs=args.epochs,
+                    callbacks=callbacks,
+                    verbose=2
+                )
+            else:
+                history = model.fit(
+                    X[train_idx], y[train_idx],
+                    validation_data=(X[val_idx], y[val_idx]),
+                    epochs=args.epochs,
+                    batch_size=batch_size,
+                    callbacks=callbacks,
+                    verbose=2
+                )
+            epochs_run = len(history.history["loss"])
+            step.rows = len(train_idx) * epochs_run  # rows seen
+            step.extra["epochs"] = epochs_run
+        print(f"Trained for {epochs_run} epoch(s).")
+
+        # 6) Evaluate on test set
+        with run.step("6) evaluate", rows=len(test_idx)):
+            if args.stream:
+                test_loss, test_acc = model.evaluate(test_ds, verbose=0)
+            else:
+                test_loss, test_acc = model.evaluate(X[test_idx], y[test_idx], verbose=0)
+        print(f"Test Loss: {test_loss:.4f} | Test Acc: {test_acc:.4f}")
+
+        # 7) Save the model
+        with run.step("7) save model"):
+            print(f"Saving trained model to {MODEL_OUTPUT} ...")
+            model.save(MODEL_OUTPUT)
+
+        # 8) Save training history
+        hist_df = pd.DataFrame(history.history)
+        hist_df.to_csv(HISTORY_OUTPUT, index=False)
+        print(f"Training history saved to {HISTORY_OUTPUT}.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,167 @@
+# scripts/vector_index.py
+
+import numpy as np
+
+# Universes up to this many rows are searched exactly with one mat-vec product
+# (~1 ms per query at 60k x 17 on one core); larger ones get an inverted-file (IVF)
+# index: sqrt(n) k-means lists, probe the nearest few and re-rank exactly.
+# Measured recall@10 on isotropic Gaussian 60k x 17 (the worst case for IVF):
+# 8 probes 0.66, 16 probes 0.83, 32 probes 0.94, 64 probes 0.99; sector-clustered
+# feature vectors reach 0.99 at 16. At 250k x 17, 32 probes give 0.92.
+BRUTE_FORCE_MAX = 100_000
+DEFAULT_PROBES = 32
+KMEANS_ITERS = 15
+KMEANS_SAMPLE = 100_000
+SEED = 42
+
+
+def kmeans(x, n_clusters, iters=KMEANS_ITERS, sample=KMEANS_SAMPLE, seed=SEED):
+    """Plain Lloyd's k-means on (a sample of) x; returns float32 centroids (n_clusters, dim)."""
+    rng = np.random.default_rng(seed)
+    if len(x) > sample:
+        x = x[rng.choice(len(x), size=sample, replace=False)]
+    centroids = x[rng.choice(len(x), size=n_clusters, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(x, centroids)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = counts == 0
+        centroids[~empty] = (sums[~empty] / counts[~empty, None]).astype(np.float32)
+        # Re-seed empty clusters on random points so every list stays in use
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _nearest(x, centroids, chunk=65_536):
+    """Index of the nearest centroid (squared L2) for every row of x, in chunks."""
+    c_norm = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        out[start:start + chunk] = np.argmin(c_norm[None, :] - 2.0 * block @ centroids.T, axis=1)
+    return out
+
+
+class VectorIndex:
+    """
+    Top-k nearest neighbours over a fixed (n_rows, dim) embedding matrix.
+
+    metric="euclidean" ranks by L2 distance, metric="cosine" by 1 - cosine
+    similarity (vectors are L2-normalised once at build time). Rows with NaNs are
+    zero-filled; a float32 euclidean matrix without NaNs is used as is (no copy,
+    so a memory-mapped matrix stays shared). Small universes use exact brute
+    force; above `brute_force_max` rows an IVF index is built and `n_probe` lists
+    are scanned per query (more are opened when a filter leaves too few
+    candidates), then re-ranked exactly.
+
+    to_arrays() / from_arrays() let one process build the index and others
+    memory-map the result instead of re-running k-means.
+    """
+
+    def __init__(self, vectors, metric="euclidean", brute_force_max=BRUTE_FORCE_MAX,
+                 n_lists=None, n_probe=DEFAULT_PROBES, seed=SEED):
+        if metric not in ("euclidean", "cosine"):
+            raise ValueError(f"metric must be 'euclidean' or 'cosine', got '{metric}'")
+        x = np.ascontiguousarray(vectors, dtype=np.float32)
+        if np.isnan(x).any():
+            x = np.nan_to_num(x)
+        if metric == "cosine":
+            norms = np.linalg.norm(x, axis=1, keepdims=True)
+            x = x / np.where(norms == 0, 1.0, norms)
+        self.metric = metric
+        self.vectors = x
+        self.derived = not np.may_share_memory(x, vectors)  # vectors differ from the input matrix
+        self.sq_norms = (self.vectors ** 2).sum(axis=1)
+        self.n_rows = len(self.vectors)
+
+        self.kind = "brute" if self.n_rows <= brute_force_max else "ivf"
+        if self.kind == "ivf":
+            n_lists = n_lists or int(np.clip(np.sqrt(self.n_rows), 16, 4096))
+            self.centroids = kmeans(self.vectors, n_lists, seed=seed)
+            assign = _nearest(self.vectors, self.centroids)
+            # CSR layout: rows of list j are order[offsets[j]:offsets[j + 1]]
+            self.order = np.argsort(assign, kind="stable")
+            self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=n_lists))))
+            self.n_probe = min(n_probe, n_lists)
+
+    def to_arrays(self):
+        """{name: array} that from_arrays() rebuilds the index from; vectors only when derived."""
+        arrays = {"sq_norms": self.sq_norms}
+        if self.derived:
+            arrays["vectors"] = self.vectors
+        if self.kind == "ivf":
+            arrays.update(centroids=self.centroids, order=self.order, offsets=self.offsets)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, metric, vectors=None, n_probe=DEFAULT_PROBES):
+        """Index over to_arrays() output (e.g. memory maps); `vectors` is the input matrix when not derived."""
+        index = cls.__new__(cls)
+        index.metric = metric
+        index.derived = "vectors" in arrays
+        index.vectors = arrays["vectors"] if index.derived else np.ascontiguousarray(vectors, dtype=np.float32)
+        index.sq_norms = arrays["sq_norms"]
+        index.n_rows = len(index.vectors)
+        index.kind = "ivf" if "centroids" in arrays else "brute"
+        if index.kind == "ivf":
+            index.centroids, index.order, index.offsets = arrays["centroids"], arrays["order"], arrays["offsets"]
+            index.n_probe = min(n_probe, len(index.centroids))
+        return index
+
+    def __len__(self):
+        return self.n_rows
+
+    def describe(self):
+        info = {"kind": self.kind, "metric": self.metric, "rows": self.n_rows, "dim": int(self.vectors.shape[1])}
+        if self.kind == "ivf":
+            info.update(lists=len(self.centroids), probes=self.n_probe)
+        return info
+
+    def _distances(self, q, rows=None):
+        x = self.vectors if rows is None else self.vectors[rows]
+        dots = x @ q
+        if self.metric == "cosine":
+            return 1.0 - dots
+        sq = self.sq_norms if rows is None else self.sq_norms[rows]
+        return np.sqrt(np.maximum(sq - 2.0 * dots + q @ q, 0.0))
+
+    def _candidates(self, q, n_probe):
+        if self.metric == "cosine":
+            scores = -(self.centroids @ q)
+        else:
+            scores = (self.centroids ** 2).sum(axis=1) - 2.0 * self.centroids @ q
+        lists = np.argsort(scores)[:n_probe]
+        return np.concatenate([self.order[self.offsets[j]:self.offsets[j + 1]] for j in lists])
+
+    def search(self, row, k=10, mask=None):
+        """
+        (rows, distances) of the k nearest neighbours of stored row `row`, closest
+        first, excluding `row` itself. `mask` (bool, n_rows) restricts the results.
+        """
+        q = self.vectors[row]
+        if self.kind == "brute":
+            # One pass over the whole matrix, then pick the masked rows (cheaper than gathering them)
+            dist = self._distances(q)
+            rows = np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+            if mask is not None:
+                dist = dist[rows]
+        else:
+            n_probe = self.n_probe
+            while True:
+                rows = self._candidates(q, n_probe)
+                if mask is not None:
+                    rows = rows[mask[rows]]
+                if len(rows) > k or n_probe >= len(self.centroids):
+                    break
+                n_probe = min(n_probe * 4, len(self.centroids))
+            dist = self._distances(q, rows)
+
+        keep = rows != row
+        rows, dist = rows[keep], dist[keep]
+        if len(rows) > k:
+            top = np.argpartition(dist, k)[:k]
+            rows, dist = rows[top], dist[top]
+        order = np.argsort(dist, kind="stable")
+        return rows[order], dist[order]
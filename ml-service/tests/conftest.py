@@ -0,0 +1,9 @@
+# ml-service/tests/conftest.py
+#
+#   cd ml-service && python -m pytest tests
+
+import os
+import sys
+
+# The scripts import each other as top-level modules (run as `python scripts/x.py`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts")))
@@ -0,0 +1,208 @@
+# ml-service/tests/test_app.py
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Point the app at a temporary workspace before anything loads (see the fixtures below)
+os.environ.update(APP_WARMUP_ON_IMPORT="0", APP_RELOAD_POLL_S="0", INFERENCE_BACKEND="numpy")
+
+import app  # noqa: E402
+from artifacts import ArtifactManager  # noqa: E402
+from numpy_model import save_npz  # noqa: E402
+
+SECTOR_COLS = ["Sector_Energy", "Sector_Technology"]
+LABEL_COLS = ["LargeCap", "MidCap", "SmallCap", "MicroCap", "GrowthStock", "ValueStock", "IncomeStock",
+              "BlueChipStock", "Cyclical", "Defensive"] + SECTOR_COLS + ["DividendStock", "NonDividendStock"]
+N_ROWS = 40
+
+
+def write_workspace(root, seed=0):
+    """combined_data.csv + model.npz for the numpy backend, laid out like the repo root."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(root, "data", "processed"), exist_ok=True)
+    df = pd.DataFrame(rng.normal(size=(N_ROWS, len(app.NUMERIC_COLS))), columns=app.NUMERIC_COLS)
+    df.insert(0, "symbol", [f"T{i:02d}" for i in range(N_ROWS)])
+    sector = rng.integers(0, len(SECTOR_COLS), N_ROWS)
+    for j, name in enumerate(SECTOR_COLS):
+        df[name] = (sector == j).astype(float)
+    df.to_csv(os.path.join(root, app.COMBINED_CSV), index=False)
+
+    n_in = len(app.NUMERIC_COLS) + len(SECTOR_COLS)
+    layers = [(rng.normal(size=(n_in, 16)), rng.normal(size=16), "relu"),
+              (rng.normal(size=(16, len(LABEL_COLS))), rng.normal(size=len(LABEL_COLS)), "sigmoid")]
+    save_npz(os.path.join(root, app.NUMPY_MODEL_PATH), layers, app.NUMERIC_COLS + SECTOR_COLS, LABEL_COLS,
+             np.zeros(len(app.NUMERIC_COLS)), np.ones(len(app.NUMERIC_COLS)))
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """The app module with fresh readiness state and an artifact manager over tmp_path (nothing loaded yet)."""
+    root = str(tmp_path)
+    monkeypatch.setattr(app, "_paths", {
+        "model": os.path.join(root, app.MODEL_PATH),
+        "scaler": os.path.join(root, app.SCALER_PATH),
+        "combined": os.path.join(root, app.COMBINED_CSV),
+        "numpy_model": os.path.join(root, app.NUMPY_MODEL_PATH),
+        **{f"history_{name}": os.path.join(root, path) for name, path in app.HISTORY_DIRS.items()},
+        "sector_table": os.path.join(root, app.SECTOR_TABLE_DIR),
+    })
+    monkeypatch.setattr(app, "_ready", threading.Event())
+    monkeypatch.setattr(app, "_status", {"state": "idle", "stage": None, "stages": {}, "error": None,
+                                         "started_at": None, "ready_at": None})
+    monkeypatch.setattr(app, "artifacts", ArtifactManager(app.load_artifacts, app.artifact_sources,
+                                                           on_swap=app._on_swap))
+    return app
+
+
+@pytest.fixture
+def client(service, tmp_path):
+    """Test client of a service that has loaded the workspace."""
+    write_workspace(str(tmp_path))
+    service.artifacts.reload(force=True, reason="test")
+    return service.app.test_client()
+
+
+# -------------------------
+# /predict/batch
+# -------------------------
+def test_batch_dedupes_and_keeps_request_order(client, monkeypatch):
+    calls = []
+    bundle = app.artifacts.current
+    predict = bundle.model.predict
+    monkeypatch.setattr(bundle.model, "predict", lambda x, **kw: calls.append(len(x)) or predict(x, **kw))
+
+    r = client.post("/predict/batch", json=["t01", "T02", " t01 ", None, "", "T02"])
+    body = r.get_json()
+    assert r.status_code == 200 and r.headers["X-Artifact-Version"] == body["version"] == bundle.version
+    assert [item["ticker"] for item in body["results"]] == ["T01", "T02", "T01", "T02"]
+    assert (body["count"], body["found"]) == (4, 2)
+    assert calls == [2]  # one forward pass over the distinct rows
+    assert body["results"][0] == body["results"][2] and body["results"][1] == body["results"][3]
+    # Same labels as the single-ticker endpoint
+    assert body["results"][0]["labels"] == client.get("/predict?ticker=T01").get_json()["labels"]
+
+
+def test_batch_reports_unknown_tickers_per_item(client):
+    r = client.get("/predict/batch?tickers=T03,nope,,T04")
+    body = r.get_json()
+    assert r.status_code == 200 and (body["count"], body["found"]) == (3, 2)
+    assert body["results"][1] == {"ticker": "NOPE", "error": "Ticker 'NOPE' not found."}
+    assert set(body["results"][0]) == set(body["results"][2]) == {"ticker", "labels"}
+
+    body = client.post("/predict/batch", json={"tickers": ["ZZZ"]}).get_json()
+    assert body["found"] == 0 and "error" in body["results"][0]
+
+
+@pytest.mark.parametrize("kwargs,message", [
+    ({"data": "T01,T02", "content_type": "text/plain"}, "Expected a JSON list"),
+    ({"data": "[not json", "content_type": "application/json"}, "Expected a JSON list"),
+    ({"json": {"symbols": ["T01"]}}, "Expected a JSON list"),
+    ({"json": "T01"}, "Expected a JSON list"),
+    ({"json": [None, " "]}, "No tickers provided"),
+])
+def test_batch_rejects_bad_bodies(client, kwargs, message):
+    r = client.post("/predict/batch", **kwargs)
+    assert r.status_code == 400 and message in r.get_json()["error"]
+
+
+def test_batch_size_limit(client, monkeypatch):
+    monkeypatch.setattr(app, "MAX_BATCH_TICKERS", 3)
+    assert client.get("/predict/batch?tickers=T01,T02,T03").status_code == 200
+    r = client.get("/predict/batch?tickers=T01,T02,T03,T01")
+    assert r.status_code == 400 and "Too many tickers (4 > 3)" in r.get_json()["error"]
+    assert client.get("/predict/batch").status_code == 400
+
+
+# -------------------------
+# /similar
+# -------------------------
+def test_similar_returns_k_neighbours(client):
+    body = client.get("/similar?ticker=t05&k=3").get_json()
+    assert body["ticker"] == "T05" and len(body["results"]) == 3
+    distances = [item["distance"] for item in body["results"]]
+    assert "T05" not in [item["ticker"] for item in body["results"]] and distances == sorted(distances)
+    assert len(client.get("/similar?ticker=T05").get_json()["results"]) == 10
+
+
+@pytest.mark.parametrize("k", ["abc", "2.5", "", "0", "-1", str(app.MAX_SIMILAR_K + 1)])
+def test_similar_rejects_invalid_k(client, k):
+    r = client.get(f"/similar?ticker=T05&k={k}")
+    assert r.status_code == 400 and r.get_json()["error"].startswith("k must be")
+
+
+# -------------------------
+# Readiness and hot reload
+# -------------------------
+def test_not_ready_until_the_first_load_finishes(service, tmp_path):
+    write_workspace(str(tmp_path))
+    gate, entered = threading.Event(), threading.Event()
+    load = service.artifacts.loader
+
+    def held_load(sources):
+        entered.set()
+        assert gate.wait(5)
+        return load(sources)
+
+    service.artifacts.loader = held_load
+    client = service.app.test_client()
+    warmup = threading.Thread(target=service._warmup)
+    warmup.start()
+    try:
+        assert entered.wait(5)
+        r = client.get("/readyz")
+        assert r.status_code == 503 and r.get_json()["state"] == "loading" and r.get_json()["version"] is None
+        r = client.get("/predict?ticker=T01")
+        assert r.status_code == 503 and r.get_json()["error"] == "Service is warming up."
+        assert client.get("/healthz").status_code == 200
+        assert client.get("/admin/artifacts").status_code == 200
+    finally:
+        gate.set()
+        warmup.join(5)
+
+    r = client.get("/readyz")
+    status = r.get_json()
+    assert r.status_code == 200 and status["state"] == "ready" and status["error"] is None
+    assert status["version"] == service.artifacts.current.version
+    assert set(status["stages"]) == set(service.WARMUP_STAGES)
+    assert client.get("/predict?ticker=T01").status_code == 200
+
+
+def test_failed_reload_keeps_serving_the_old_bundle(client, tmp_path):
+    old = app.artifacts.current.version
+    labels = client.get("/predict?ticker=T07").get_json()["labels"]
+    with open(tmp_path / app.NUMPY_MODEL_PATH, "wb") as f:
+        f.write(b"not an npz")
+
+    r = client.post("/admin/reload?force=1")
+    assert r.status_code == 500 and r.get_json()["version"] == old
+    assert "Reload failed" in r.get_json()["error"]
+    assert app.artifacts.current.version == old
+
+    r = client.get("/predict?ticker=T07")
+    assert r.status_code == 200 and r.headers["X-Artifact-Version"] == old and r.get_json()["labels"] == labels
+    assert client.get("/readyz").status_code == 200
+    status = client.get("/admin/artifacts").get_json()
+    assert status["version"] == old and status["last_error"]["reason"] == "admin"
+    assert [h["reason"] for h in status["history"]] == ["test"]
+
+
+def test_failed_startup_becomes_ready_after_a_successful_reload(service, tmp_path):
+    client = service.app.test_client()
+    service._warmup()  # nothing on disk yet
+    r = client.get("/readyz")
+    assert r.status_code == 503 and r.get_json()["state"] == "failed" and r.get_json()["error"]
+    r = client.get("/predict?ticker=T01")
+    assert r.status_code == 503 and r.get_json()["error"] == "Service failed to load its artifacts."
+
+    write_workspace(str(tmp_path))
+    r = client.post("/admin/reload")
+    assert r.status_code == 200 and r.get_json()["previous"] is None and r.get_json()["reloaded"]
+
+    r = client.get("/readyz")
+    assert r.status_code == 200 and r.get_json()["state"] == "ready" and r.get_json()["error"] is None
+    r = client.get("/predict?ticker=T01")
+    assert r.status_code == 200 and r.get_json()["version"] == service.artifacts.current.version
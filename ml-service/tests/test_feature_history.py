@@ -0,0 +1,64 @@
+# ml-service/tests/test_feature_history.py
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from feature_history import HISTORY_KEEP, POINTER, FeatureHistory
+from merge_all_features import update_sector_table
+
+
+def make_history(scale=1.0):
+    return FeatureHistory.from_arrays(
+        ["B", "A", "A", "B"], ["2015-12-31", "2014-12-31", "2015-12-31", "2014-12-31"],
+        {"x": np.array([4.0, 1.0, 2.0, 3.0]) * scale},
+    )
+
+
+def test_save_publishes_a_new_version_and_prunes_old_ones(tmp_path):
+    directory = str(tmp_path / "h")
+    paths = [make_history(scale).save(directory) for scale in (1.0, 2.0, 3.0, 4.0, 5.0)]
+    with open(os.path.join(directory, POINTER)) as f:
+        assert os.path.join(directory, f.read()) == paths[-1]
+    assert sorted(p for p in os.listdir(directory) if p.startswith("v")) == \
+        sorted(os.path.basename(p) for p in paths[-1 - HISTORY_KEEP:])
+
+    history = FeatureHistory.open(directory)
+    assert history.row(history.as_of("A", "2016-01-01")) == {"x": 10.0}
+
+
+def test_readers_never_see_a_missing_history(tmp_path):
+    directory = str(tmp_path / "h")
+    make_history().save(directory)
+    errors, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                assert len(FeatureHistory.open(directory)) == 4
+            except Exception as exc:  # noqa: BLE001 - any failure is what this test looks for
+                errors.append(exc)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for scale in range(50):
+        make_history(scale).save(directory)
+    done.set()
+    reader.join()
+    assert errors == []
+
+
+def test_sector_table_keeps_symbols_that_left_the_universe(tmp_path):
+    directory = str(tmp_path / "sectors")
+    update_sector_table(pd.DataFrame({"symbol": ["A", "B"], "sector": ["Energy", "Health Care"]}),
+                        directory, today="2016-01-04")
+    table = update_sector_table(pd.DataFrame({"symbol": ["A", "C"], "sector": ["Utilities", "Energy"]}),
+                                directory, today="2016-06-01")
+
+    assert table.symbols == ["A", "B", "C"]
+    assert table.row(0) == {"Sector_Energy": 0.0, "Sector_HealthCare": 0.0, "Sector_Utilities": 1.0}
+    assert table.row(1) == {"Sector_Energy": 0.0, "Sector_HealthCare": 1.0, "Sector_Utilities": 0.0}
+    assert table.date_of(1) == "2016-01-04"
+    assert FeatureHistory.open(directory).symbols == ["A", "B", "C"]
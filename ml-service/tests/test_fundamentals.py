@@ -0,0 +1,81 @@
+# ml-service/tests/test_fundamentals.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_history import FeatureHistory
+from merge_fundamentals import PUBLICATION_LAG_DAYS, YEAR_END, IndicatorCube
+
+YEARS = ["2014", "2015", "2016"]
+
+
+def make_indicators(n_rows=400, seed=0):
+    """Long frame with duplicate (company, indicator) keys, NaN keys and NaN values."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "company_id": rng.choice([f"C{k:02d}" for k in range(25)], n_rows).astype(object),
+        "indicator_id": rng.choice(["Assets", "Revenue", "NetIncome", "Dividends"], n_rows).astype(object),
+    })
+    for year in YEARS:
+        df[year] = np.where(rng.random(n_rows) < 0.3, np.nan, rng.normal(100.0, 30.0, n_rows))
+    df.loc[rng.choice(n_rows, 15, replace=False), "company_id"] = np.nan
+    df.loc[rng.choice(n_rows, 15, replace=False), "indicator_id"] = np.nan
+    return df
+
+
+def pivot_reference(df, year):
+    """The pivot_table the cube replaced (mean of duplicate keys, rows with a NaN key dropped)."""
+    wide = df.pivot_table(index="company_id", columns="indicator_id", values=year).reset_index()
+    wide.columns.name = None
+    return wide
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("year", YEARS)
+def test_year_matches_pivot_table(seed, year):
+    df = make_indicators(seed=seed)
+    assert df.duplicated(["company_id", "indicator_id"]).any()
+    cube = IndicatorCube.from_long(df)
+    out = cube.to_frame(cube.year(year))
+    ref = pivot_reference(df, year)
+    pd.testing.assert_frame_equal(out.astype({"company_id": object}), ref.astype({"company_id": object}),
+                                  check_dtype=False)
+
+
+def test_latest_takes_the_newest_observed_year():
+    df = make_indicators()
+    cube = IndicatorCube.from_long(df)
+    values, from_year = cube.latest(as_of="2015")
+    for (company, indicator), group in df.dropna(subset=["company_id", "indicator_id"]).groupby(
+            ["company_id", "indicator_id"]):
+        i, j = list(cube.companies).index(company), list(cube.indicators).index(indicator)
+        means = group[["2014", "2015"]].mean()
+        observed = means.dropna()
+        if observed.empty:
+            assert np.isnan(values[i, j]) and from_year[i, j] == 0
+        else:
+            assert values[i, j] == pytest.approx(observed.iloc[-1])
+            assert from_year[i, j] == int(observed.index[-1])
+
+
+def test_history_dates_values_when_published(tmp_path):
+    df = make_indicators()
+    cube = IndicatorCube.from_long(df)
+    history = cube.to_history()
+    history.save(str(tmp_path / "h"))
+    history = FeatureHistory.open(str(tmp_path / "h"))
+
+    year_end = np.datetime64(f"2015-{YEAR_END}")
+    values, _ = cube.latest(as_of="2015")
+    company = history.symbols[0]
+    i = list(cube.companies).index(company)
+
+    # At fiscal year end only the previous year's figures are public
+    before = history.as_of(company, str(year_end))
+    assert before is None or history.date_of(before) == str(np.datetime64(f"2014-{YEAR_END}") + PUBLICATION_LAG_DAYS)
+
+    after = history.as_of(company, str(year_end + PUBLICATION_LAG_DAYS))
+    assert after is not None and history.date_of(after) == str(year_end + PUBLICATION_LAG_DAYS)
+    for j, indicator in enumerate(cube.indicators):
+        np.testing.assert_equal(history.columns[indicator][after], np.float32(values[i, j]))
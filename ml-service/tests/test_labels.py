@@ -0,0 +1,67 @@
+# ml-service/tests/test_labels.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_labels import legacy_labels, make_universe
+from labels import SIZE_LABELS, SIZE_THRESHOLDS, STYLE_THRESHOLDS, compute_label_matrix
+
+NAN = np.nan
+
+
+def edge_rows():
+    """Rows on, just below and just above every threshold, plus missing and odd values."""
+    rows = []
+    for mc in [SIZE_THRESHOLDS["LargeCap"], SIZE_THRESHOLDS["MidCap_min"], SIZE_THRESHOLDS["SmallCap_min"]]:
+        rows += [(mc, 0.0, 20.0, 0.0, "Energy"), (np.nextafter(mc, 0), 0.0, 20.0, 0.0, "Energy"),
+                 (np.nextafter(mc, np.inf), 0.0, 20.0, 0.0, "Energy")]
+    growth, pe, yield_ = (STYLE_THRESHOLDS[k] for k in ("GrowthStock_rev_growth", "ValueStock_pe",
+                                                         "IncomeStock_div_yield"))
+    rows += [
+        (1e9, growth, pe, yield_, "Utilities"),
+        (1e9, np.nextafter(growth, 0), np.nextafter(pe, np.inf), np.nextafter(yield_, 0), "Utilities"),
+        (2e10, 0.5, 5.0, yield_, "Financials"),           # blue chip
+        (NAN, NAN, NAN, NAN, NAN),                        # everything missing
+        (NAN, 0.2, 10.0, 0.05, "Technology"),
+        (5e9, NAN, NAN, NAN, "Consumer Discretionary"),
+        (0.0, -0.3, -5.0, 0.0, "Health Care"),            # negative P/E counts as value
+        (np.inf, np.inf, np.inf, np.inf, "Real Estate"),
+        (-1.0, -np.inf, -np.inf, 1e-12, "Not A Sector"),  # unknown sector: defensive, own one-hot
+    ]
+    return pd.DataFrame(rows, columns=["MarketCap", "RevenueGrowth", "PE", "DividendYield", "sector"])
+
+
+@pytest.mark.parametrize("df", [edge_rows(), make_universe(20_000, seed=7)], ids=["edges", "synthetic"])
+def test_matches_legacy_labels(df):
+    y, cols = compute_label_matrix(df)
+    y_legacy, cols_legacy = legacy_labels(df)
+    assert cols == cols_legacy
+    assert y.dtype == np.int8
+    np.testing.assert_array_equal(y, y_legacy)
+
+
+def test_threshold_edges():
+    y, cols = compute_label_matrix(edge_rows())
+    labels = pd.DataFrame(y, columns=cols)
+    # MarketCap: lower bounds inclusive, upper bounds exclusive; exactly one size label per row
+    assert labels.loc[0:2, "LargeCap"].tolist() == [1, 0, 1]
+    assert labels.loc[3:5, "MidCap"].tolist() == [1, 0, 1]
+    assert labels.loc[6:8, "SmallCap"].tolist() == [1, 0, 1]
+    assert (labels[SIZE_LABELS].sum(axis=1) == 1).all()
+    # Style thresholds are inclusive
+    assert labels.loc[9, ["GrowthStock", "ValueStock", "IncomeStock"]].tolist() == [1, 1, 1]
+    assert labels.loc[10, ["GrowthStock", "ValueStock", "IncomeStock"]].tolist() == [0, 0, 0]
+    assert labels.loc[11, "BlueChipStock"] == 1
+    # Missing values: MicroCap, no growth/value/income, no dividend, defensive, no sector
+    missing = labels.loc[12]
+    assert missing["MicroCap"] == 1 and missing["NonDividendStock"] == 1 and missing["Defensive"] == 1
+    assert missing[[c for c in cols if c.startswith("Sector_")]].sum() == 0
+    assert labels.loc[13, ["MicroCap", "Cyclical", "Sector_Technology"]].tolist() == [1, 1, 1]
+    assert labels.loc[15, ["MicroCap", "ValueStock", "NonDividendStock"]].tolist() == [1, 1, 1]
+    assert labels.loc[17, ["Defensive", "Sector_NotASector", "DividendStock"]].tolist() == [1, 1, 1]
+
+
+def test_missing_column_raises():
+    with pytest.raises(KeyError, match="sector"):
+        compute_label_matrix(edge_rows().drop(columns="sector"))
@@ -0,0 +1,112 @@
+# ml-service/tests/test_micro_batcher.py
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """A predict_fn that records the rows of every call and can be held at a gate."""
+
+    def __init__(self, offset=0.0, gate=None):
+        self.offset = offset
+        self.gate = gate
+        self.calls = []
+        self.entered = threading.Event()
+
+    def __call__(self, x):
+        self.calls.append(x.copy())
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return x * 2 + self.offset
+
+
+def row(value):
+    return np.array([[value, -value]], dtype=np.float64)
+
+
+def test_rows_are_only_stacked_with_rows_for_the_same_predict_fn():
+    gate = threading.Event()
+    blocker = Recorder(gate=gate)
+    model_a, model_b = Recorder(offset=100.0), Recorder(offset=200.0)
+    batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50)
+
+    held = batcher.submit(row(0), blocker)
+    assert blocker.entered.wait(5)  # the worker is busy; everything below queues up behind it
+    futures = [(i, fn, batcher.submit(row(i), fn)) for i, fn in enumerate([model_a, model_b] * 4, start=1)]
+    gate.set()
+
+    np.testing.assert_array_equal(held.result(5), [0.0, 0.0])
+    for i, fn, future in futures:
+        np.testing.assert_array_equal(future.result(5), row(i)[0] * 2 + fn.offset)
+    # Each model saw exactly its own rows, in one forward pass
+    assert [len(c) for c in model_a.calls] == [4] and [len(c) for c in model_b.calls] == [4]
+    np.testing.assert_array_equal(model_a.calls[0][:, 0], [1, 3, 5, 7])
+    np.testing.assert_array_equal(model_b.calls[0][:, 0], [2, 4, 6, 8])
+
+
+def test_a_failed_forward_pass_resolves_every_future_with_the_exception():
+    gate = threading.Event()
+    blocker = Recorder(gate=gate)
+
+    def broken(x):
+        raise ValueError(f"bad batch of {len(x)}")
+
+    batcher = MicroBatcher(broken, max_batch_size=64, max_wait_ms=50)
+    batcher.submit(row(0), blocker)
+    assert blocker.entered.wait(5)
+    futures = [batcher.submit(row(i)) for i in range(3)]
+    gate.set()
+
+    for future in futures:
+        with pytest.raises(ValueError, match="bad batch of 3"):
+            future.result(5)
+    # The worker survives and keeps serving
+    np.testing.assert_array_equal(batcher.predict(row(5), timeout=5, predict_fn=Recorder()), [10.0, -10.0])
+
+
+def test_invalid_configuration_raises():
+    with pytest.raises(ValueError, match="max_batch_size"):
+        MicroBatcher(max_batch_size=0)
+    with pytest.raises(ValueError, match="No predict_fn"):
+        MicroBatcher().submit(row(1))
+
+
+def test_stats_count_batches_and_reset():
+    gate = threading.Event()
+    blocker = Recorder(gate=gate)
+    model = Recorder()
+    batcher = MicroBatcher(model, max_batch_size=3, max_wait_ms=50)
+
+    batcher.submit(row(0), blocker)
+    assert blocker.entered.wait(5)
+    futures = [batcher.submit(row(i)) for i in range(5)]
+    gate.set()
+    for future in futures:
+        future.result(5)
+
+    stats = batcher.stats(reset=True)
+    assert stats["batches"] == 3 and stats["requests"] == 6
+    assert stats["batch_size_counts"] == {"1": 1, "2": 1, "3": 1}
+    assert stats["mean_batch_size"] == 2.0
+    assert stats["immediate_dispatches"] == 1  # only the first request found the batcher idle
+    assert stats["max_queue_delay_ms"] >= stats["mean_queue_delay_ms"] > 0
+    assert stats["queue_depth"] == 0
+
+    cleared = batcher.stats()
+    assert (cleared["batches"], cleared["requests"], cleared["batch_size_counts"]) == (0, 0, {})
+    assert cleared["max_batch_size"] == 3 and cleared["max_wait_ms"] == 50.0
+
+
+def test_a_lone_request_does_not_wait_for_the_window():
+    batcher = MicroBatcher(Recorder(), max_batch_size=64, max_wait_ms=1000)
+    t0 = time.perf_counter()
+    for i in range(3):
+        np.testing.assert_array_equal(batcher.predict(row(i), timeout=5), row(i)[0] * 2)
+    assert time.perf_counter() - t0 < 0.5
+    assert batcher.stats()["immediate_dispatches"] == 3
@@ -0,0 +1,79 @@
+# ml-service/tests/test_numpy_model.py
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+pytest.importorskip("sklearn")
+
+from export_numpy_model import PARITY_TOL, extract_dense_layers, verify_parity  # noqa: E402
+from numpy_model import NumpyModel, save_npz  # noqa: E402
+from train_model import build_model  # noqa: E402
+
+N_FEATURES, N_LABELS = 10, 16
+
+
+def export(model, path, mean=None, scale=None):
+    layers = extract_dense_layers(model)
+    n_in = layers[0][0].shape[0]
+    mean = np.zeros(n_in) if mean is None else mean
+    scale = np.ones(n_in) if scale is None else scale
+    save_npz(path, layers, [f"f{i}" for i in range(n_in)], [f"l{j}" for j in range(layers[-1][0].shape[1])],
+             mean, scale)
+    return NumpyModel.load(path)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return np.random.default_rng(0).standard_normal((256, N_FEATURES)).astype(np.float32) * 3.0
+
+
+def test_training_architecture_matches_keras(tmp_path, rows):
+    tf.keras.utils.set_random_seed(0)
+    model = build_model(N_FEATURES, N_LABELS)
+    np_model = export(model, tmp_path / "model.npz")
+
+    max_diff, labels_match = verify_parity(model, np_model, rows)
+    assert max_diff <= PARITY_TOL
+    assert labels_match
+    assert np_model.input_dim == N_FEATURES
+    assert np_model.label_names == [f"l{j}" for j in range(N_LABELS)]
+
+    # Single rows (1-D input) and the penultimate-layer embedding used by /similar
+    np.testing.assert_allclose(np_model.predict(rows[0]), np_model.predict(rows[:1]))
+    penultimate = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)][-2]
+    keras_embed = tf.keras.Model(model.inputs, penultimate.output).predict(rows, verbose=0)
+    np.testing.assert_allclose(np_model.embed(rows), keras_embed, atol=PARITY_TOL)
+    np.testing.assert_allclose(np_model.embed(rows, layer=-1), np_model.predict(rows))
+
+
+@pytest.mark.parametrize("activation", ["linear", "tanh", "softmax"])
+def test_other_activations_match_keras(tmp_path, rows, activation):
+    tf.keras.utils.set_random_seed(1)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(N_FEATURES,)),
+        tf.keras.layers.Dense(8, activation=activation),
+        tf.keras.layers.Dense(4, activation="sigmoid"),
+    ])
+    max_diff, _ = verify_parity(model, export(model, tmp_path / "model.npz"), rows)
+    assert max_diff <= PARITY_TOL
+
+
+def test_scaler_matches_standard_scaler(tmp_path, rows):
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(rows.astype(np.float64) * 5.0 + 2.0)
+    model = build_model(N_FEATURES, N_LABELS)
+    np_model = export(model, tmp_path / "model.npz", scaler.mean_, scaler.scale_)
+    x = rows.astype(np.float64)
+    np.testing.assert_allclose(np_model.scaler.transform(x), scaler.transform(x), rtol=1e-12)
+
+
+def test_unsupported_layers_are_rejected():
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(N_FEATURES,)),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dense(4, activation="sigmoid"),
+    ])
+    with pytest.raises(TypeError, match="Cannot export"):
+        extract_dense_layers(model)
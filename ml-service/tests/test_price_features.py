@@ -0,0 +1,146 @@
+# ml-service/tests/test_price_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compute_price_features import (
+    PriceFeatureState, compute_feature_series, compute_latest_features, sort_prices,
+)
+
+VOL, MOM = 20, 10
+
+
+def make_prices(n_symbols=4, n_days=80, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "symbol": np.repeat([f"S{k}" for k in range(n_symbols)], n_days),
+        "date": np.tile(pd.date_range("2020-01-01", periods=n_days), n_symbols),
+        "close": rng.uniform(10.0, 20.0, n_symbols * n_days),
+    })
+    df.loc[[5, 6, n_days + 30], "close"] = np.nan  # gaps are pad-filled
+    df.loc[12, "close"] = 0.0                      # 0 -> nonzero close gives an inf return
+    return df
+
+
+def pandas_reference(df):
+    """
+    The original groupby/rolling implementation. pct_change's pad-filling of NaN
+    closes (its pandas < 3 default) is spelled out so the result is version-independent.
+    """
+    df = df.sort_values(["symbol", "date"]).reset_index(drop=True)
+    filled = df.groupby("symbol")["close"].ffill()
+    df["return"] = filled / filled.groupby(df["symbol"]).shift(1) - 1.0
+    grp = df.groupby("symbol")
+    df["volatility"] = grp["return"].transform(lambda r: r.rolling(VOL, min_periods=VOL).std())
+    df["momentum"] = df["close"] / grp["close"].shift(MOM) - 1.0
+    return df
+
+
+@pytest.fixture(autouse=True)
+def small_windows(monkeypatch):
+    import compute_price_features
+    monkeypatch.setattr(compute_price_features, "VOL_WINDOW", VOL)
+    monkeypatch.setattr(compute_price_features, "MOM_WINDOW", MOM)
+
+
+def test_feature_series_matches_pandas():
+    df = make_prices()
+    ref = pandas_reference(df)
+    out = compute_feature_series(sort_prices(df))
+    np.testing.assert_allclose(out["volatility"], ref["volatility"], rtol=1e-7, equal_nan=True)
+    np.testing.assert_allclose(out["momentum"], ref["momentum"], rtol=1e-9, equal_nan=True)
+    # The inf return only blanks the windows containing it, never other symbols
+    assert np.isinf(out["return"]).sum() == 1
+    assert out.loc[out["symbol"] != "S0", "volatility"].notna().sum() == \
+        ref.loc[ref["symbol"] != "S0", "volatility"].notna().sum()
+
+
+def test_extreme_return_stays_in_its_own_windows():
+    df = make_prices(n_symbols=5)
+    df.loc[30, "close"] = 1e-7  # one bad tick in S0: returns of about -1 and +1e8
+    ref = pandas_reference(df)
+    out = compute_feature_series(sort_prices(df))
+
+    others = (ref["symbol"] != "S0").to_numpy()
+    np.testing.assert_allclose(out["volatility"][others], ref["volatility"][others], rtol=1e-7, equal_nan=True)
+
+    # S0's own windows after the tick has left them: exact std of the window
+    s0 = out[out["symbol"] == "S0"].reset_index(drop=True)
+    for end in range(30 + VOL + 1, len(s0)):
+        expected = np.std(s0["return"].to_numpy()[end - VOL + 1 : end + 1], ddof=1)
+        assert s0.loc[end, "volatility"] == pytest.approx(expected, rel=1e-9)
+
+    # The incremental state sees the same windows
+    state = PriceFeatureState.from_history(sort_prices(df.iloc[:40]), VOL, MOM)
+    state.update(sort_prices(df.iloc[40:]))
+    latest = state.features().set_index("symbol")["volatility"]
+    last = out.groupby("symbol")["volatility"].last()
+    np.testing.assert_allclose(latest.loc[last.index], last, rtol=1e-9)
+
+
+def test_latest_features_match_pandas():
+    df = make_prices(n_days=25)  # S0's last window still contains the inf return
+    ref = pandas_reference(df).groupby("symbol").tail(1).set_index("symbol")
+    out = compute_latest_features(sort_prices(df)).set_index("symbol").loc[ref.index]
+    np.testing.assert_allclose(out["volatility"], ref["volatility"], rtol=1e-7, equal_nan=True)
+    np.testing.assert_allclose(out["momentum"], ref["momentum"], rtol=1e-9, equal_nan=True)
+    assert np.isnan(out.loc["S0", "volatility"])
+
+
+@pytest.mark.parametrize("split", [8, 25, 60])
+def test_incremental_state_matches_full_run(split):
+    df = sort_prices(make_prices())
+    head = df[df["date"] < df["date"].min() + pd.Timedelta(days=split)]
+    tail = df[df["date"] >= df["date"].min() + pd.Timedelta(days=split)]
+    state = PriceFeatureState.from_history(sort_prices(head), VOL, MOM)
+    state.update(sort_prices(tail))
+    out = state.features().set_index("symbol")
+    ref = compute_latest_features(df).set_index("symbol").loc[out.index]
+    np.testing.assert_allclose(out["volatility"], ref["volatility"], rtol=1e-7, equal_nan=True)
+    np.testing.assert_allclose(out["momentum"], ref["momentum"], rtol=1e-9, equal_nan=True)
+
+
+def test_incremental_rebuilds_when_prices_csv_is_rewritten(tmp_path, monkeypatch, capsys):
+    import compute_price_features as cpf
+
+    prices = tmp_path / "prices.csv"
+    monkeypatch.setattr(cpf, "PRICES_CSV", str(prices))
+    monkeypatch.setattr(cpf, "PROCESSED_DIR", str(tmp_path))
+    monkeypatch.setattr(cpf, "PRICE_FEATURES_CSV", str(tmp_path / "price_features.csv"))
+    state_path = str(tmp_path / "state.npz")
+
+    def write(df):
+        df.rename(columns={"date": "Date", "symbol": "Symbol", "close": "Close"}).to_csv(prices, index=False)
+
+    def expected(df):
+        return compute_latest_features(sort_prices(df)).dropna().set_index("symbol")
+
+    def result():
+        return pd.read_csv(tmp_path / "price_features.csv").set_index("symbol")
+
+    first = make_prices(seed=1).dropna()
+    write(first)
+    cpf.run_incremental(state_path)
+
+    # Same size, different content: must not be parsed from the old byte offset
+    rewritten = first.assign(close=first["close"][::-1].to_numpy())
+    write(rewritten)
+    capsys.readouterr()
+    cpf.run_incremental(state_path)
+    assert "rewritten" in capsys.readouterr().out
+    np.testing.assert_allclose(result()["volatility"], expected(rewritten)["volatility"].loc[result().index])
+
+    # Larger rewrite: also a rebuild, not an append
+    longer = make_prices(n_days=90, seed=2).dropna()
+    write(longer)
+    cpf.run_incremental(state_path)
+    assert "rewritten" in capsys.readouterr().out
+    np.testing.assert_allclose(result()["volatility"], expected(longer)["volatility"].loc[result().index])
+
+    # A genuine append is consumed incrementally
+    with open(prices, "a") as f:
+        f.write("S1,2020-04-01,15.0\n")  # column order of make_prices()
+    cpf.run_incremental(state_path)
+    out = capsys.readouterr().out
+    assert "rewritten" not in out and "applied 1" in out
@@ -0,0 +1,82 @@
+# ml-service/tests/test_screener.py
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from screener import LabelBitmaps, QueryError, render
+
+LABELS = ["LargeCap", "SmallCap", "GrowthStock", "Cyclical", "Sector_Technology", "Sector_HealthCare",
+          "DividendStock"]
+
+
+def make_universe(n_rows=1003, seed=0):
+    """Random predictions; every 7th row repeats the previous symbol (only first rows are served)."""
+    rng = np.random.default_rng(seed)
+    predictions = pd.DataFrame(rng.random((n_rows, len(LABELS))) < 0.4, columns=LABELS)
+    symbols, first = [], {}
+    for i in range(n_rows):
+        symbols.append(symbols[-1] if i % 7 == 6 else f"T{i:04d}")
+        first.setdefault(symbols[-1], i)
+    bitmaps = LabelBitmaps(predictions.to_numpy(), LABELS, symbols, list(first.values()))
+    served = np.zeros(n_rows, dtype=bool)
+    served[list(first.values())] = True
+    return bitmaps, predictions, served
+
+
+# (query, the same filter on the pandas frame p)
+QUERIES = [
+    ("LargeCap", lambda p: p.LargeCap),
+    ("largecap AND NOT dividendstock", lambda p: p.LargeCap & ~p.DividendStock),
+    ("SmallCap OR GrowthStock AND Cyclical", lambda p: p.SmallCap | (p.GrowthStock & p.Cyclical)),
+    ("(SmallCap | GrowthStock) & Cyclical", lambda p: (p.SmallCap | p.GrowthStock) & p.Cyclical),
+    ("(LargeCap | SmallCap), !Cyclical", lambda p: (p.LargeCap | p.SmallCap) & ~p.Cyclical),
+    ("NOT NOT Technology", lambda p: p.Sector_Technology),
+    ("NOT (HealthCare OR Technology)", lambda p: ~(p.Sector_HealthCare | p.Sector_Technology)),
+    ("!LargeCap & !SmallCap | DividendStock", lambda p: (~p.LargeCap & ~p.SmallCap) | p.DividendStock),
+]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("query,expected", QUERIES, ids=[q for q, _ in QUERIES])
+def test_bitmaps_match_pandas_filter(seed, query, expected):
+    bitmaps, predictions, served = make_universe(seed=seed)
+    want = expected(predictions).to_numpy() & served
+
+    _, total, rows = bitmaps.screen(query, offset=0, limit=len(predictions))
+    assert total == want.sum()
+    np.testing.assert_array_equal(rows, np.flatnonzero(want))
+    np.testing.assert_array_equal(bitmaps.mask(query), want)
+
+    _, _, page = bitmaps.screen(query, offset=3, limit=5)
+    np.testing.assert_array_equal(page, np.flatnonzero(want)[3:8])
+
+
+def test_precedence_and_canonical_form():
+    bitmaps, _, _ = make_universe()
+    assert render(bitmaps.parse("SmallCap OR GrowthStock AND NOT Cyclical")) == \
+        "(SmallCap OR (GrowthStock AND NOT Cyclical))"
+    assert render(bitmaps.parse("technology, !dividendstock")) == "(Sector_Technology AND NOT DividendStock)"
+
+
+def test_empty_query_masks_every_served_row():
+    bitmaps, _, served = make_universe()
+    np.testing.assert_array_equal(bitmaps.mask(""), served)
+    np.testing.assert_array_equal(bitmaps.mask("   "), served)
+
+
+@pytest.mark.parametrize("query,message", [
+    ("Foo", "Unknown label 'Foo'"),
+    ("LargeCap AND", "end of query"),
+    ("(LargeCap", "Missing closing parenthesis"),
+    ("LargeCap)", "after a complete expression"),
+    ("LargeCap SmallCap", "after a complete expression"),
+    ("LargeCap $", "Unexpected character '$'"),
+    ("OR LargeCap", "Expected a label"),
+])
+def test_malformed_queries_raise(query, message):
+    bitmaps, _, _ = make_universe()
+    with pytest.raises(QueryError, match=re.escape(message)):
+        bitmaps.screen(query)
@@ -0,0 +1,57 @@
+# ml-service/tests/test_serve.py
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(__file__), "..", "scripts")
+
+# A master whose first worker crashes at once and whose workers otherwise stay in
+# "warm-up" (never install their own handlers), so the respawned one is still
+# warming up when the master is stopped
+MASTER = """
+import argparse, os, sys, time
+sys.path.insert(0, {scripts!r})
+import serve
+
+serve.RESPAWN_DELAY = 0.1
+serve.SHUTDOWN_TIMEOUT = 20.0
+
+def warming_worker(sock, host, port, wait):
+    marker = {marker!r}
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise RuntimeError("first start fails")
+    with open({spawned!r}, "a") as f:
+        f.write(f"{{os.getpid()}}\\n")
+    time.sleep(60)
+
+serve.run_worker = warming_worker
+sock = serve.bind_socket("127.0.0.1", 0)
+sys.exit(serve.supervise(sock, argparse.Namespace(workers=1, host="127.0.0.1", port=0, wait=False)))
+"""
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="serve.py needs os.fork")
+def test_sigterm_stops_a_respawned_worker_during_warmup(tmp_path):
+    spawned = tmp_path / "spawned"
+    script = MASTER.format(scripts=os.path.abspath(SCRIPTS), marker=str(tmp_path / "crashed"), spawned=str(spawned))
+    master = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + 20
+        while not (spawned.exists() and spawned.read_text()) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert spawned.exists(), "the crashed worker was never respawned"
+
+        t0 = time.monotonic()
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=10) == 0
+        assert time.monotonic() - t0 < 5  # not held up until SHUTDOWN_TIMEOUT + SIGKILL
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
@@ -0,0 +1,95 @@
+# ml-service/tests/test_storage.py
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+
+
+def make_frame():
+    return pd.DataFrame({
+        "symbol": ["AAPL", "BRK.B", "NESN.SW", "7203.T", "ÅKER", "日本郵船", None],
+        "MarketCap": [2.5e12, 7.8e11, np.nan, 2.1e11, 1.0e9, 3.3e10, 5.0],
+        "shares": np.arange(7, dtype=np.int64) * 1000,
+        "flag": [True, False, True, True, False, False, True],
+        "date": pd.to_datetime(["2016-12-30"] * 3 + ["2015-06-01"] * 4),
+    })
+
+
+def normalise(df):
+    """Compare values, not the string dtype flavour (object vs pandas' str) a reader picks."""
+    df = df.copy()
+    for name in df.columns:
+        if not (pd.api.types.is_numeric_dtype(df[name]) or pd.api.types.is_bool_dtype(df[name])
+                or pd.api.types.is_datetime64_any_dtype(df[name])):
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return df
+
+
+@pytest.mark.parametrize("fmt", storage.FORMATS)
+def test_round_trip(tmp_path, fmt):
+    if fmt in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / "table.csv")
+    df = make_frame()
+    written = storage.write_table(df, path, fmt)
+    assert written == storage.table_path(path, fmt) and os.path.exists(written)
+
+    back = storage.read_table(path, dtype={"symbol": str})
+    if fmt == "csv":
+        back["date"] = pd.to_datetime(back["date"])  # text has no datetime type
+    pd.testing.assert_frame_equal(normalise(back), normalise(df), check_dtype=fmt != "csv")
+    assert storage.list_columns(path) == list(df.columns)
+
+    cols = storage.read_columns(path, ["MarketCap", "symbol"], dtype={"symbol": str})
+    assert list(cols) == ["MarketCap", "symbol"]
+    np.testing.assert_array_equal(cols["MarketCap"], df["MarketCap"].to_numpy())
+    assert [s if isinstance(s, str) else None for s in cols["symbol"]] == normalise(df)["symbol"].tolist()
+
+    projected = storage.read_table(path, columns=["shares", "flag"])
+    assert list(projected.columns) == ["shares", "flag"]
+    pd.testing.assert_frame_equal(projected, df[["shares", "flag"]])
+
+
+def test_npy_layout_schema_and_memory_maps(tmp_path):
+    path = str(tmp_path / "table.csv")
+    out = storage.write_table(make_frame(), path, "npy")
+    with open(os.path.join(out, storage.SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    entries = {c["name"]: c for c in schema["columns"]}
+    assert schema["n_rows"] == 7
+    assert {name: c["kind"] for name, c in entries.items()} == \
+        {"symbol": "str", "MarketCap": "numeric", "shares": "numeric", "flag": "numeric", "date": "datetime"}
+    assert entries["symbol"]["dtype"].startswith("<U") and "mask" in entries["symbol"]
+    assert (entries["MarketCap"]["dtype"], entries["shares"]["dtype"], entries["flag"]["dtype"]) == \
+        ("float64", "int64", "bool")
+
+    cols = storage.read_columns(path, ["MarketCap", "symbol"])
+    assert isinstance(cols["MarketCap"], np.memmap)
+    assert cols["symbol"][5] == "日本郵船" and cols["symbol"][6] != cols["symbol"][6]  # NaN for the missing one
+    with pytest.raises(KeyError):
+        storage.read_columns(path, ["nope"])
+
+
+def test_resolve_table_picks_the_newest_variant(tmp_path):
+    path = str(tmp_path / "table.csv")
+    df = make_frame()
+    csv = storage.write_table(df, path, "csv")
+    npy = storage.write_table(df.assign(shares=df["shares"] + 1), path, "npy")
+    os.utime(csv, (1_000_000_000, 1_000_000_000))
+    assert storage.resolve_table(path) == (npy, "npy")
+    assert storage.read_table(path)["shares"].iloc[1] == 1001
+
+    os.utime(csv, None)
+    os.utime(npy, (1_000_000_000, 1_000_000_000))
+    assert storage.resolve_table(path) == (csv, "csv")
+    assert storage.read_table(path)["shares"].iloc[1] == 1000
+
+    with pytest.raises(FileNotFoundError):
+        storage.resolve_table(str(tmp_path / "missing.csv"))
+    with pytest.raises(ValueError):
+        storage.table_path(path, "xlsx")
@@ -0,0 +1,60 @@
+# ml-service/tests/test_vector_index.py
+
+import numpy as np
+
+from feature_store import shared_arrays
+from vector_index import VectorIndex
+
+
+def make_vectors(n=6000, dim=17, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_matrix_without_nans_is_not_copied():
+    x = make_vectors()
+    index = VectorIndex(x)
+    assert np.shares_memory(index.vectors, x)
+    assert "vectors" not in index.to_arrays()
+
+    x[3, 2] = np.nan
+    index = VectorIndex(x)
+    assert not np.shares_memory(index.vectors, x)
+    assert not np.isnan(index.vectors).any()
+
+
+def test_ivf_recall_at_default_probes():
+    x = make_vectors()
+    exact = VectorIndex(x)
+    ivf = VectorIndex(x, brute_force_max=1000)
+    assert ivf.kind == "ivf"
+    hits = [len(set(exact.search(q, 10)[0].tolist()) & set(ivf.search(q, 10)[0].tolist()))
+            for q in range(0, len(x), 60)]
+    assert np.mean(hits) / 10 >= 0.9
+
+
+def test_shared_arrays_round_trip(tmp_path):
+    x = make_vectors()
+    built = []
+
+    def build():
+        built.append(1)
+        return VectorIndex(x, metric="cosine", brute_force_max=1000).to_arrays()
+
+    for _ in range(2):
+        arrays = shared_arrays(str(tmp_path), "universe-test", build)
+    assert built == [1]
+    assert all(isinstance(a, np.memmap) for a in arrays.values())
+
+    fresh = VectorIndex(x, metric="cosine", brute_force_max=1000)
+    mapped = VectorIndex.from_arrays(arrays, "cosine", n_probe=fresh.n_probe)
+    np.testing.assert_array_equal(mapped.search(7, 10)[0], fresh.search(7, 10)[0])
+
+
+def test_mask_restricts_results():
+    x = make_vectors(n=500)
+    mask = np.zeros(len(x), dtype=bool)
+    mask[::2] = True
+    for index in (VectorIndex(x), VectorIndex(x, brute_force_max=100)):
+        rows, dists = index.search(1, 20, mask=mask)
+        assert len(rows) == 20 and mask[rows].all()
+        assert (np.diff(dists) >= 0).all()
@@ -1 +1,368 @@
-#file for building and training the model
\ No newline at end of file
+#file for building and training the model
+# Pipeline orchestrator: runs the ml-service/scripts stages as a DAG.
+#
+#   fundamentals ──┐
+#                  ├──> combine ──> train ──> export_numpy
+#   price_features ┘
+#
+# Every stage declares its inputs and outputs. A stage is skipped when the
+# content hashes of its inputs (and of its script, the scripts/ modules it
+# imports, and its arguments) match the last successful run and all of its
+# outputs still exist. Stages whose dependencies are satisfied run in parallel
+# (fundamentals and price_features, for example).
+#
+# Usage (from ml-service/):
+#   python training/pipelines/train.py                 # everything that is out of date
+#   python training/pipelines/train.py combine         # a target and whatever it needs
+#   python training/pipelines/train.py --force train   # rerun even if up to date
+#   python training/pipelines/train.py --dry-run       # show what would run
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# ===========================
+# 1) PATHS
+# ===========================
+ML_SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SCRIPTS_DIR    = os.path.join(ML_SERVICE_DIR, "scripts")
+PROCESSED_DIR  = os.path.join(ML_SERVICE_DIR, "data", "processed")
+MANIFEST_PATH  = os.path.join(PROCESSED_DIR, ".pipeline_manifest.json")
+
+sys.path.insert(0, SCRIPTS_DIR)
+import storage  # noqa: E402  (needs SCRIPTS_DIR on sys.path)
+
+HASH_CHUNK = 1 << 20
+
+
+# ===========================
+# 2) STAGE DEFINITIONS
+# ===========================
+class Artifact:
+    """
+    A file, or (table=True) a processed table in any storage format (see storage.py).
+    An optional output is one a stage may legitimately not write (e.g. the sector
+    table when the data has no sectors); it only has to still exist if the last
+    successful run wrote it.
+    """
+
+    def __init__(self, path, table=False, optional=False):
+        self.path = os.path.join(ML_SERVICE_DIR, path)
+        self.table = table
+        self.optional = optional
+
+    def __repr__(self):
+        return os.path.relpath(self.path, ML_SERVICE_DIR)
+
+    def resolve(self):
+        """Actual file/dir on disk, or None if missing."""
+        if self.table:
+            try:
+                return storage.resolve_table(self.path)[0]
+            except FileNotFoundError:
+                return None
+        return self.path if os.path.exists(self.path) else None
+
+
+class Stage:
+    def __init__(self, name, script, inputs, outputs, args=(), table_format=False):
+        self.name = name
+        self.script = os.path.join(SCRIPTS_DIR, script)
+        self.inputs = inputs
+        self.outputs = outputs
+        self.args = list(args)
+        self.table_format = table_format  # accepts --format
+        self.deps = set()
+
+    @property
+    def code(self):
+        """The script plus every scripts/ module it (transitively) imports, e.g. labels.py."""
+        return [self.script] + local_imports(self.script)
+
+    def command(self, fmt):
+        cmd = [sys.executable, self.script] + self.args
+        if self.table_format and fmt:
+            cmd += ["--format", fmt]
+        return cmd
+
+
+def build_stages():
+    fundamentals = Artifact("data/processed/fundamentals_clean.csv", table=True)
+    price_features = Artifact("data/processed/price_features.csv", table=True)
+    combined = Artifact("data/processed/combined_data.csv", table=True)
+    model = Artifact("model.h5")
+    scaler = Artifact("data/processed/scaler.save")
+
+    stages = [
+        Stage("fundamentals", "merge_fundamentals.py",
+              inputs=[Artifact("data/raw/indicators_by_company.csv"), Artifact("data/raw/companies.csv")],
+              outputs=[fundamentals, Artifact("data/processed/fundamentals_cube.npz")],
+              table_format=True),
+        Stage("price_features", "compute_price_features.py",
+              inputs=[Artifact("data/raw/prices.csv")],
+              outputs=[price_features],
+              table_format=True),
+        Stage("combine", "merge_all_features.py",
+              inputs=[fundamentals, price_features],
+              outputs=[combined, Artifact("data/processed/history/sectors", optional=True)],
+              table_format=True),
+        Stage("train", "train_model.py",
+              inputs=[combined],
+              outputs=[model, scaler, Artifact("data/processed/training_history.csv")]),
+        Stage("export_numpy", "export_numpy_model.py",
+              inputs=[model, scaler, combined],
+              outputs=[Artifact("model.npz")]),
+    ]
+
+    # Wire dependencies: a stage depends on whichever stage produces one of its inputs
+    producer = {a.path: s.name for s in stages for a in s.outputs}
+    for s in stages:
+        s.deps = {producer[a.path] for a in s.inputs if a.path in producer}
+    return {s.name: s for s in stages}
+
+
+# ===========================
+# 3) CONTENT FINGERPRINTS
+# ===========================
+_imports_of = {}
+
+
+def local_imports(path):
+    """
+    Sorted paths of the scripts/ modules `path` imports, directly or through
+    other scripts/ modules. Imports anywhere in the file count (app-style lazy
+    imports inside functions too); third-party and stdlib modules are ignored.
+    """
+    seen, todo = set(), [path]
+    while todo:
+        current = todo.pop()
+        if current not in _imports_of:
+            with open(current, "rb") as f:
+                tree = ast.parse(f.read(), filename=current)
+            names = set()
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names.update(alias.name.split(".")[0] for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    names.add(node.module.split(".")[0])
+            candidates = (os.path.join(SCRIPTS_DIR, f"{name}.py") for name in names)
+            _imports_of[current] = sorted(c for c in candidates if os.path.exists(c))
+        for module in _imports_of[current]:
+            if module not in seen and module != path:
+                seen.add(module)
+                todo.append(module)
+    return sorted(seen)
+
+
+class HashCache:
+    """sha256 per file, memoized by (size, mtime_ns) so unchanged files are not re-read."""
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        key = [st.st_size, st.st_mtime_ns]
+        cached = self.entries.get(path)
+        if cached and cached["key"] == key:
+            return cached["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                h.update(block)
+        self.entries[path] = {"key": key, "sha256": h.hexdigest()}
+        return h.hexdigest()
+
+    def path_hash(self, path):
+        """Hash of a file, or of every file (name + content) under a directory."""
+        if not os.path.isdir(path):
+            return self.file_hash(path)
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode())
+                h.update(self.file_hash(full).encode())
+        return h.hexdigest()
+
+
+def fingerprint(stage, cache, fmt):
+    """Hash of the stage's code (script + local imports), command line and the content of every input."""
+    h = hashlib.sha256()
+    for path in stage.code:
+        h.update(os.path.relpath(path, ML_SERVICE_DIR).encode())
+        h.update(cache.file_hash(path).encode())
+    h.update(json.dumps(stage.command(fmt)[1:]).encode())
+    if stage.table_format and not fmt:
+        # Without --format the script writes $STORAGE_FORMAT (storage.DEFAULT_FORMAT)
+        h.update(f"STORAGE_FORMAT={os.environ.get('STORAGE_FORMAT', '')}".encode())
+    for artifact in stage.inputs:
+        actual = artifact.resolve()
+        if actual is None:
+            raise FileNotFoundError(f"Stage '{stage.name}' is missing input {artifact}.")
+        h.update(os.path.relpath(actual, ML_SERVICE_DIR).encode())
+        h.update(cache.path_hash(actual).encode())
+    return h.hexdigest()
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"stages": {}, "hashes": {}}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+# ===========================
+# 4) SCHEDULER
+# ===========================
+def select(stages, targets):
+    """Targets plus everything they (transitively) depend on."""
+    wanted, todo = set(), list(targets or stages)
+    while todo:
+        name = todo.pop()
+        if name not in stages:
+            raise KeyError(f"Unknown stage '{name}'. Stages: {list(stages)}")
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(stages[name].deps)
+    return [name for name in stages if name in wanted]  # keep declaration (topological) order
+
+
+def run_stage(stage, fmt, log_dir):
+    """Run one stage's script as a subprocess (cwd = ml-service/); returns (rc, seconds, log)."""
+    log_path = os.path.join(log_dir, f"{stage.name}.log")
+    started = time.perf_counter()
+    with open(log_path, "w") as log:
+        rc = subprocess.call(stage.command(fmt), cwd=ML_SERVICE_DIR, stdout=log, stderr=subprocess.STDOUT)
+    return rc, time.perf_counter() - started, log_path
+
+
+def run_pipeline(targets=None, jobs=2, force=False, dry_run=False, fmt=None):
+    stages = build_stages()
+    order = select(stages, targets)
+    manifest = load_manifest()
+    cache = HashCache(manifest.get("hashes"))
+    log_dir = os.path.join(PROCESSED_DIR, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    done, failed, skipped = set(), set(), set()
+    stale = set()  # dry run: stages that would run (their outputs would change)
+    running = {}
+    pending = list(order)
+
+    def ready(name):
+        return all(d in done for d in stages[name].deps if d in order)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            # Drop stages whose upstream failed
+            for name in [n for n in pending if stages[n].deps & failed]:
+                pending.remove(name)
+                failed.add(name)
+                print(f"[{name}] not run: upstream stage failed.")
+
+            for name in [n for n in pending if ready(n)]:
+                pending.remove(name)
+                stage = stages[name]
+                if dry_run and stage.deps & stale:
+                    # Its inputs are about to be rebuilt, so today's hashes say nothing
+                    print(f"[{name}] would run (upstream would rerun): {' '.join(stage.command(fmt)[1:])}")
+                    done.add(name)
+                    stale.add(name)
+                    continue
+                try:
+                    fp = fingerprint(stage, cache, fmt)
+                except FileNotFoundError as exc:
+                    print(f"[{name}] FAILED: {exc}")
+                    failed.add(name)
+                    continue
+                prev = manifest["stages"].get(name, {})
+                produced = set(prev.get("outputs", []))
+                outputs_ok = all(a.resolve() is not None for a in stage.outputs
+                                 if not a.optional or repr(a) in produced)
+                if not force and prev.get("fingerprint") == fp and outputs_ok:
+                    print(f"[{name}] up to date, skipping.")
+                    done.add(name)
+                    skipped.add(name)
+                    continue
+                if dry_run:
+                    print(f"[{name}] would run: {' '.join(stage.command(fmt)[1:])}")
+                    done.add(name)
+                    stale.add(name)
+                    continue
+                print(f"[{name}] running …")
+                running[pool.submit(run_stage, stage, fmt, log_dir)] = (name, fp)
+
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name, fp = running.pop(fut)
+                rc, seconds, log_path = fut.result()
+                if rc == 0:
+                    done.add(name)
+                    manifest["stages"][name] = {"fingerprint": fp, "seconds": round(seconds, 3),
+                                                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                                "outputs": sorted(repr(a) for a in stages[name].outputs
+                                                                  if a.resolve() is not None)}
+                    print(f"[{name}] done in {seconds:.1f}s (log: {os.path.relpath(log_path, ML_SERVICE_DIR)})")
+                else:
+                    failed.add(name)
+                    print(f"[{name}] FAILED with exit code {rc} (log: {os.path.relpath(log_path, ML_SERVICE_DIR)})")
+                if not dry_run:
+                    manifest["hashes"] = cache.entries
+                    save_manifest(manifest)
+
+    if not dry_run:
+        manifest["hashes"] = cache.entries
+        save_manifest(manifest)
+    ran = len(done) - len(skipped)
+    verb = "would run" if dry_run else "ran"
+    print(f"Pipeline finished: {ran} {verb}, {len(skipped)} up to date, {len(failed)} failed.")
+    return not failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the InvestiMate ML pipeline as a cached DAG.")
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date (default: all).")
+    parser.add_argument("--jobs", "-j", type=int, default=2, help="Max stages to run in parallel.")
+    parser.add_argument("--force", action="store_true", help="Run the selected stages even if up to date.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run.")
+    parser.add_argument(
+        "--format", choices=storage.FORMATS, default=None,
+        help="Storage format passed to the table-producing stages (default: their own default)."
+    )
+    parser.add_argument("--list", action="store_true", help="List stages with their inputs/outputs and exit.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for name, stage in build_stages().items():
+            deps = ", ".join(sorted(stage.deps)) or "-"
+            code = [os.path.relpath(p, SCRIPTS_DIR) for p in stage.code]
+            print(f"{name:15s} deps: {deps}\n{'':15s} in:  {stage.inputs}\n{'':15s} out: {stage.outputs}\n"
+                  f"{'':15s} code: {code}")
+        return
+    ok = run_pipeline(args.targets, args.jobs, args.force, args.dry_run, args.format)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()